@@ -0,0 +1,126 @@
+"""Compare time-to-ready and RSS with eager vs lazy extension loading.
+
+Each run is a fresh interpreter started in a scratch directory (with a copy
+of config.json) that imports main, builds a GTARPBot and runs setup_hook
+without logging in. "ready" is measured from interpreter start to the end
+of setup_hook, which is the part of the cold start the lazy loader changes.
+
+Usage (from the botfloripa directory):
+    python benchmarks/boot_lazy.py [--runs 15]
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import time
+started = time.perf_counter()
+import sys, json, asyncio, resource
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+import main
+from utils.db import setup_database
+setup_database()
+
+mode = sys.argv[1]
+bot = main.GTARPBot(
+    command_prefix="!",
+    intents=main.intents,
+    help_command=None,
+    extensions=main.INITIAL_EXTENSIONS,
+    lazy_extensions=main.LAZY_EXTENSIONS if mode == "lazy" else None
+)
+
+async def run():
+    t = time.perf_counter()
+    await bot.load_initial_extensions()
+    extensions = time.perf_counter() - t
+    ready = time.perf_counter() - started
+    ready_rss = rss_kb()
+    # Cost paid by the first user of a lazy cog
+    first_use = 0.0
+    if mode == "lazy":
+        t = time.perf_counter()
+        for name in main.LAZY_EXTENSIONS:
+            await bot.lazy_extensions.ensure_loaded(name)
+        first_use = time.perf_counter() - t
+    print(json.dumps({
+        "ready_ms": ready * 1000,
+        "extensions_ms": extensions * 1000,
+        "rss_kb": ready_rss,
+        "first_use_ms": first_use * 1000,
+        "loaded": sorted(bot.extensions)
+    }))
+
+asyncio.run(run())
+'''
+
+
+def run_once(mode, workdir):
+    env = dict(os.environ, PYTHONPATH=BOT_DIR)
+    env.pop("BOOT_PROFILE", None)
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, mode],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples, key):
+    values = [sample[key] for sample in samples]
+    return statistics.median(values), min(values), max(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="boot_lazy_")
+    try:
+        shutil.copy(os.path.join(BOT_DIR, "config.json"), workdir)
+        results = {"eager": [], "lazy": []}
+        # Interleave the modes so disk cache and CPU frequency affect both equally
+        run_once("eager", workdir)
+        for _ in range(args.runs):
+            for mode in results:
+                results[mode].append(run_once(mode, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'mode':<6} {'ready ms (median/min/max)':<30} {'cog load ms':<12} {'RSS KB':<8} first use ms")
+    for mode, samples in results.items():
+        ready = summarize(samples, "ready_ms")
+        rss = summarize(samples, "rss_kb")
+        extensions = summarize(samples, "extensions_ms")
+        first_use = summarize(samples, "first_use_ms")
+        print(f"{mode:<6} {ready[0]:8.1f} / {ready[1]:6.1f} / {ready[2]:6.1f}      {extensions[0]:<12.2f} {rss[0]:<8.0f} {first_use[0]:.1f}")
+
+    eager_ready = summarize(results["eager"], "ready_ms")[0]
+    lazy_ready = summarize(results["lazy"], "ready_ms")[0]
+    eager_extensions = summarize(results["eager"], "extensions_ms")[0]
+    lazy_extensions = summarize(results["lazy"], "extensions_ms")[0]
+    eager_rss = summarize(results["eager"], "rss_kb")[0]
+    lazy_rss = summarize(results["lazy"], "rss_kb")[0]
+    print(f"\nlazy vs eager: {eager_extensions - lazy_extensions:+.2f}ms cog loading, "
+          f"{eager_ready - lazy_ready:+.1f}ms ready, {eager_rss - lazy_rss:+.0f}KB RSS saved")
+
+
+if __name__ == "__main__":
+    main()
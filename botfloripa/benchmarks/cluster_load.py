@@ -0,0 +1,256 @@
+"""Run the bot in cluster mode against the fake gateway and check the coordination.
+
+cluster.py's launcher (the same Cluster and ClusterHub classes) starts
+--processes bot processes over --shards shards, all pointed at
+benchmarks/fake_discord.py, which only sends the guild to the shard that
+owns it. The run reports:
+
+  identify   when each shard IDENTIFYed; consecutive IDENTIFYs must be at
+             least cluster.identify_interval_seconds apart even though they
+             come from different processes
+  whitelist  the whitelist_load scenario (--applicants) driven through the
+             process that owns the guild, so its allowlist changes are
+             published on the bus
+  bus        messages each process sent and received, scraped from its
+             /metrics endpoint (metrics port + cluster id); the processes
+             without the guild should have received every allowlist change
+  db         with --db-writers, that many extra processes insert
+             --db-writes warnings each into the same database as fast as
+             they can while the cluster runs: write throughput, statements
+             retried because the database was locked, failed writes (which
+             should be 0) and the slowest single write, i.e. how long a bot
+             calling utils.db would have blocked its event loop
+  loop       the longest event loop lag each bot process measured
+             (bot_event_loop_lag_max_seconds), including the time it spent
+             waiting for the database lock
+
+Usage (from the botfloripa directory):
+    python benchmarks/cluster_load.py [--processes 2] [--shards 4] [--applicants 50]
+        [--db-writers 4] [--db-writes 500] [--identify-interval 1]
+"""
+import os
+import re
+import sys
+import json
+import time
+import socket
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import aiohttp
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeDiscord, point_bot_at  # noqa: E402
+from whitelist_load import WhitelistScenario, build_guild, _tail  # noqa: E402
+from cluster import Cluster, recommended_shards  # noqa: E402
+from utils.cluster import ClusterHub  # noqa: E402
+
+# main.py as cluster.py would start it, only pointed at the fake
+CHILD = r'''
+import sys, runpy
+from benchmarks.fake_discord import point_bot_at
+
+point_bot_at(sys.argv[1])
+runpy.run_path(sys.argv[2], run_name="__main__")
+'''
+
+# Inserts warnings through utils.db as fast as it can
+DB_WRITER = r'''
+import sys, json, time
+from utils import db
+from utils.metrics import metrics
+
+db.DB_PATH = sys.argv[1]
+db.configure_database(json.loads(sys.argv[2]))
+writes = int(sys.argv[3])
+failed = 0
+slowest = 0.0
+started = time.perf_counter()
+for i in range(writes):
+    write_started = time.perf_counter()
+    if db.add_warning(i, 0, "cluster_load") is None:
+        failed += 1
+    slowest = max(slowest, time.perf_counter() - write_started)
+print(json.dumps({"seconds": time.perf_counter() - started, "failed": failed, "retries": metrics.db_lock_retries, "slowest": slowest}))
+'''
+
+METRIC_LINE = re.compile(r"^(bot_cluster_\w+|bot_db_lock_retries_total|bot_event_loop_lag_max_seconds) (\S+)$")
+
+
+def free_port_range(count):
+    """A base port with `count` consecutive ports free right now"""
+    while True:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            base = probe.getsockname()[1]
+        if base + count > 65535:
+            continue
+        try:
+            for port in range(base, base + count):
+                with socket.socket() as probe:
+                    probe.bind(("127.0.0.1", port))
+            return base
+        except OSError:
+            continue
+
+
+async def scrape(port):
+    """The cluster, DB lock and loop lag metrics from one process's /metrics"""
+    values = {}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+            for line in (await response.text()).splitlines():
+                match = METRIC_LINE.match(line)
+                if match:
+                    values[match.group(1)] = float(match.group(2))
+    return values
+
+
+async def run_writers(args, workdir, config):
+    writers = [
+        await asyncio.create_subprocess_exec(
+            sys.executable, "-c", DB_WRITER, os.path.join(workdir, "bot_data.db"),
+            json.dumps(config.get('database', {})), str(args.db_writes),
+            cwd=workdir, env=dict(os.environ, PYTHONPATH=BOT_DIR), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        for _ in range(args.db_writers)
+    ]
+    started = time.perf_counter()
+    results = [json.loads((await writer.communicate())[0].decode().strip().splitlines()[-1]) for writer in writers]
+    elapsed = time.perf_counter() - started
+    total = args.db_writers * args.db_writes
+    return {
+        "writers": args.db_writers,
+        "writes": total,
+        "failed": sum(result["failed"] for result in results),
+        "retries": sum(result["retries"] for result in results),
+        "slowest_write_ms": round(max(result["slowest"] for result in results) * 1000, 1),
+        "writes_per_s": round(total / elapsed, 1)
+    }
+
+
+async def main(args, workdir):
+    config = json.load(open(os.path.join(workdir, "config.json")))
+    fake = FakeDiscord(latency=(args.latency_ms[0] / 1000, args.latency_ms[1] / 1000), seed=args.seed)
+    await fake.start()
+    fake.recommended_shards = args.shards
+    build_guild(fake, config)
+    scenario = WhitelistScenario(fake, config, args)
+
+    # The launcher asks the (fake) gateway for the shard count, like cluster.py does without cluster.shard_count
+    point_bot_at(fake.base_url)
+    shard_count, max_concurrency = await recommended_shards("fake-token")
+    hub = await ClusterHub(identify_interval=args.identify_interval, max_concurrency=max_concurrency).start()
+    log = open(os.path.join(workdir, "bot.out"), "w")
+    cluster = Cluster(
+        shard_count, args.processes, hub,
+        argv=[sys.executable, "-c", CHILD, fake.base_url, os.path.join(BOT_DIR, "main.py")],
+        env=dict(os.environ, PYTHONPATH=BOT_DIR, DISCORD_TOKEN="fake-token"),
+        output=log
+    )
+    runner = asyncio.create_task(cluster.run())
+    try:
+        started = time.monotonic()
+        while len(fake.identifies) < shard_count:
+            if time.monotonic() - started > args.timeout or runner.done():
+                raise RuntimeError("Not every shard connected to the fake gateway:\n" + _tail(os.path.join(workdir, "bot.out")))
+            await asyncio.sleep(0.1)
+        connected_s = time.monotonic() - started
+        # The processes' metrics servers start with their cogs, right after the gateway login
+        await asyncio.sleep(2)
+
+        writers = asyncio.create_task(run_writers(args, workdir, config)) if args.db_writers else None
+        elapsed = await scenario.run()
+        await fake.wait_idle()
+        db = await writers if writers else None
+        # Give the bus a moment to deliver the last messages
+        await asyncio.sleep(1)
+
+        processes = {}
+        for cluster_id, shard_ids in enumerate(cluster.ranges):
+            processes[cluster_id] = dict(shards=shard_ids, **await scrape(config['metrics']['port'] + cluster_id))
+
+        times = sorted(moment for moment, _ in fake.identifies)
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        return {
+            "shards": shard_count,
+            "processes": processes,
+            "connected_s": round(connected_s, 2),
+            "identify_min_gap_s": round(min(gaps), 2) if gaps else None,
+            "identify_interval_s": args.identify_interval,
+            "restarts": cluster.restarts,
+            "hub_relayed": hub.relayed,
+            "whitelist": scenario.report(elapsed),
+            "db": db
+        }
+    finally:
+        await cluster.stop()
+        runner.cancel()
+        await hub.stop()
+        log.close()
+        await fake.stop()
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--shards", type=int, default=4, help="shard count recommended by the fake gateway")
+    parser.add_argument("--identify-interval", type=float, default=1.0, help="seconds between IDENTIFYs (Discord: 5)")
+    parser.add_argument("--applicants", type=int, default=50)
+    parser.add_argument("--arrival-rate", type=float, default=10, help="new applicants per second")
+    parser.add_argument("--think-ms", type=float, nargs=2, default=(50, 250), help="answer delay range")
+    parser.add_argument("--wrong-ratio", type=float, default=0.2)
+    parser.add_argument("--latency-ms", type=float, nargs=2, default=(20, 80), help="fake REST latency range")
+    parser.add_argument("--db-writers", type=int, default=4, help="extra processes writing to the database (0: none)")
+    parser.add_argument("--db-writes", type=int, default=500, help="inserts per writer process")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=48)
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cluster-load-")
+    config = json.load(open(os.path.join(BOT_DIR, "config.json")))
+    config['metrics'] = dict(config.get('metrics', {}), enabled=True, port=free_port_range(args.processes))
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump(config, f)
+    # The bot processes inherit the working directory: config.json, bot_data.db and logs live in workdir
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = asyncio.run(main(args, workdir))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{report['shards']} shards over {len(report['processes'])} processes, all connected in {report['connected_s']}s "
+          f"(min gap between IDENTIFYs {report['identify_min_gap_s']}s, interval {report['identify_interval_s']}s), "
+          f"{report['restarts']} restarts")
+    print(f"{'process':<8} {'shards':<12} {'bus sent':>9} {'received':>9} {'dropped':>8} {'lock retries':>13} {'max loop lag':>13}")
+    for cluster_id, row in report['processes'].items():
+        print(
+            f"{cluster_id:<8} {','.join(map(str, row['shards'])):<12} {row.get('bot_cluster_messages_sent', 0):>9.0f} "
+            f"{row.get('bot_cluster_messages_received', 0):>9.0f} {row.get('bot_cluster_messages_dropped', 0):>8.0f} "
+            f"{row.get('bot_db_lock_retries_total', 0):>13.0f} {row.get('bot_event_loop_lag_max_seconds', 0) * 1000:>11.0f}ms"
+        )
+    whitelist = report['whitelist']
+    print(f"whitelist: {whitelist['finished']}/{whitelist['applicants']} finished ({whitelist['approved']} approved, "
+          f"{whitelist['rejected']} rejected, {whitelist['timed_out']} timed out) at {whitelist['sessions_per_s']}/s; "
+          f"click -> result p50 {whitelist['session_latency']['p50_ms']}ms")
+    if report['db']:
+        db = report['db']
+        print(f"db: {db['writes']} inserts from {db['writers']} processes at {db['writes_per_s']}/s, "
+              f"{db['retries']} retried while locked, {db['failed']} failed, slowest write {db['slowest_write_ms']}ms")
+
+
+if __name__ == "__main__":
+    cli()
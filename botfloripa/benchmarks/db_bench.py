@@ -0,0 +1,330 @@
+"""Benchmark the utils/db.py functions and the hot helpers in utils/helpers.py.
+
+DB functions run against synthetic databases with 1k, 100k and 1M rows per
+table (allowlist, attempts, answers, warnings, bans, suggestions and temp
+channels), generated by generate_data.py. Fixtures are built once per size,
+seed and day and cached in --fixture-dir; each run works on a copy, so write benchmarks never change
+the cached file. Helper benchmarks (load_config, create_embed, parse_time,
+format_time_difference, score_answer and the permission checks) run once,
+independent of size.
+
+Each case is timed like timeit: calls are batched until a batch takes at
+least --min-time seconds, and --repeat batches are measured. The per-call
+median and minimum are reported.
+
+Results are written as JSON with --output. --compare loads an earlier
+output and reports each case's change against it. The exit status is 1 when
+a case got slower than --threshold (default 10%), so the runner can be used
+as a check before merging changes to these paths.
+
+Usage (from the botfloripa directory):
+    python benchmarks/db_bench.py [--sizes 1000 100000 1000000] [--filter allowlist]
+        [--output results.json] [--compare baseline.json] [--threshold 0.10]
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import statistics
+import tempfile
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_data import GUILD_ID_BASE, generate  # noqa: E402
+
+# Bump when the fixture layout changes so cached fixtures are rebuilt
+FIXTURE_VERSION = 3
+
+
+def build_fixture(path, rows, seed):
+    """Create a database with the bot's schema and `rows` rows in each table.
+
+    One application in ten keeps its answers, so the answers table stays in
+    the same order of magnitude as the other tables. Bans and temp channels
+    are spread over four guilds, so the per-guild cases (what each shard
+    reads) select a quarter of them.
+    """
+    generate(path, users=rows, warnings=rows, bans=rows, suggestions=rows,
+             temp_channels=rows, answered=0.1, seed=seed, guilds=4)
+
+
+def fixture_path(fixture_dir, rows, seed):
+    # Fixtures are dated: the timeseries cases query the last 24 hours, so a
+    # fixture from another day would measure an empty window
+    day = datetime.now().strftime("%Y%m%d")
+    prefix = f"bench-v{FIXTURE_VERSION}-{rows}-{seed}-"
+    path = os.path.join(fixture_dir, f"{prefix}{day}.db")
+    if not os.path.exists(path):
+        for name in os.listdir(fixture_dir):
+            if name.startswith(prefix):
+                os.remove(os.path.join(fixture_dir, name))
+        started = time.perf_counter()
+        partial = path + ".partial"
+        build_fixture(partial, rows, seed)
+        os.replace(partial, path)
+        print(f"built {rows:,}-row fixture in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return path
+
+
+def sample_ids(path, rng):
+    """Ids that exist in the fixture, so lookups hit real rows"""
+    conn = sqlite3.connect(path)
+    try:
+        def column(sql):
+            ids = [row[0] for row in conn.execute(sql)]
+            rng.shuffle(ids)
+            return ids
+
+        return {
+            # Every n-th row, so the sample spans the whole key range
+            "users": column("SELECT user_id FROM allowlist WHERE rowid % "
+                            "(SELECT MAX(1, COUNT(*) / 1024) FROM allowlist) = 0 LIMIT 1024"),
+            "answered": column("SELECT DISTINCT user_id FROM allowlist_answers LIMIT 1024"),
+            "offenders": column("SELECT user_id FROM warnings GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1024"),
+            "messages": column("SELECT message_id FROM suggestions ORDER BY id LIMIT 1024"),
+            "suggestions": column("SELECT id FROM suggestions ORDER BY id LIMIT 1024"),
+            "middle": conn.execute(
+                "SELECT user_id FROM allowlist WHERE status = 'approved' ORDER BY user_id LIMIT 1 OFFSET "
+                "(SELECT COUNT(*) / 2 FROM allowlist WHERE status = 'approved')"
+            ).fetchone()[0],
+            "fresh": 1 + max(
+                conn.execute("SELECT MAX(user_id) FROM allowlist").fetchone()[0],
+                conn.execute("SELECT COALESCE(MAX(message_id), 0) FROM suggestions").fetchone()[0],
+                conn.execute("SELECT COALESCE(MAX(channel_id), 0) FROM temp_channels").fetchone()[0]
+            )
+        }
+    finally:
+        conn.close()
+
+
+def measure(func, min_time, repeat):
+    """Per-call seconds: calls are batched until a batch lasts min_time, then repeat batches are timed"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for i in range(number):
+            func(i)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for i in range(number):
+            func(i)
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        "median_us": statistics.median(samples) * 1e6,
+        "min_us": min(samples) * 1e6,
+        "calls": number * repeat
+    }
+
+
+def db_cases(ids):
+    from utils import db
+
+    users, answered, offenders = ids["users"], ids["answered"], ids["offenders"]
+    messages, suggestions = ids["messages"], ids["suggestions"]
+    middle = ids["middle"]
+    fresh = iter(range(ids["fresh"], ids["fresh"] + 10 ** 9))
+    answers = [
+        {"question_id": q, "question": f"Pergunta {q}", "answer": "Resposta de teste", "score": 1}
+        for q in range(1, 11)
+    ]
+
+    def pick(i, sample=users):
+        return sample[i % len(sample)]
+
+    return {
+        # Reads
+        "check_allowlist": lambda i: db.check_allowlist(pick(i)),
+        "get_allowlist_page.first": lambda i: db.get_allowlist_page("approved"),
+        "get_allowlist_page.middle": lambda i: db.get_allowlist_page("approved", after_user_id=middle),
+        "get_allowlist_page.previous": lambda i: db.get_allowlist_page("approved", before_user_id=middle),
+        "count_allowlist.status": lambda i: db.count_allowlist("pending"),
+        "count_allowlist.all": lambda i: db.count_allowlist(),
+        "get_allowlist_stats": lambda i: db.get_allowlist_stats(),
+        "get_application_answers": lambda i: db.get_application_answers(pick(i, answered)),
+        "get_allowlist_history": lambda i: db.get_allowlist_history(pick(i)),
+        "get_question_stats": lambda i: db.get_question_stats(),
+        "get_allowlist_timeseries": lambda i: db.get_allowlist_timeseries(24),
+        "get_allowlist_daily_counts": lambda i: db.get_allowlist_daily_counts(7),
+        "get_allowlist.full": lambda i: db.get_allowlist(),
+        "get_warnings": lambda i: db.get_warnings(pick(i, offenders)),
+        "get_active_ban": lambda i: db.get_active_ban(pick(i, offenders)),
+        "get_all_bans": lambda i: db.get_all_bans(),
+        "get_all_bans.guild": lambda i: db.get_all_bans([GUILD_ID_BASE], include_unassigned=False),
+        "get_suggestion": lambda i: db.get_suggestion(pick(i, suggestions)),
+        "get_suggestion_by_message": lambda i: db.get_suggestion_by_message(pick(i, messages)),
+        "get_temp_channels": lambda i: db.get_temp_channels(),
+        "get_temp_channels.guild": lambda i: db.get_temp_channels([GUILD_ID_BASE], include_unassigned=False),
+        "get_state": lambda i: db.get_state("dashboard_message_id"),
+        # Writes (each call commits its own transaction)
+        "add_to_allowlist": lambda i: db.add_to_allowlist(next(fresh), status="pending", answers=answers),
+        "update_allowlist_status": lambda i: db.update_allowlist_status(pick(i), "approved", approved_by=1),
+        "add_warning": lambda i: db.add_warning(pick(i), 1, "Comportamento inadequado"),
+        "add_ban": lambda i: db.add_ban(next(fresh), 1, "Quebra de regras"),
+        "add_suggestion": lambda i: db.add_suggestion(pick(i), "Adicionar mais empregos legais", next(fresh), 1),
+        "add_temp_channel": lambda i: db.add_temp_channel(next(fresh), pick(i), "whitelist"),
+        "set_state": lambda i: db.set_state("dashboard_message_id", i)
+    }
+
+
+def helper_cases(config):
+    from utils import helpers
+
+    admin_role = config.get('roles', {}).get('admin', 1)
+    permissions = SimpleNamespace(administrator=False, ban_members=False, kick_members=False)
+    # Role lookups go through the member's guild settings (guild 1 has none: the default guild's apply)
+    guild = SimpleNamespace(id=1)
+    member = SimpleNamespace(
+        roles=[SimpleNamespace(id=role_id) for role_id in range(1000, 1020)],
+        guild_permissions=permissions,
+        guild=guild
+    )
+    admin = SimpleNamespace(roles=member.roles + [SimpleNamespace(id=admin_role)], guild_permissions=permissions, guild=guild)
+    past = (datetime.now().astimezone() - timedelta(days=3, hours=4)).isoformat()
+    future = datetime.now().astimezone() + timedelta(hours=5)
+    correct = config.get('allowlist', {}).get('correct_answers', ["É você usar informações de fora do jogo."])[0]
+
+    def load_config_miss(i):
+        # Forget the cached (mtime, size) key so the file is parsed again
+        helpers._config_cache["key"] = None
+        helpers.load_config()
+
+    return {
+        "load_config.hit": lambda i: helpers.load_config(),
+        "load_config.miss": load_config_miss,
+        "create_embed": lambda i: helpers.create_embed("Título", "Descrição", color="success"),
+        "create_embed.fields": lambda i: helpers.create_embed(
+            "Título", "Descrição", color="info",
+            fields=[{"name": f"Campo {n}", "value": "Valor", "inline": True} for n in range(6)]
+        ),
+        "parse_time": lambda i: helpers.parse_time(("30m", "2h", "7d", "15s", "abc")[i % 5]),
+        "format_time_difference.str": lambda i: helpers.format_time_difference(past),
+        "format_time_difference.datetime": lambda i: helpers.format_time_difference(future),
+        "score_answer": lambda i: helpers.score_answer(f"{correct} pelo que entendi", correct),
+        "is_admin.member": lambda i: helpers.is_admin(member),
+        "is_admin.admin": lambda i: helpers.is_admin(admin),
+        "is_moderator.member": lambda i: helpers.is_moderator(member),
+        "can_use_allowlist_commands": lambda i: helpers.can_use_allowlist_commands(member),
+        "can_use_moderation_commands": lambda i: helpers.can_use_moderation_commands(admin)
+    }
+
+
+def run(args):
+    from utils import db, helpers
+
+    workdir = tempfile.mkdtemp(prefix="db_bench_")
+    results = {}
+    try:
+        shutil.copy(os.path.join(BOT_DIR, "config.json"), workdir)
+        helpers.CONFIG_PATH = os.path.join(workdir, "config.json")
+        selected = re.compile(args.filter) if args.filter else None
+
+        cases = {f"helpers.{name}": func for name, func in helper_cases(helpers.load_config()).items()}
+        for rows in args.sizes:
+            base = fixture_path(args.fixture_dir, rows, args.seed)
+            work = os.path.join(workdir, f"work-{rows}.db")
+            shutil.copy(base, work)
+            db.DB_PATH = work
+            ids = sample_ids(work, random.Random(args.seed))
+            for name, func in db_cases(ids).items():
+                key = f"db.{name}[{rows}]"
+                if selected and not selected.search(key):
+                    continue
+                results[key] = measure(func, args.min_time, args.repeat)
+                print(f"{key:<48} {results[key]['median_us']:>14,.1f} us", file=sys.stderr)
+            os.remove(work)
+
+        # The helpers read the guild settings, imported from config.json into a fresh database
+        db.DB_PATH = os.path.join(workdir, "helpers.db")
+        db.setup_database()
+        for key, func in cases.items():
+            if selected and not selected.search(key):
+                continue
+            results[key] = measure(func, args.min_time, args.repeat)
+            print(f"{key:<48} {results[key]['median_us']:>14,.1f} us", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "created_at": datetime.now().astimezone().isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "fixture_version": FIXTURE_VERSION
+        },
+        "results": results
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print each case against the baseline; returns the cases that regressed"""
+    regressions = []
+    print(f"{'case':<48} {'baseline us':>14} {'current us':>14} {'change':>9}")
+    for key, current in report["results"].items():
+        before = baseline["results"].get(key)
+        if before is None:
+            print(f"{key:<48} {'-':>14} {current['median_us']:>14,.1f} {'new':>9}")
+            continue
+        change = current["median_us"] / before["median_us"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  slower"
+            regressions.append(key)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{key:<48} {before['median_us']:>14,.1f} {current['median_us']:>14,.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--filter", help="regular expression matched against case names")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per timed batch")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fixture-dir", default=os.path.join(tempfile.gettempdir(), "botfloripa-bench"))
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON file from an earlier --output to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown reported as a regression")
+    args = parser.parse_args()
+
+    os.makedirs(args.fixture_dir, exist_ok=True)
+    report = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+    else:
+        print(f"{'case':<48} {'median us':>14} {'min us':>14}")
+        for key, result in report["results"].items():
+            print(f"{key:<48} {result['median_us']:>14,.1f} {result['min_us']:>14,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,556 @@
+"""In-process stand-in for the Discord gateway and REST API.
+
+FakeDiscord runs a local aiohttp server that speaks just enough of the
+Discord protocol for the real bot from main.py to log in, receive READY and
+GUILD_CREATE and run its cogs:
+
+  REST     /api/v10/...   users/@me, user and member lookups, application info, channel
+                          create/delete, message send and edit, role add/remove,
+                          member edit, bans, DMs and interaction callbacks;
+                          anything else returns 404 and is counted in `unhandled`
+  gateway  /gateway       HELLO, IDENTIFY -> READY + GUILD_CREATE, heartbeat
+                          ACKs, REQUEST_GUILD_MEMBERS -> GUILD_MEMBERS_CHUNK,
+                          then whatever events the scenario dispatches
+                          (plain JSON text frames, no compression); with
+                          several shards connected, the guild and its events
+                          only go to the shard that owns it
+
+Every REST response is delayed by a configurable latency and carries rate
+limit headers for a bucket of `bucket_limit` requests; a configurable
+fraction of requests answer 429 first, with the headers discord.py expects, so
+its rate-limit handling runs for real. With `reply_delay`, the response to a
+message the bot sends is held back that long after the message is already
+visible to the scenario, as when Discord delivers a message (and users answer
+it) before the sender gets its HTTP reply. Scenarios observe the bot through
+`on_bot_message` and `on_channel_create` callbacks.
+
+point_bot_at(base_url) redirects discord.py's REST base URL and default
+gateway to the fake; it runs in the bot's process, which can be a different
+one from the fake's (see benchmarks/whitelist_load.py).
+"""
+import json
+import time
+import random
+import asyncio
+import itertools
+from datetime import datetime, timezone
+
+from aiohttp import web, WSMsgType
+
+DISCORD_EPOCH = 1420070400000
+# Guilds with at least this many members are "large" (discord.py's default large_threshold)
+LARGE_THRESHOLD = 250
+CHUNK_SIZE = 1000
+API_PREFIX = "/api/v10"
+
+
+def snowflake_at(timestamp, counter):
+    """Snowflake for a unix timestamp (seconds); the counter keeps ids unique"""
+    return ((int(timestamp * 1000) - DISCORD_EPOCH) << 22) | (counter & 0x3FFFFF)
+
+
+def iso_now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeDiscord:
+    def __init__(self, latency=(0.02, 0.08), rate_limit_ratio=0.0, retry_after=0.05, bucket_limit=5, reply_delay=0.0, seed=None):
+        self.latency = latency
+        self.reply_delay = reply_delay
+        self.bucket_limit = bucket_limit
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self._counter = itertools.count(1)
+
+        self.bot_user = self.user(username="BotFloripa", bot=True)
+        self.guild_id = self.next_id()
+        self.roles = {}
+        self.channels = {}
+        self.members = {}
+        self.bans = set()
+
+        # Scenario hooks: async callables
+        self.on_bot_message = None      # (channel_id, payload)
+        self.on_channel_create = None   # (channel_payload, request_json)
+        self.on_channel_delete = None   # (channel_id)
+
+        self.stats = {"requests": 0, "rate_limited": 0, "unhandled": {}, "routes": {}}
+        self.in_flight = 0
+        self._last_request = time.monotonic()
+        self.port = None
+        self._runner = None
+        self._sockets = []
+        # Shard count suggested by GET /gateway/bot (used by AutoShardedBot without shard_count)
+        self.recommended_shards = 1
+        # (monotonic time, (shard_id, shard_count) or None) of every IDENTIFY
+        self.identifies = []
+        self.identified = asyncio.Event()
+        self._tasks = set()
+        self._sequence = itertools.count(1)
+
+    # -- ids and payloads -------------------------------------------------
+
+    def next_id(self, timestamp=None):
+        return str(snowflake_at(timestamp or time.time(), next(self._counter)))
+
+    def user(self, username, bot=False, created_at=None):
+        return {
+            "id": self.next_id(created_at),
+            "username": username,
+            "global_name": username,
+            "discriminator": "0",
+            "avatar": None,
+            "bot": bot,
+            "public_flags": 0
+        }
+
+    def member(self, user, roles=()):
+        return {
+            "user": user,
+            "roles": [str(role) for role in roles],
+            "joined_at": iso_now(),
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+            "permissions": "0"
+        }
+
+    def populate(self, count, roles=()):
+        """Add `count` members without dispatching events, as if they joined before the bot started"""
+        for index in range(count):
+            user = self.user(f"membro{index}")
+            self.members[user["id"]] = self.member(user, roles)
+
+    def add_role(self, name, role_id=None, permissions=0, position=1):
+        role_id = str(role_id or self.next_id())
+        self.roles[role_id] = {
+            "id": role_id, "name": name, "permissions": str(permissions), "position": position,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0
+        }
+        return role_id
+
+    def add_channel(self, name, channel_id=None, channel_type=0, parent_id=None, **extra):
+        channel_id = str(channel_id or self.next_id())
+        self.channels[channel_id] = {
+            "id": channel_id, "type": channel_type, "guild_id": self.guild_id, "name": name,
+            "position": len(self.channels), "permission_overwrites": [], "parent_id": parent_id,
+            "nsfw": False, "rate_limit_per_user": 0, "topic": None, "last_message_id": None,
+            **extra
+        }
+        return channel_id
+
+    def message(self, channel_id, author, content="", member=None, embeds=None, components=None):
+        payload = {
+            "id": self.next_id(), "channel_id": str(channel_id), "author": author,
+            "content": content, "timestamp": iso_now(), "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": [], "embeds": embeds or [], "components": components or [],
+            "pinned": False, "type": 0, "flags": 0
+        }
+        if str(channel_id) in self.channels:
+            payload["guild_id"] = self.guild_id
+            if member is not None:
+                payload["member"] = {k: v for k, v in member.items() if k != "user"}
+        return payload
+
+    def guild_payload(self):
+        everyone = self.roles.get(self.guild_id)
+        if everyone is None:
+            self.add_role("@everyone", role_id=self.guild_id, permissions=104324673, position=0)
+        bot_member = self.member(self.bot_user, roles=[])
+        large = len(self.members) + 1 >= LARGE_THRESHOLD
+        return {
+            "id": self.guild_id, "name": "Servidor de Teste", "icon": None, "owner_id": self.bot_user["id"],
+            "region": "brazil", "afk_channel_id": None, "afk_timeout": 300, "verification_level": 0,
+            "default_message_notifications": 0, "explicit_content_filter": 0, "mfa_level": 0,
+            "features": [], "emojis": [], "stickers": [], "roles": list(self.roles.values()),
+            # Like Discord, large guilds only send the bot's own member; the rest comes from chunking
+            "channels": list(self.channels.values()), "threads": [],
+            "members": [bot_member] + ([] if large else list(self.members.values())),
+            "voice_states": [], "presences": [], "stage_instances": [], "guild_scheduled_events": [],
+            "member_count": 1 + len(self.members), "large": large, "unavailable": False,
+            "joined_at": iso_now(), "premium_tier": 0, "preferred_locale": "pt-BR",
+            "system_channel_flags": 0, "nsfw_level": 0
+        }
+
+    # -- server lifecycle -------------------------------------------------
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application(client_max_size=8 * 1024 * 1024)
+        app.router.add_get("/gateway", self.handle_gateway)
+        app.router.add_route("*", API_PREFIX + "/{path:.*}", self.handle_rest)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{self.port}"
+        return self
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        for ws, sender in self._sockets:
+            sender.cancel()
+            await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    def spawn(self, coro):
+        """create_task that keeps a reference, so the loop cannot drop the task mid-flight"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # -- gateway ----------------------------------------------------------
+
+    def owns_guild(self, ws):
+        """Whether the guild belongs to the shard this socket identified as: (guild_id >> 22) % shard_count"""
+        if ws._shard is None:
+            return True
+        shard_id, shard_count = ws._shard
+        return (int(self.guild_id) >> 22) % shard_count == shard_id
+
+    async def dispatch(self, event, data):
+        """Send a DISPATCH event to every gateway session whose shard owns the guild"""
+        frame = {"op": 0, "t": event, "s": next(self._sequence), "d": data}
+        for ws, sender in self._sockets:
+            if self.owns_guild(ws):
+                ws._outbox.put_nowait(frame)
+
+    def send_member_chunks(self, ws, request):
+        """Answer REQUEST_GUILD_MEMBERS on the socket that asked, CHUNK_SIZE members per event"""
+        if request.get("user_ids"):
+            wanted = request["user_ids"] if isinstance(request["user_ids"], list) else [request["user_ids"]]
+            members = [self.members[str(user_id)] for user_id in wanted if str(user_id) in self.members]
+        else:
+            query = (request.get("query") or "").lower()
+            members = [m for m in self.members.values() if m["user"]["username"].startswith(query)]
+            if request.get("limit"):
+                members = members[:request["limit"]]
+        chunks = [members[i:i + CHUNK_SIZE] for i in range(0, len(members), CHUNK_SIZE)] or [[]]
+        for index, chunk in enumerate(chunks):
+            data = {"guild_id": self.guild_id, "members": chunk, "chunk_index": index, "chunk_count": len(chunks)}
+            if request.get("nonce"):
+                data["nonce"] = request["nonce"]
+            ws._outbox.put_nowait({"op": 0, "t": "GUILD_MEMBERS_CHUNK", "s": next(self._sequence), "d": data})
+
+    async def handle_gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        ws._outbox = asyncio.Queue()
+        ws._shard = None
+
+        async def sender():
+            # A single writer per socket keeps frames in order
+            while True:
+                frame = await ws._outbox.get()
+                await ws.send_str(json.dumps(frame))
+
+        sender_task = asyncio.create_task(sender())
+        entry = (ws, sender_task)
+        ws._outbox.put_nowait({"op": 10, "d": {"heartbeat_interval": 41250}, "s": None, "t": None})
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(msg.data)
+                op = payload.get("op")
+                if op == 1:
+                    # An instant ACK can beat discord.py's own bookkeeping of the send time and
+                    # be reported as 41s of latency; answer after a realistic delay instead
+                    ack = {"op": 11, "d": None, "s": None, "t": None}
+                    asyncio.get_running_loop().call_later(max(self.latency[0], 0.01), ws._outbox.put_nowait, ack)
+                elif op in (2, 6):
+                    if op == 2:
+                        if payload["d"].get("shard"):
+                            ws._shard = tuple(payload["d"]["shard"])
+                        self.identifies.append((time.monotonic(), ws._shard))
+                    self._sockets.append(entry)
+                    owned = self.owns_guild(ws)
+                    ready = {
+                        "v": 10, "user": self.bot_user,
+                        "guilds": [{"id": self.guild_id, "unavailable": True}] if owned else [],
+                        "session_id": "fake-session", "resume_gateway_url": f"ws://127.0.0.1:{self.port}/gateway",
+                        "application": {"id": self.bot_user["id"], "flags": 0}, "private_channels": [],
+                        "relationships": [], "presences": [], "shard": list(ws._shard) if ws._shard else None
+                    }
+                    ws._outbox.put_nowait({"op": 0, "t": "READY", "s": next(self._sequence), "d": ready})
+                    if owned:
+                        ws._outbox.put_nowait({"op": 0, "t": "GUILD_CREATE", "s": next(self._sequence), "d": self.guild_payload()})
+                    self.identified.set()
+                elif op == 8:
+                    self.send_member_chunks(ws, payload["d"])
+        finally:
+            sender_task.cancel()
+            if entry in self._sockets:
+                self._sockets.remove(entry)
+        return ws
+
+    # -- REST -------------------------------------------------------------
+
+    async def handle_rest(self, request):
+        self.stats["requests"] += 1
+        self.in_flight += 1
+        try:
+            return await self._handle_rest(request)
+        finally:
+            self.in_flight -= 1
+            self._last_request = time.monotonic()
+
+    async def wait_idle(self, quiet=1.0, timeout=30):
+        """Wait until no REST request has been seen for `quiet` seconds"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.in_flight and time.monotonic() - self._last_request >= quiet:
+                return True
+            await asyncio.sleep(quiet / 4)
+        return False
+
+    async def _handle_rest(self, request):
+        low, high = self.latency
+        await asyncio.sleep(self.random.uniform(low, high))
+
+        path = request.match_info["path"]
+        route_key = f"{request.method} /{_template(path)}"
+        self.stats["routes"][route_key] = self.stats["routes"].get(route_key, 0) + 1
+
+        if self.rate_limit_ratio and self.random.random() < self.rate_limit_ratio:
+            self.stats["rate_limited"] += 1
+            return json_response(
+                {"message": "You are being rate limited.", "retry_after": self.retry_after, "global": False},
+                status=429,
+                headers={
+                    "Via": "1.1 google", "X-RateLimit-Limit": str(self.bucket_limit), "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset-After": str(self.retry_after), "X-RateLimit-Bucket": _template(path),
+                    "X-RateLimit-Scope": "user"
+                }
+            )
+
+        body = None
+        if request.can_read_body and request.content_type == "application/json":
+            try:
+                body = await request.json()
+            except ConnectionResetError:
+                # The bot shut down with this request in flight
+                return web.Response(status=499)
+        parts = path.strip("/").split("/")
+        handler = self._route(request.method, parts)
+        if handler is None:
+            self.stats["unhandled"][route_key] = self.stats["unhandled"].get(route_key, 0) + 1
+            return json_response({"message": "Unknown route", "code": 0}, status=404)
+        response = await handler(parts, body or {})
+        # Without these headers discord.py keeps one request in flight per bucket; with them it
+        # allows bucket_limit concurrent requests, as it does against Discord
+        response.headers.update({
+            "X-RateLimit-Limit": str(self.bucket_limit), "X-RateLimit-Remaining": str(self.bucket_limit - 1),
+            "X-RateLimit-Reset-After": "1.0", "X-RateLimit-Bucket": _template(path)
+        })
+        return response
+
+    def _route(self, method, parts):
+        table = {
+            ("GET", "users/@me"): self._get_me,
+            ("POST", "users/@me/channels"): self._create_dm,
+            ("GET", "oauth2/applications/@me"): self._get_application,
+            ("GET", "users/*"): self._get_user,
+            ("GET", "guilds/*/members/*"): self._get_member,
+            ("GET", "gateway/bot"): self._get_gateway,
+            ("GET", "gateway"): self._get_gateway,
+            ("POST", "guilds/*/channels"): self._create_channel,
+            ("DELETE", "channels/*"): self._delete_channel,
+            ("PATCH", "channels/*"): self._edit_channel,
+            ("POST", "channels/*/messages"): self._send_message,
+            ("PATCH", "channels/*/messages/*"): self._edit_message,
+            ("DELETE", "channels/*/messages/*"): self._no_content,
+            ("PUT", "channels/*/messages/*/reactions/*/@me"): self._no_content,
+            ("PUT", "guilds/*/members/*/roles/*"): self._no_content,
+            ("DELETE", "guilds/*/members/*/roles/*"): self._no_content,
+            ("PATCH", "guilds/*/members/*"): self._edit_member,
+            ("DELETE", "guilds/*/members/*"): self._no_content,
+            ("PUT", "guilds/*/bans/*"): self._ban,
+            ("DELETE", "guilds/*/bans/*"): self._unban,
+            ("GET", "guilds/*/bans/*"): self._get_ban,
+            ("POST", "interactions/*/*/callback"): self._interaction_callback,
+            ("PATCH", "webhooks/*/*/messages/@original"): self._edit_message,
+            ("POST", "webhooks/*/*"): self._send_message
+        }
+        for (route_method, pattern), handler in table.items():
+            pattern_parts = pattern.split("/")
+            if route_method == method and len(pattern_parts) == len(parts) and all(
+                p == "*" or p == actual for p, actual in zip(pattern_parts, parts)
+            ):
+                return handler
+        return None
+
+    async def _get_me(self, parts, body):
+        return json_response(self.bot_user)
+
+    async def _get_user(self, parts, body):
+        member = self.members.get(parts[1])
+        if member is None:
+            return json_response({"message": "Unknown User", "code": 10013}, status=404)
+        return json_response(member["user"])
+
+    async def _get_member(self, parts, body):
+        member = self.members.get(parts[3])
+        if member is None:
+            return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        return json_response(member)
+
+    async def _get_application(self, parts, body):
+        return json_response({
+            "id": self.bot_user["id"], "name": self.bot_user["username"], "description": "", "icon": None,
+            "bot_public": False, "bot_require_code_grant": False, "owner": self.bot_user,
+            "verify_key": "0" * 64, "flags": 0
+        })
+
+    async def _get_gateway(self, parts, body):
+        return json_response({
+            "url": f"ws://127.0.0.1:{self.port}/gateway", "shards": self.recommended_shards,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1}
+        })
+
+    async def _create_dm(self, parts, body):
+        recipient = self.members.get(str(body.get("recipient_id")), {}).get("user") or {"id": str(body.get("recipient_id")), "username": "user", "discriminator": "0", "avatar": None}
+        return json_response({"id": self.next_id(), "type": 1, "recipients": [recipient], "last_message_id": None})
+
+    async def _create_channel(self, parts, body):
+        channel_id = self.add_channel(
+            body.get("name", "canal"), channel_type=body.get("type", 0), parent_id=body.get("parent_id"),
+            topic=body.get("topic")
+        )
+        channel = self.channels[channel_id]
+        channel["permission_overwrites"] = body.get("permission_overwrites", [])
+        await self.dispatch("CHANNEL_CREATE", channel)
+        if self.on_channel_create:
+            await self.on_channel_create(channel, body)
+        return json_response(channel)
+
+    async def _delete_channel(self, parts, body):
+        channel = self.channels.pop(parts[1], None)
+        if channel is None:
+            return json_response({"message": "Unknown Channel", "code": 10003}, status=404)
+        await self.dispatch("CHANNEL_DELETE", channel)
+        if self.on_channel_delete:
+            await self.on_channel_delete(parts[1])
+        return json_response(channel)
+
+    async def _edit_channel(self, parts, body):
+        channel = self.channels.get(parts[1])
+        if channel is None:
+            return json_response({"message": "Unknown Channel", "code": 10003}, status=404)
+        channel.update({k: v for k, v in body.items() if k in channel})
+        return json_response(channel)
+
+    async def _send_message(self, parts, body):
+        channel_id = parts[1]
+        payload = self.message(channel_id, self.bot_user, body.get("content") or "", embeds=body.get("embeds"), components=body.get("components"))
+        if self.on_bot_message:
+            # Let the scenario react without holding up the bot's request
+            self.spawn(self.on_bot_message(channel_id, payload))
+        if self.reply_delay:
+            await asyncio.sleep(self.reply_delay)
+        return json_response(payload)
+
+    async def _edit_message(self, parts, body):
+        channel_id = parts[1] if parts[0] == "channels" else next(iter(self.channels))
+        payload = self.message(channel_id, self.bot_user, body.get("content") or "", embeds=body.get("embeds"), components=body.get("components"))
+        if parts[0] == "channels":
+            payload["id"] = parts[3]
+        return json_response(payload)
+
+    async def _edit_member(self, parts, body):
+        member = self.members.get(parts[3])
+        if member is None:
+            return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        if "roles" in body:
+            member["roles"] = [str(r) for r in body["roles"]]
+        return json_response(member)
+
+    async def _ban(self, parts, body):
+        self.bans.add(parts[3])
+        return web.Response(status=204)
+
+    async def _unban(self, parts, body):
+        self.bans.discard(parts[3])
+        return web.Response(status=204)
+
+    async def _get_ban(self, parts, body):
+        if parts[3] not in self.bans:
+            return json_response({"message": "Unknown Ban", "code": 10026}, status=404)
+        user = self.members.get(parts[3], {}).get("user") or {"id": parts[3], "username": "user", "discriminator": "0", "avatar": None}
+        return json_response({"user": user, "reason": None})
+
+    async def _interaction_callback(self, parts, body):
+        return json_response({"interaction": {"id": parts[1], "type": 3}})
+
+    async def _no_content(self, parts, body):
+        return web.Response(status=204)
+
+    # -- synthetic events -------------------------------------------------
+
+    async def member_join(self, user, roles=()):
+        member = self.member(user, roles)
+        self.members[user["id"]] = member
+        await self.dispatch("GUILD_MEMBER_ADD", {**member, "guild_id": self.guild_id})
+        return member
+
+    async def user_message(self, channel_id, user, content):
+        member = self.members.get(user["id"])
+        payload = self.message(channel_id, user, content, member=member)
+        await self.dispatch("MESSAGE_CREATE", payload)
+        return payload
+
+    async def click_button(self, user, channel_id, custom_id, message_id=None):
+        member = self.members.get(user["id"]) or self.member(user)
+        message = self.message(channel_id, self.bot_user)
+        if message_id:
+            message["id"] = str(message_id)
+        interaction_id = self.next_id()
+        await self.dispatch("INTERACTION_CREATE", {
+            "id": interaction_id, "application_id": self.bot_user["id"], "type": 3,
+            "token": f"token-{interaction_id}", "version": 1, "guild_id": self.guild_id,
+            "channel_id": str(channel_id), "channel": {"id": str(channel_id), "type": 0},
+            "member": member, "message": message,
+            "data": {"custom_id": custom_id, "component_type": 2},
+            "locale": "pt-BR", "guild_locale": "pt-BR", "app_permissions": "8",
+            "attachment_size_limit": 26214400, "entitlements": [], "authorizing_integration_owners": {}
+        })
+        return interaction_id
+
+    async def add_reaction(self, user, channel_id, message_id, emoji="👍"):
+        member = self.members.get(user["id"]) or self.member(user)
+        await self.dispatch("MESSAGE_REACTION_ADD", {
+            "user_id": user["id"], "channel_id": str(channel_id), "message_id": str(message_id),
+            "guild_id": self.guild_id, "member": member, "emoji": {"id": None, "name": emoji},
+            "burst": False, "type": 0
+        })
+
+
+def json_response(data, status=200, headers=None):
+    """JSON response with the exact Content-Type discord.py checks for (no charset)"""
+    return web.Response(
+        body=json.dumps(data).encode(), status=status,
+        headers={**(headers or {}), "Content-Type": "application/json"}
+    )
+
+
+def _template(path):
+    """Collapse snowflakes and tokens so routes aggregate"""
+    return "/".join("{id}" if part.isdigit() or part.startswith("token-") else part for part in path.strip("/").split("/"))
+
+
+def point_bot_at(base_url):
+    """Send discord.py's REST and gateway traffic to a fake server (e.g. "http://127.0.0.1:8080").
+
+    Call it in the bot's process before it logs in.
+    """
+    import yarl
+    import discord.http
+    import discord.gateway
+
+    discord.http.Route.BASE = base_url + API_PREFIX
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(base_url.replace("http", "ws", 1) + "/gateway")
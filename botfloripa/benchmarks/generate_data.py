@@ -0,0 +1,373 @@
+"""Generate a populated bot_data.db for benchmarks and load tests.
+
+Creates the bot's schema (utils.db.setup_database) and fills it with
+synthetic but realistically shaped data:
+
+  allowlist, allowlist_attempts, allowlist_answers
+      most users apply once, some retry after being rejected; applications
+      come in bursts (launch days, events) on top of a steady trickle;
+      every attempt has one Portuguese answer per configured question,
+      scored consistently with the attempt's score and status
+  warnings, bans
+      skewed towards repeat offenders: a small share of users collects most
+      of the warnings and bans; bans mix permanent and temporary ones and
+      belong to one of --guilds guilds
+  suggestions
+      Portuguese texts with a long-tailed length, some close to the embed
+      limit, in every status the suggestions cog uses
+  temp_channels
+      open whitelist/allowlist channels, a few of them orphaned and old,
+      spread over the same guilds
+  allowlist_stats, allowlist_stats_hourly
+      derived from the generated attempts, as the write functions would
+
+Rows are produced by generators and written in chunks with executemany inside
+one large transaction (journal and fsync off while generating): about 150
+thousand rows per second, split roughly evenly between building the rows in
+Python and SQLite inserting them. The same --seed produces the same rows;
+timestamps are relative to the current time unless --now pins it.
+
+Usage (from the botfloripa directory):
+    python benchmarks/generate_data.py bench.db [--users 100000] [--warnings N] [--bans N]
+        [--suggestions N] [--temp-channels N] [--guilds 1] [--answered 1.0] [--seed 43] [--now UNIX_TIME]
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+from collections import Counter
+from datetime import datetime
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+USER_ID_BASE = 300000000000000000
+MESSAGE_ID_BASE = 900000000000000000
+CHANNEL_ID_BASE = 700000000000000000
+GUILD_ID_BASE = 800000000000000000
+CHUNK = 20000
+DAY = 86400
+
+MODERATORS = [200000000000000000 + i for i in range(15)]
+WARNING_REASONS = [
+    "Anti RP em ação policial", "Metagaming no rádio", "Powergaming em perseguição",
+    "Desrespeito no chat geral", "Combat logging durante abordagem", "Flood no canal de sugestões",
+    "Uso de informações de fora do jogo", "Não valorizou a vida em assalto", "Ofensa a outro jogador",
+    "RDM na praça", "VDM com viatura", "Linguagem inadequada no canal de voz"
+]
+BAN_REASONS = [
+    "Reincidência em anti RP", "Uso de programas ilegais", "Combat logging recorrente",
+    "Ameaças a membros da staff", "Divulgação de outro servidor", "Dark RP sem autorização"
+]
+SUGGESTION_SENTENCES = [
+    "Seria interessante adicionar mais empregos legais na cidade.",
+    "Os preços dos veículos na concessionária estão muito altos para quem está começando.",
+    "Poderiam criar um sistema de aluguel de apartamentos no centro.",
+    "A polícia precisa de mais viaturas disponíveis no turno da noite.",
+    "Sugiro um evento semanal de corrida com premiação em dinheiro do jogo.",
+    "O hospital poderia ter mais leitos e um sistema de fila para atendimento.",
+    "Acho que as regras de safe-zone deveriam ficar mais claras no Discord.",
+    "Seria bom ter uma rádio da cidade com músicas escolhidas pelos jogadores.",
+    "Os mecânicos deveriam conseguir personalizar mais peças dos carros.",
+    "Poderiam revisar o tempo de prisão para crimes leves.",
+    "Gostaria de ver mais lojas de roupas espalhadas pelo mapa.",
+    "A economia do servidor está desequilibrada depois da última atualização.",
+    "Que tal criar uma prefeitura com eleições entre os moradores?",
+    "O sistema de fome e sede está consumindo rápido demais.",
+    "Sugiro adicionar mais pontos de ônibus e uma linha circular."
+]
+SUGGESTION_STATUSES = ["pending"] * 55 + ["approved"] * 15 + ["rejected"] * 18 + ["considering"] * 7 + ["implemented"] * 5
+ANSWER_FILLERS = [
+    "", " Pelo menos foi o que eu aprendi lendo as regras.", " Acho que é isso.",
+    " Já vi acontecer em outros servidores.", " Por isso é proibido aqui."
+]
+WRONG_ANSWERS = [
+    "Não sei responder essa.", "Acho que é quando o servidor cai.", "Pergunta difícil, prefiro pular.",
+    "Depende da situação, cada caso é um caso.", "É quando alguém rouba um carro.",
+    "Nunca ouvi falar disso antes.", "É uma regra do jogo, mas não lembro qual."
+]
+
+
+def load_questions():
+    with open(os.path.join(BOT_DIR, "config.json")) as f:
+        allowlist = json.load(f).get('allowlist', {})
+    return allowlist.get('questions', []), allowlist.get('correct_answers', []), allowlist.get('passing_score', 7)
+
+
+class Generator:
+    def __init__(self, seed, now=None):
+        self.rng = random.Random(seed)
+        self.now = now or time.time()
+        self.tz = datetime.now().astimezone().tzinfo
+        # Launch day plus a handful of events over the last year concentrate applications
+        self.bursts = [self.now - 365 * DAY] + [self.now - self.rng.uniform(0, 360) * DAY for _ in range(8)]
+        self.questions, self.correct, self.passing = load_questions()
+        self.right_answers = [[answer + filler for filler in ANSWER_FILLERS] for answer in self.correct]
+        # Question bitmasks grouped by how many questions they mark as right, so picking which
+        # answers of an attempt are correct is one random index instead of random.sample()
+        self.masks = None
+        if len(self.questions) <= 16:
+            self.masks = [[] for _ in range(len(self.questions) + 1)]
+            for mask in range(1 << len(self.questions)):
+                self.masks[bin(mask).count("1")].append(mask)
+        self.hourly = Counter()
+        self.statuses = Counter()
+
+    def iso(self, ts):
+        return datetime.fromtimestamp(ts, self.tz).isoformat()
+
+    def application_time(self):
+        rng = self.rng
+        if rng.random() < 0.35:
+            ts = rng.choice(self.bursts) + abs(rng.gauss(0, 6 * 3600))
+        else:
+            ts = self.now - rng.random() * 365 * DAY
+        return min(ts, self.now - 60)
+
+    def offender(self, users):
+        """Skewed user pick: the lowest indexes are the repeat offenders"""
+        return USER_ID_BASE + int(users * self.rng.random() ** 4)
+
+    def right_questions(self, score):
+        """Bitmask of `score` questions answered correctly"""
+        if self.masks is not None:
+            masks = self.masks[score]
+            return masks[int(self.rng.random() * len(masks))]
+        return sum(1 << q for q in self.rng.sample(range(len(self.questions)), score))
+
+    def record_event(self, ts, event):
+        self.hourly[(int(ts) // 3600, event)] += 1
+
+    # -- allowlist --------------------------------------------------------
+
+    def applications(self, users, answered):
+        """Yield (allowlist, attempts, answers) row lists for each chunk of users"""
+        rng = self.rng
+        random = rng.random
+        wrong = len(WRONG_ANSWERS)
+        allowlist, attempts, answers = [], [], []
+        count = len(self.questions)
+        numbered = [(q, q + 1, self.questions[q], self.right_answers[q]) for q in range(count)]
+        for index in range(users):
+            user_id = USER_ID_BASE + index
+            tries = 1 + (rng.random() < 0.25) + (rng.random() < 0.07) + (rng.random() < 0.02)
+            ts = self.application_time()
+            for attempt in range(1, tries + 1):
+                last = attempt == tries
+                if not last:
+                    status = "rejected"
+                elif self.now - ts < 2 * DAY and rng.random() < 0.6:
+                    status = "pending"
+                else:
+                    status = rng.choices(("approved", "rejected", "removed"), (70, 27, 3))[0]
+
+                if status in ("approved", "removed"):
+                    score = rng.randint(self.passing, count)
+                elif status == "rejected":
+                    score = rng.randint(0, max(self.passing - 1, 0))
+                else:
+                    score = rng.randint(0, count)
+                decided_at = None if status == "pending" else ts + rng.uniform(60, 12 * 3600)
+                decided_by = rng.choice(MODERATORS) if decided_at else None
+                attempts.append((
+                    user_id, attempt, status, score, self.iso(ts), decided_by,
+                    self.iso(decided_at) if decided_at else None
+                ))
+                self.record_event(ts, "applied")
+                if status in ("approved", "rejected"):
+                    self.record_event(decided_at, status)
+                elif status == "removed":
+                    # Approved first, then removed from the allowlist by staff
+                    self.record_event(decided_at, "approved")
+                    self.record_event(min(decided_at + rng.uniform(1, 60) * DAY, self.now), "removed")
+
+                if count and random() < answered:
+                    right = self.right_questions(score)
+                    stamp = self.iso(ts)
+                    answers.extend([
+                        (user_id, attempt, question_id, question, pool[int(random() * len(pool))], 1, stamp)
+                        if right >> bit & 1 else
+                        (user_id, attempt, question_id, question, WRONG_ANSWERS[int(random() * wrong)], 0, stamp)
+                        for bit, question_id, question, pool in numbered
+                    ])
+
+                if last and status != "removed":
+                    allowlist.append((
+                        user_id, decided_by if status == "approved" else None,
+                        self.iso(decided_at) if status == "approved" else None, status, attempt
+                    ))
+                    self.statuses[status] += 1
+                ts = min(ts + rng.uniform(1, 30) * DAY, self.now - 60)
+
+            if len(attempts) >= CHUNK:
+                yield allowlist, attempts, answers
+                allowlist, attempts, answers = [], [], []
+        if attempts:
+            yield allowlist, attempts, answers
+
+    # -- moderation -------------------------------------------------------
+
+    def warnings(self, count, users):
+        rng = self.rng
+        for _ in range(count):
+            ts = self.now - rng.random() ** 2 * 365 * DAY
+            # Older warnings are more likely to have been cleared
+            active = rng.random() < (0.9 if self.now - ts < 30 * DAY else 0.3)
+            yield self.offender(users), rng.choice(MODERATORS), rng.choice(WARNING_REASONS), self.iso(ts), active
+
+    def bans(self, count, users, guild_ids):
+        rng = self.rng
+        for _ in range(count):
+            ts = self.now - rng.random() * 365 * DAY
+            if rng.random() < 0.45:
+                expires = None
+                active = rng.random() < 0.75
+            else:
+                expires = ts + rng.choice((3600, 6 * 3600, DAY, 3 * DAY, 7 * DAY, 30 * DAY))
+                active = expires > self.now
+            yield (
+                self.offender(users), rng.choice(MODERATORS), rng.choice(BAN_REASONS), self.iso(ts),
+                self.iso(expires) if expires else None, active, rng.choice(guild_ids)
+            )
+
+    # -- suggestions and channels -----------------------------------------
+
+    def suggestions(self, count, users, channel_id):
+        rng = self.rng
+        for index in range(count):
+            sentences = min(60, int(rng.lognormvariate(1.0, 0.9)) + 1)
+            content = " ".join(rng.choices(SUGGESTION_SENTENCES, k=sentences))[:4000]
+            ts = self.now - rng.random() * 365 * DAY
+            yield (
+                USER_ID_BASE + rng.randrange(users), content, MESSAGE_ID_BASE + index, channel_id,
+                self.iso(ts), rng.choice(SUGGESTION_STATUSES)
+            )
+
+    def temp_channels(self, count, users, guild_ids):
+        rng = self.rng
+        for index in range(count):
+            # Most channels belong to sessions in progress; a few are orphans left by crashes
+            age = rng.uniform(0, 3600) if rng.random() < 0.9 else rng.uniform(1, 7) * DAY
+            purpose = "whitelist" if rng.random() < 0.85 else "allowlist"
+            yield (
+                CHANNEL_ID_BASE + index, USER_ID_BASE + rng.randrange(users), self.iso(self.now - age), purpose,
+                rng.choice(guild_ids)
+            )
+
+
+def generate(path, users=100000, warnings=None, bans=None, suggestions=None, temp_channels=None,
+             answered=1.0, seed=43, now=None, suggestions_channel=1, guilds=1):
+    """Create and fill the database at `path`; returns {table: rows}.
+
+    Timestamps are spread over the year before `now` (default: the current
+    time), so queries over "the last 24 hours" find data. Pass a fixed `now`
+    to get byte-identical databases from the same seed. Bans and temp
+    channels get a guild_id among GUILD_ID_BASE .. GUILD_ID_BASE + guilds - 1.
+    """
+    from utils import db
+
+    warnings = users // 2 if warnings is None else warnings
+    bans = users // 20 if bans is None else bans
+    suggestions = users // 5 if suggestions is None else suggestions
+    temp_channels = min(users, 200) if temp_channels is None else temp_channels
+
+    if os.path.exists(path):
+        os.remove(path)
+    previous_path = db.DB_PATH
+    db.DB_PATH = path
+    try:
+        db.setup_database()
+    finally:
+        db.DB_PATH = previous_path
+
+    gen = Generator(seed, now)
+    guild_ids = [GUILD_ID_BASE + index for index in range(guilds)]
+    counts = Counter()
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -200000")
+    conn.execute("BEGIN")
+    try:
+        for allowlist, attempts, answers in gen.applications(users, answered):
+            conn.executemany("INSERT INTO allowlist (user_id, approved_by, approved_at, status, attempt) VALUES (?, ?, ?, ?, ?)", allowlist)
+            conn.executemany(
+                "INSERT INTO allowlist_attempts (user_id, attempt, status, score, created_at, decided_by, decided_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                attempts
+            )
+            conn.executemany(
+                "INSERT INTO allowlist_answers (user_id, attempt, question_id, question, answer, score, answered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                answers
+            )
+            counts["allowlist"] += len(allowlist)
+            counts["allowlist_attempts"] += len(attempts)
+            counts["allowlist_answers"] += len(answers)
+
+        tables = (
+            ("warnings", "INSERT INTO warnings (user_id, moderator_id, reason, timestamp, active) VALUES (?, ?, ?, ?, ?)",
+             gen.warnings(warnings, users)),
+            ("bans", "INSERT INTO bans (user_id, moderator_id, reason, timestamp, expires_at, active, guild_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+             gen.bans(bans, users, guild_ids)),
+            ("suggestions", "INSERT INTO suggestions (user_id, content, message_id, channel_id, timestamp, status) VALUES (?, ?, ?, ?, ?, ?)",
+             gen.suggestions(suggestions, users, suggestions_channel)),
+            ("temp_channels", "INSERT INTO temp_channels (channel_id, user_id, created_at, purpose, guild_id) VALUES (?, ?, ?, ?, ?)",
+             gen.temp_channels(temp_channels, users, guild_ids))
+        )
+        for table, sql, rows in tables:
+            before = conn.total_changes
+            conn.executemany(sql, rows)
+            counts[table] += conn.total_changes - before
+
+        conn.execute("DELETE FROM allowlist_stats")
+        conn.executemany("INSERT INTO allowlist_stats (status, count) VALUES (?, ?)", gen.statuses.items())
+        conn.executemany(
+            "INSERT INTO allowlist_stats_hourly (bucket, event, count) VALUES (?, ?, ?)",
+            (
+                (datetime.fromtimestamp(hour * 3600, gen.tz).strftime("%Y-%m-%d %H:00"), event, n)
+                for (hour, event), n in sorted(gen.hourly.items())
+            )
+        )
+        counts["allowlist_stats_hourly"] = len(gen.hourly)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return dict(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="database file to create (overwritten if it exists)")
+    parser.add_argument("--users", type=int, default=100000, help="applicants in the allowlist")
+    parser.add_argument("--warnings", type=int, help="default: users / 2")
+    parser.add_argument("--bans", type=int, help="default: users / 20")
+    parser.add_argument("--suggestions", type=int, help="default: users / 5")
+    parser.add_argument("--temp-channels", type=int, help="default: min(users, 200)")
+    parser.add_argument("--guilds", type=int, default=1, help="guilds the bans and temp channels are spread over")
+    parser.add_argument("--answered", type=float, default=1.0, help="fraction of attempts that keep their answers")
+    parser.add_argument("--seed", type=int, default=43)
+    parser.add_argument("--now", type=float, help="unix time the data is generated relative to (default: current time)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate(
+        args.path, users=args.users, warnings=args.warnings, bans=args.bans, suggestions=args.suggestions,
+        temp_channels=args.temp_channels, answered=args.answered, seed=args.seed, now=args.now,
+        guilds=args.guilds
+    )
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    for table, rows in counts.items():
+        print(f"{table:<24} {rows:>12,}")
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s), {os.path.getsize(args.path) / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
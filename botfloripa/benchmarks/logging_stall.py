@@ -0,0 +1,125 @@
+"""Measure event-loop stalls caused by logging from coroutines.
+
+Runs the same workload twice in fresh interpreters: a ticker coroutine that
+wakes every millisecond and records how late it was, next to producer
+coroutines that log in bursts. "sync" is the old setup (FileHandler and
+StreamHandler called on the loop), "queue" is utils.logging_setup. Console
+output goes to /dev/null in both modes so only the handler cost differs.
+--io-latency-us adds a sleep to every file write in both modes to emulate a
+slow or busy disk (0 measures the local disk as is).
+
+Usage (from the botfloripa directory):
+    python benchmarks/logging_stall.py [--messages 50000] [--burst 200] [--format text|json] [--io-latency-us 0]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import sys, json, time, asyncio, logging
+
+mode, log_path, messages, burst, fmt = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), sys.argv[5]
+io_latency = int(sys.argv[6]) / 1_000_000
+
+if io_latency:
+    _emit = logging.FileHandler.emit
+    def slow_emit(self, record):
+        time.sleep(io_latency)
+        _emit(self, record)
+    logging.FileHandler.emit = slow_emit
+
+if mode == "sync":
+    from utils.logging_setup import TEXT_FORMAT, JsonFormatter
+    formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.FileHandler(log_path), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    logging.basicConfig(level=logging.INFO, handlers=handlers)
+    listener = None
+else:
+    from utils.logging_setup import setup_logging
+    listener = setup_logging({"file": log_path, "format": fmt, "rotation": "size", "max_bytes": 5 * 1024 * 1024, "compress": True})
+
+logger = logging.getLogger("bot.bench")
+lags = []
+blocked = []
+
+async def ticker(stop):
+    interval = 0.001
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+async def producer(count):
+    for i in range(0, count, burst):
+        t = time.perf_counter()
+        for j in range(i, min(i + burst, count)):
+            logger.info("Application %s processed for user %s with score %s", j, 100000 + j, j % 10)
+        blocked.append(time.perf_counter() - t)
+        await asyncio.sleep(0)
+
+async def main():
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(producer(messages // 4) for _ in range(4)))
+    loop_time = time.perf_counter() - started
+    stop.set()
+    await tick
+    drain = time.perf_counter()
+    if listener:
+        listener.stop()
+    drain = time.perf_counter() - drain
+    lags.sort()
+    print(json.dumps({
+        "loop_s": loop_time,
+        "drain_s": drain,
+        "blocked_s": sum(blocked),
+        "max_burst_ms": max(blocked) * 1000,
+        "lag_p50_ms": lags[len(lags) // 2] * 1000,
+        "lag_p99_ms": lags[int(len(lags) * 0.99)] * 1000,
+        "lag_max_ms": lags[-1] * 1000,
+        "ticks": len(lags)
+    }))
+
+asyncio.run(main())
+'''
+
+
+def run(mode, args, workdir):
+    env = dict(os.environ, PYTHONPATH=BOT_DIR)
+    log_path = os.path.join(workdir, f"{mode}.log")
+    with open(os.devnull, 'w') as devnull:
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD, mode, log_path, str(args.messages), str(args.burst), args.format, str(args.io_latency_us)],
+            cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=devnull, text=True, check=True
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument("--io-latency-us", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="logging_stall_") as workdir:
+        results = {mode: run(mode, args, workdir) for mode in ("sync", "queue")}
+
+    print(f"{args.messages} messages in bursts of {args.burst} ({args.format}, +{args.io_latency_us}us per write)")
+    print(f"{'mode':<6} {'blocked s':>10} {'max burst ms':>13} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11} {'drain s':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['blocked_s']:>10.3f} {r['max_burst_ms']:>13.2f} {r['lag_p50_ms']:>11.3f} "
+              f"{r['lag_p99_ms']:>11.3f} {r['lag_max_ms']:>11.2f} {r['drain_s']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
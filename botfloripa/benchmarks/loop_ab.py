@@ -0,0 +1,196 @@
+"""A/B benchmark of the asyncio default loop against uvloop.
+
+Each loop runs in a fresh interpreter (installed through
+utils.event_loop.install_event_loop) and goes through three workloads that
+mirror the bot's load:
+
+  gateway   a local websocket server streams MESSAGE_CREATE-like JSON
+            frames; the client decodes them and hands them to a consumer
+            task through a queue (events/s, delivery latency)
+  rest      concurrent HTTP requests against a local aiohttp server, like
+            the REST calls made by the cogs (requests/s, latency)
+  wait_for  thousands of futures waiting at once, resolved by a producer,
+            like concurrent whitelist sessions (wakeups/s, wake latency)
+
+Every workload runs flat out, so the latencies include queueing behind the
+backlog; compare them between loops rather than reading them as absolutes.
+
+Usage (from the botfloripa directory):
+    python benchmarks/loop_ab.py [--events 50000] [--requests 5000] [--waiters 5000] [--rounds 3]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import sys, json, time, asyncio
+from utils.event_loop import install_event_loop
+
+loop_name = install_event_loop(sys.argv[1])
+events, requests, waiters = int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+
+from aiohttp import web, ClientSession, TCPConnector
+
+def percentiles(samples):
+    samples.sort()
+    pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+    return {"p50_ms": pick(0.50), "p99_ms": pick(0.99)}
+
+MESSAGE = {
+    "op": 0, "t": "MESSAGE_CREATE", "s": 0,
+    "d": {
+        "id": "1100000000000000000", "channel_id": "1039846254784786432", "guild_id": "1039846254784786400",
+        "content": "!allowlist list pending", "tts": False, "mention_everyone": False,
+        "author": {"id": "200000000000000000", "username": "usuario", "discriminator": "0", "avatar": None},
+        "member": {"roles": ["1039846254784786443"], "joined_at": "2024-01-01T00:00:00+00:00"},
+        "attachments": [], "embeds": [], "mentions": [], "mention_roles": [], "pinned": False, "type": 0
+    }
+}
+
+async def gateway(port):
+    queue = asyncio.Queue()
+    latencies = []
+
+    async def consumer():
+        for _ in range(events):
+            sent_at, payload = await queue.get()
+            latencies.append(time.perf_counter() - sent_at)
+
+    async with ClientSession() as session:
+        async with session.ws_connect(f"http://127.0.0.1:{port}/ws") as ws:
+            task = asyncio.create_task(consumer())
+            started = time.perf_counter()
+            await ws.send_str(str(events))
+            async for msg in ws:
+                data = json.loads(msg.data)
+                if data.get("op") == -1:
+                    break
+                queue.put_nowait((data["sent_at"], data))
+            await task
+            elapsed = time.perf_counter() - started
+    return {"per_s": events / elapsed, **percentiles(latencies)}
+
+async def rest(port):
+    latencies = []
+    semaphore = asyncio.Semaphore(50)
+    async with ClientSession(connector=TCPConnector(limit=50)) as session:
+        async def call(i):
+            async with semaphore:
+                t = time.perf_counter()
+                async with session.post(f"http://127.0.0.1:{port}/api/channels/1/messages", json={"content": f"msg {i}"}) as r:
+                    await r.json()
+                latencies.append(time.perf_counter() - t)
+        started = time.perf_counter()
+        await asyncio.gather(*(call(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+    return {"per_s": requests / elapsed, **percentiles(latencies)}
+
+async def wait_for():
+    loop = asyncio.get_running_loop()
+    futures = [loop.create_future() for _ in range(waiters)]
+    latencies = []
+
+    async def session(future):
+        resolved_at = await asyncio.wait_for(future, timeout=60)
+        latencies.append(time.perf_counter() - resolved_at)
+
+    tasks = [asyncio.create_task(session(f)) for f in futures]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    for future in futures:
+        future.set_result(time.perf_counter())
+        if len(latencies) % 100 == 0:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return {"per_s": waiters / elapsed, **percentiles(latencies)}
+
+async def main():
+    async def ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        count = int((await ws.receive()).data)
+        for i in range(count):
+            await ws.send_str(json.dumps({**MESSAGE, "s": i, "sent_at": time.perf_counter()}))
+        await ws.send_str(json.dumps({"op": -1}))
+        await ws.close()
+        return ws
+
+    async def rest_handler(request):
+        body = await request.json()
+        return web.json_response({"id": "1", "content": body["content"]})
+
+    app = web.Application()
+    app.router.add_get("/ws", ws_handler)
+    app.router.add_post("/api/channels/{channel_id}/messages", rest_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        result = {
+            "loop": loop_name,
+            "gateway": await gateway(port),
+            "rest": await rest(port),
+            "wait_for": await wait_for()
+        }
+    finally:
+        await runner.cleanup()
+    print(json.dumps(result))
+
+asyncio.run(main())
+'''
+
+
+def run(loop, args):
+    env = dict(os.environ, PYTHONPATH=BOT_DIR)
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, loop, str(args.events), str(args.requests), str(args.waiters)],
+        env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--waiters", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    probe = run("uvloop", argparse.Namespace(events=10, requests=10, waiters=10))
+    loops = ["asyncio", "uvloop"] if probe["loop"].startswith("uvloop") else ["asyncio"]
+    if len(loops) == 1:
+        print("uvloop is not installed; only the asyncio loop will be measured (pip install uvloop)")
+
+    results = {loop: [] for loop in loops}
+    # Alternate the loops each round so machine noise hits both equally
+    for _ in range(args.rounds):
+        for loop in loops:
+            results[loop].append(run(loop, args))
+
+    print(f"{'loop':<16} {'workload':<9} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}   (median of {args.rounds} rounds)")
+    medians = {}
+    for loop, rounds in results.items():
+        name = rounds[0]["loop"]
+        for workload in ("gateway", "rest", "wait_for"):
+            row = {key: statistics.median(r[workload][key] for r in rounds) for key in ("per_s", "p50_ms", "p99_ms")}
+            medians[(loop, workload)] = row
+            print(f"{name:<16} {workload:<9} {row['per_s']:>10.0f} {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+
+    if len(loops) == 2:
+        print()
+        for workload in ("gateway", "rest", "wait_for"):
+            base, fast = medians[("asyncio", workload)], medians[("uvloop", workload)]
+            print(f"{workload:<9} uvloop throughput x{fast['per_s'] / base['per_s']:.2f}, p99 {fast['p99_ms'] - base['p99_ms']:+.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Measure the member-cache profiles against a fake guild of 10k or 100k members.
+
+For every --profiles x --members combination the real bot from main.py logs
+in against benchmarks/fake_discord.py with member_cache.profile set in a
+scratch copy of config.json. The fake guild is "large", so members only
+reach the bot through chunking (REQUEST_GUILD_MEMBERS) or fetch_member.
+Once on_ready fires, the bot process reports:
+
+  ready      seconds from process start to on_ready; with the full profile
+             discord.py holds on_ready until every guild is chunked
+  rss        resident memory at that point (Linux /proc), and the difference
+             to the minimal profile at the same size
+  cached     members held in the guild cache
+  lookup     MemberResolver.get() latency for --lookups random members: the
+             first pass misses (a REST round trip unless the member is
+             cached), the second pass hits the gateway cache or the LRU
+
+The REST latency of the fake is --latency-ms; pick something close to what
+the bot sees from its host (Discord typically answers in 50-150ms).
+
+Usage (from the botfloripa directory):
+    python benchmarks/member_cache.py [--members 10000 100000] [--profiles minimal lazy full]
+        [--lookups 200] [--latency-ms 40 120]
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeDiscord  # noqa: E402
+from whitelist_load import build_guild, percentile, _tail  # noqa: E402
+
+RESULT_PREFIX = "MEMBER_CACHE_RESULT "
+
+# The bot as main.py would run it; measures itself once on_ready fires
+CHILD = r'''
+import sys, json, time, asyncio
+from benchmarks.fake_discord import point_bot_at
+
+point_bot_at(sys.argv[1])
+started_at = float(sys.argv[2])
+
+import main
+from utils.db import setup_database
+
+def rss_bytes():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return None
+
+async def measure():
+    ready = time.time() - started_at
+    guild = main.bot.guilds[0]
+    rss = rss_bytes()
+    with open("lookup_ids.json") as f:
+        ids = json.load(f)
+    passes = []
+    for _ in range(2):
+        samples = []
+        for user_id in ids:
+            t0 = time.perf_counter()
+            await main.bot.member_resolver.get(guild, user_id)
+            samples.append(time.perf_counter() - t0)
+        passes.append(samples)
+    print("''' + RESULT_PREFIX + r'''" + json.dumps({
+        "ready_s": ready, "rss": rss, "cached": len(guild.members),
+        "members_intent": main.bot.intents.members, "cold": passes[0], "warm": passes[1]
+    }), flush=True)
+    await main.bot.close()
+
+@main.bot.listen("on_ready")
+async def start_measurement():
+    main.bot.loop.create_task(measure())
+
+setup_database()
+main.bot.run("fake-token", log_handler=None)
+'''
+
+
+async def run_case(args, profile, members, workdir):
+    config = json.load(open(os.path.join(BOT_DIR, "config.json")))
+    config['member_cache'] = dict(config.get('member_cache', {}), profile=profile)
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump(config, f)
+
+    fake = FakeDiscord(latency=(args.latency_ms[0] / 1000, args.latency_ms[1] / 1000), seed=args.seed)
+    await fake.start()
+    build_guild(fake, config)
+    fake.populate(members)
+    rng = random.Random(args.seed)
+    with open(os.path.join(workdir, "lookup_ids.json"), "w") as f:
+        json.dump([int(user_id) for user_id in rng.sample(sorted(fake.members), args.lookups)], f)
+
+    out_path = os.path.join(workdir, "bot.out")
+    log = open(out_path, "w")
+    bot = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", CHILD, fake.base_url, str(time.time()),
+        cwd=workdir, env=dict(os.environ, PYTHONPATH=BOT_DIR), stdout=log, stderr=subprocess.STDOUT
+    )
+    try:
+        await asyncio.wait_for(bot.wait(), timeout=args.timeout)
+    except asyncio.TimeoutError:
+        bot.send_signal(signal.SIGINT)
+        await bot.wait()
+    finally:
+        log.close()
+        await fake.stop()
+
+    with open(out_path) as f:
+        for line in f:
+            if line.startswith(RESULT_PREFIX):
+                result = json.loads(line[len(RESULT_PREFIX):])
+                break
+        else:
+            raise RuntimeError(f"The bot did not report ({profile}, {members} members):\n" + _tail(out_path))
+    result["fetch_requests"] = fake.stats["routes"].get("GET /guilds/{id}/members/{id}", 0)
+    return result
+
+
+def summarize_case(result):
+    return {
+        "ready_s": round(result["ready_s"], 2),
+        "rss_mb": round(result["rss"] / 2 ** 20, 1) if result["rss"] else None,
+        "cached": result["cached"],
+        "members_intent": result["members_intent"],
+        "cold_p50_ms": round(percentile(result["cold"], 0.50) * 1000, 2),
+        "cold_p99_ms": round(percentile(result["cold"], 0.99) * 1000, 2),
+        "warm_p50_us": round(percentile(result["warm"], 0.50) * 1e6, 1),
+        "fetch_requests": result["fetch_requests"]
+    }
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--profiles", nargs="+", default=["minimal", "lazy", "full"])
+    parser.add_argument("--lookups", type=int, default=200, help="members looked up by the resolver")
+    parser.add_argument("--latency-ms", type=float, nargs=2, default=(40, 120), help="fake REST latency range")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=46)
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args()
+
+    report = {}
+    for members in args.members:
+        for profile in args.profiles:
+            workdir = tempfile.mkdtemp(prefix="member-cache-")
+            try:
+                result = asyncio.run(run_case(args, profile, members, workdir))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            report[f"{profile}@{members}"] = summarize_case(result)
+            print(f"{profile}@{members}: {report[f'{profile}@{members}']}", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'case':<16} {'ready s':>8} {'rss MB':>8} {'+MB':>7} {'cached':>8} {'miss p50 ms':>12} {'miss p99 ms':>12} {'hit p50 us':>11} {'fetches':>8}")
+    for key, row in report.items():
+        baseline = report.get(f"minimal@{key.split('@')[1]}")
+        extra = row["rss_mb"] - baseline["rss_mb"] if baseline and row["rss_mb"] and baseline["rss_mb"] else None
+        print(
+            f"{key:<16} {row['ready_s']:>8} {row['rss_mb']!s:>8} {'-' if extra is None else f'{extra:+.1f}':>7} "
+            f"{row['cached']:>8} {row['cold_p50_ms']:>12} {row['cold_p99_ms']:>12} {row['warm_p50_us']:>11} {row['fetch_requests']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,344 @@
+"""Drive simulated whitelist applicants through the real bot, offline.
+
+The bot from main.py (real cogs, database and discord.py HTTP/gateway code)
+logs in against benchmarks/fake_discord.py instead of Discord. Each simulated
+applicant:
+
+  1. joins the guild (GUILD_MEMBER_ADD)
+  2. clicks "Iniciar Whitelist" on the panel (INTERACTION_CREATE routed to
+     WhitelistButton), which makes the bot create a private channel
+  3. answers every question embed the bot posts in that channel with a
+     MESSAGE_CREATE after a random think time (most answers are correct,
+     some are wrong, so both result branches run)
+  4. waits for the "Whitelist Aprovada/Reprovada" result embed (or "Tempo
+     Esgotado", when an answer was lost)
+
+Approved applicants then rejoin, which exercises the role edits in
+on_member_join, and a trickle of reactions on the suggestions channel makes
+the lazy suggestions extension load. Applicants arrive at --arrival-rate per
+second, so sessions overlap the way a busy launch day would.
+
+Answers racing the question: with --reply-delay-ms the fake holds the
+response to each message the bot sends while the applicant already sees it,
+so with --think-ms 0 0 the answer reaches the bot before its send() returns.
+An answer the bot was not yet waiting for is lost and the session ends in
+"Tempo Esgotado":
+
+    python benchmarks/whitelist_load.py --applicants 50 --think-ms 0 0 --reply-delay-ms 100
+
+should report 0 timed out.
+
+Reported: sessions per second, click-to-result latency (the fixed 3s welcome
+pause and the think times included), and the bot's reaction time from an
+answer to the next question (p50/p95/p99), plus REST traffic, 429s and any
+route the fake does not implement.
+
+The bot runs in its own interpreter, in a scratch directory with a copy of
+config.json, so the real database and log file are not touched and the
+harness does not steal the bot's CPU time (on a single core it still
+shares the machine; keep that in mind when reading the tail latencies).
+
+Usage (from the botfloripa directory):
+    python benchmarks/whitelist_load.py [--applicants 1000] [--arrival-rate 50]
+        [--think-ms 50 250] [--latency-ms 20 80] [--rate-limit 0.02] [--wrong-ratio 0.2]
+        [--reply-delay-ms 0]
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import signal
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeDiscord  # noqa: E402
+
+# The bot as main.py would run it, only pointed at the fake
+CHILD = r'''
+import sys
+from benchmarks.fake_discord import point_bot_at
+from utils.event_loop import install_event_loop
+
+point_bot_at(sys.argv[1])
+install_event_loop(sys.argv[2])
+
+import main
+from utils.db import setup_database
+
+setup_database()
+main.bot.run("fake-token", log_handler=None)
+'''
+
+QUESTION_TITLE = re.compile(r"^(\d+)\. ")
+RESULT_TITLES = ("✅ Whitelist Aprovada", "❌ Whitelist Reprovada")
+TIMEOUT_TITLE = "Tempo Esgotado"
+WRONG_ANSWERS = [
+    "Não sei responder essa.",
+    "Acho que é quando o servidor cai.",
+    "Pergunta difícil, prefiro pular.",
+    "Depende da situação, cada caso é um caso."
+]
+# Applicant accounts must be older than min_account_age_days
+ACCOUNT_CREATED_AT = 1609459200  # 2021-01-01
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": _ms(percentile(samples, 0.50)),
+        "p95_ms": _ms(percentile(samples, 0.95)),
+        "p99_ms": _ms(percentile(samples, 0.99)),
+        "max_ms": _ms(max(samples) if samples else None)
+    }
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 1)
+
+
+class Applicant:
+    __slots__ = ("user", "wrong", "channel_id", "clicked_at", "answered_at", "finished_at", "result", "reactions")
+
+    def __init__(self, user, wrong):
+        self.user = user
+        self.wrong = wrong
+        self.channel_id = None
+        self.clicked_at = None
+        self.answered_at = None
+        self.finished_at = None
+        self.result = None
+        self.reactions = []
+
+
+class WhitelistScenario:
+    def __init__(self, fake, config, args):
+        self.fake = fake
+        self.config = config
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.applicants = {}
+        self.by_channel = {}
+        self.done = asyncio.Event()
+        self.finished = 0
+        self.panel_channel = fake.add_channel("whitelist")
+
+        fake.on_channel_create = self.on_channel_create
+        fake.on_bot_message = self.on_bot_message
+
+    async def on_channel_create(self, channel, body):
+        # The applicant is the only member overwrite (type 1) on the new channel
+        for overwrite in body.get("permission_overwrites", []):
+            applicant = self.applicants.get(str(overwrite["id"]))
+            if overwrite.get("type") == 1 and applicant:
+                applicant.channel_id = channel["id"]
+                self.by_channel[channel["id"]] = applicant
+                return
+
+    async def on_bot_message(self, channel_id, payload):
+        applicant = self.by_channel.get(channel_id)
+        if applicant is None or not payload["embeds"]:
+            return
+        title = payload["embeds"][0].get("title") or ""
+        now = time.perf_counter()
+
+        match = QUESTION_TITLE.match(title)
+        if match:
+            if applicant.answered_at is not None:
+                applicant.reactions.append(now - applicant.answered_at)
+            index = int(match.group(1)) - 1
+            await asyncio.sleep(self.random.uniform(*self.args.think_ms) / 1000)
+            applicant.answered_at = time.perf_counter()
+            await self.fake.user_message(channel_id, applicant.user, self.answer(applicant, index))
+        elif title.startswith(RESULT_TITLES + (TIMEOUT_TITLE,)) and applicant.result is None:
+            applicant.finished_at = now
+            if title == TIMEOUT_TITLE:
+                # The answer reached the bot before its wait_for was registered and was dropped
+                applicant.result = "timed_out"
+            else:
+                applicant.reactions.append(now - applicant.answered_at)
+                applicant.result = "approved" if title.startswith(RESULT_TITLES[0]) else "rejected"
+            self.finished += 1
+            if applicant.result == "approved":
+                # Rejoining runs on_member_join, which re-applies the resident roles
+                await self.fake.member_join(applicant.user, roles=[self.config['roles']['tourist']])
+            if self.finished == len(self.applicants):
+                self.done.set()
+
+    def answer(self, applicant, index):
+        correct = self.config['allowlist']['correct_answers'][index]
+        if applicant.wrong and index % 3 == 0:
+            return self.random.choice(WRONG_ANSWERS)
+        return f"{correct} Pelo menos foi o que eu aprendi lendo as regras."
+
+    async def run_applicant(self, applicant):
+        await self.fake.member_join(applicant.user, roles=[self.config['roles']['tourist']])
+        applicant.clicked_at = time.perf_counter()
+        await self.fake.click_button(applicant.user, self.panel_channel, "iniciar_whitelist")
+
+    async def reactions(self, suggestions_channel):
+        # Background noise on the lazily loaded suggestions cog
+        voter = self.fake.user("votante", created_at=ACCOUNT_CREATED_AT)
+        while not self.done.is_set():
+            await self.fake.add_reaction(voter, suggestions_channel, self.fake.next_id())
+            await asyncio.sleep(0.5)
+
+    async def run(self):
+        for i in range(self.args.applicants):
+            user = self.fake.user(f"candidato{i}", created_at=ACCOUNT_CREATED_AT + i)
+            self.applicants[user["id"]] = Applicant(user, wrong=self.random.random() < self.args.wrong_ratio)
+
+        noise = self.fake.spawn(self.reactions(str(self.config['channels']['suggestions'])))
+        started = time.perf_counter()
+        for applicant in self.applicants.values():
+            self.fake.spawn(self.run_applicant(applicant))
+            await asyncio.sleep(self.random.expovariate(self.args.arrival_rate))
+        try:
+            await asyncio.wait_for(self.done.wait(), timeout=self.args.timeout)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - started
+        noise.cancel()
+        return elapsed
+
+    def report(self, elapsed):
+        finished = [a for a in self.applicants.values() if a.result]
+        sessions = [a.finished_at - a.clicked_at for a in finished if a.result != "timed_out"]
+        reactions = [r for a in finished for r in a.reactions]
+        return {
+            "applicants": len(self.applicants),
+            "finished": len(finished),
+            "approved": sum(1 for a in finished if a.result == "approved"),
+            "rejected": sum(1 for a in finished if a.result == "rejected"),
+            "timed_out": sum(1 for a in finished if a.result == "timed_out"),
+            "no_channel": sum(1 for a in self.applicants.values() if a.channel_id is None),
+            "elapsed_s": round(elapsed, 2),
+            "sessions_per_s": round(len(finished) / elapsed, 2) if elapsed else None,
+            "session_latency": summarize(sessions),
+            "answer_to_next_question": summarize(reactions),
+            "rest": {
+                "requests": self.fake.stats["requests"],
+                "rate_limited": self.fake.stats["rate_limited"],
+                "unhandled": self.fake.stats["unhandled"],
+                "by_route": dict(sorted(self.fake.stats["routes"].items(), key=lambda item: -item[1])[:12])
+            }
+        }
+
+
+def build_guild(fake, config):
+    """Mirror the ids from config.json so the cogs find their channels and roles"""
+    channels = config['channels']
+    category = str(channels['allowlist_category'])
+    fake.add_channel("whitelists", channel_id=category, channel_type=4)
+    for name, channel_id in channels.items():
+        if name != 'allowlist_category':
+            fake.add_channel(name, channel_id=channel_id)
+    for position, (name, role_id) in enumerate(config['roles'].items(), start=1):
+        fake.add_role(name, role_id=role_id, position=position)
+
+
+async def main(args, workdir):
+    config = json.load(open(os.path.join(workdir, "config.json")))
+    fake = FakeDiscord(
+        latency=(args.latency_ms[0] / 1000, args.latency_ms[1] / 1000),
+        rate_limit_ratio=args.rate_limit,
+        bucket_limit=args.bucket_limit,
+        reply_delay=args.reply_delay_ms / 1000,
+        seed=args.seed
+    )
+    await fake.start()
+    build_guild(fake, config)
+    scenario = WhitelistScenario(fake, config, args)
+
+    log = open(os.path.join(workdir, "bot.out"), "w")
+    bot = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", CHILD, fake.base_url, args.event_loop,
+        cwd=workdir, env=dict(os.environ, PYTHONPATH=BOT_DIR), stdout=log, stderr=subprocess.STDOUT
+    )
+    try:
+        identified = asyncio.create_task(fake.identified.wait())
+        exited = asyncio.create_task(bot.wait())
+        await asyncio.wait({identified, exited}, timeout=60, return_when=asyncio.FIRST_COMPLETED)
+        if not identified.done():
+            raise RuntimeError("The bot did not connect to the fake gateway:\n" + _tail(os.path.join(workdir, "bot.out")))
+
+        elapsed = await scenario.run()
+        # Let the follow-up work (result DMs, rejoin role edits) finish before shutting down;
+        # channel deletions scheduled 30s out are left pending
+        await fake.wait_idle()
+        return scenario.report(elapsed)
+    finally:
+        if bot.returncode is None:
+            bot.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(bot.wait(), timeout=10)
+            except asyncio.TimeoutError:
+                bot.kill()
+        log.close()
+        await fake.stop()
+
+
+def _tail(path, lines=30):
+    with open(path) as f:
+        return "".join(f.readlines()[-lines:])
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--applicants", type=int, default=1000)
+    parser.add_argument("--arrival-rate", type=float, default=50, help="new applicants per second")
+    parser.add_argument("--think-ms", type=float, nargs=2, default=(50, 250), help="answer delay range")
+    parser.add_argument("--latency-ms", type=float, nargs=2, default=(20, 80), help="fake REST latency range")
+    parser.add_argument("--rate-limit", type=float, default=0.02, help="fraction of REST calls answered 429 first")
+    parser.add_argument("--reply-delay-ms", type=float, default=0, help="hold the reply to the bot's messages after applicants see them")
+    parser.add_argument("--bucket-limit", type=int, default=5, help="concurrent requests allowed per rate limit bucket")
+    parser.add_argument("--wrong-ratio", type=float, default=0.2, help="fraction of applicants who get answers wrong")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--event-loop", default="asyncio", choices=("asyncio", "uvloop", "auto"), help="loop used by the bot")
+    parser.add_argument("--seed", type=int, default=41)
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="whitelist-load-")
+    shutil.copy(os.path.join(BOT_DIR, "config.json"), workdir)
+    try:
+        report = asyncio.run(main(args, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{report['finished']}/{report['applicants']} sessions finished in {report['elapsed_s']}s "
+          f"({report['sessions_per_s']}/s) · {report['approved']} approved, {report['rejected']} rejected, "
+          f"{report['timed_out']} timed out, {report['no_channel']} without channel")
+    print(f"{'':<26} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for label, key in (("click -> result", "session_latency"), ("answer -> next question", "answer_to_next_question")):
+        row = report[key]
+        print(f"{label:<26} {row['count']:>6} {row['p50_ms']!s:>9} {row['p95_ms']!s:>9} {row['p99_ms']!s:>9} {row['max_ms']!s:>9}")
+    rest = report['rest']
+    print(f"REST: {rest['requests']} requests, {rest['rate_limited']} answered 429")
+    for route, count in rest['by_route'].items():
+        print(f"  {count:>7}  {route}")
+    if rest['unhandled']:
+        print(f"Routes the fake does not implement: {rest['unhandled']}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,196 @@
+"""Run the bot as several processes, each owning a range of shards.
+
+One Python process only ever uses one CPU core. The launcher splits the
+shards into contiguous ranges, starts main.py once per range and keeps the
+processes running:
+
+  - each process receives its cluster id, shard ids, the shard count and the
+    address of the launcher's IPC hub in environment variables (see
+    utils/cluster.py); its log file and metrics port get a per-process
+    suffix/offset
+  - the hub relays cache invalidations (allowlist changes, guild settings
+    changes, question bank edits) between the processes and spaces their
+    IDENTIFYs so that together they stay within Discord's session start limit
+  - a process that exits (a crash, or !restart) is started again, after a
+    growing delay if it keeps dying right after startup
+  - Ctrl+C or SIGTERM stops every process
+
+All processes share bot_data.db; utils/db.py lets SQLite serialize their
+writes (WAL, busy timeout and a retry policy for locked statements).
+
+Usage (from the botfloripa directory):
+    python cluster.py [--processes 2] [--shards 4]
+"""
+import os
+import sys
+import json
+import math
+import signal
+import asyncio
+import logging
+import argparse
+import subprocess
+
+from dotenv import load_dotenv
+
+from utils.cluster import (
+    ClusterHub, CLUSTER_ID_ENV, SHARD_IDS_ENV, SHARD_COUNT_ENV, IPC_ADDRESS_ENV, suffixed_path
+)
+from utils.logging_setup import setup_logging
+
+logger = logging.getLogger("bot.cluster")
+
+# A process that lived longer than this was healthy; its restart delay starts over
+STABLE_AFTER = 60.0
+MAX_RESTART_DELAY = 300.0
+
+
+def shard_ranges(shard_count, processes):
+    """Split shard ids 0..shard_count-1 into contiguous ranges, one per process"""
+    processes = max(1, min(processes, shard_count))
+    per_process = math.ceil(shard_count / processes)
+    return [list(range(start, min(start + per_process, shard_count))) for start in range(0, shard_count, per_process)]
+
+
+async def recommended_shards(token):
+    """(shard count, max_concurrency) recommended by GET /gateway/bot"""
+    import discord
+
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, session_start_limit = await http.get_bot_gateway()
+        return shards, session_start_limit.get('max_concurrency', 1)
+    finally:
+        await http.close()
+
+
+class Cluster:
+    """Starts one bot process per shard range and restarts the ones that exit"""
+
+    def __init__(self, shard_count, processes, hub, argv=None, env=None, restart_delay=5.0, output=None):
+        self.ranges = shard_ranges(shard_count, processes)
+        self.shard_count = shard_count
+        self.hub = hub
+        self.argv = argv or [sys.executable, "main.py"]
+        self.env = env if env is not None else dict(os.environ)
+        self.restart_delay = restart_delay
+        # File the processes write stdout/stderr to; None keeps the launcher's terminal
+        self.output = output
+        self.processes = {}
+        self.restarts = 0
+        self._stopping = False
+
+    async def run(self):
+        """Run until stop() is called"""
+        await asyncio.gather(*(self._supervise(cluster_id, shard_ids) for cluster_id, shard_ids in enumerate(self.ranges)))
+
+    def process_env(self, cluster_id, shard_ids):
+        return dict(
+            self.env,
+            **{
+                CLUSTER_ID_ENV: str(cluster_id),
+                SHARD_IDS_ENV: ",".join(str(shard_id) for shard_id in shard_ids),
+                SHARD_COUNT_ENV: str(self.shard_count),
+                IPC_ADDRESS_ENV: self.hub.address
+            }
+        )
+
+    async def _supervise(self, cluster_id, shard_ids):
+        delay = self.restart_delay
+        while not self._stopping:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            process = await asyncio.create_subprocess_exec(
+                *self.argv, env=self.process_env(cluster_id, shard_ids),
+                stdout=self.output, stderr=subprocess.STDOUT if self.output else None
+            )
+            self.processes[cluster_id] = process
+            logger.info(f"Process {cluster_id} (pid {process.pid}) started with shards {shard_ids}")
+            code = await process.wait()
+            if self._stopping:
+                return
+            if loop.time() - started > STABLE_AFTER:
+                delay = self.restart_delay
+            logger.warning(f"Process {cluster_id} exited with code {code}, restarting in {delay:.0f}s")
+            self.restarts += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RESTART_DELAY)
+
+    async def stop(self, timeout=15.0):
+        """Ask every process to shut down (SIGINT, like Ctrl+C) and kill the ones that do not"""
+        self._stopping = True
+        running = [process for process in self.processes.values() if process.returncode is None]
+        for process in running:
+            process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(process.wait() for process in running)), timeout)
+        except asyncio.TimeoutError:
+            for process in running:
+                if process.returncode is None:
+                    process.kill()
+
+
+async def main(args, config):
+    settings = config.get('cluster', {})
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        logger.error("No Discord token found. Set the DISCORD_TOKEN environment variable.")
+        return 1
+
+    shard_count = args.shards or settings.get('shard_count')
+    max_concurrency = settings.get('max_concurrency')
+    if not shard_count or not max_concurrency:
+        recommended, session_concurrency = await recommended_shards(token)
+        shard_count = shard_count or recommended
+        max_concurrency = max_concurrency or session_concurrency
+    processes = args.processes or settings.get('processes', 2)
+
+    # Migrations run once here, before the processes race for them
+    from utils.db import setup_database, configure_database
+    configure_database(config.get('database'))
+    setup_database()
+
+    hub = await ClusterHub(
+        host=settings.get('ipc_host', '127.0.0.1'),
+        port=settings.get('ipc_port', 0),
+        identify_interval=settings.get('identify_interval_seconds', 5),
+        max_concurrency=max_concurrency
+    ).start()
+    cluster = Cluster(shard_count, processes, hub, restart_delay=settings.get('restart_delay_seconds', 5))
+    logger.info(f"Cluster: {shard_count} shards over {len(cluster.ranges)} processes, hub at {hub.address}")
+
+    loop = asyncio.get_running_loop()
+    runner = asyncio.create_task(cluster.run())
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:
+            # Windows: Ctrl+C still reaches the processes directly
+            pass
+    await asyncio.wait({runner, asyncio.create_task(stop.wait())}, return_when=asyncio.FIRST_COMPLETED)
+
+    logger.info("Stopping the cluster")
+    await cluster.stop()
+    runner.cancel()
+    await hub.stop()
+    return 0
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, help="bot processes (default: cluster.processes)")
+    parser.add_argument("--shards", type=int, help="total shards (default: cluster.shard_count, or Discord's recommendation)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    logging_settings = config.get('logging', {})
+    setup_logging(dict(logging_settings, file=suffixed_path(logging_settings.get('file', 'bot.log'), "launcher")))
+    sys.exit(asyncio.run(main(args, config)))
+
+
+if __name__ == "__main__":
+    cli()
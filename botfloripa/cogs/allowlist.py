@@ -1,8 +1,10 @@
 import discord
 from discord.ext import commands
 import asyncio
-import json
+import itertools
 import logging
+import sys
+import time
 from datetime import datetime, timedelta
 import sqlite3
 from discord import app_commands
@@ -10,60 +12,59 @@ from discord.ui import Button, View
 
 from utils.db import (
     add_to_allowlist, remove_from_allowlist, check_allowlist, 
-    update_allowlist_status, add_temp_channel, remove_temp_channel
-)
-from utils.helpers import (
-    create_embed, load_config, can_use_allowlist_commands,
-    format_time_difference
+    update_allowlist_status, add_temp_channel, remove_temp_channel,
+    get_temp_channels, remove_temp_channels,
+    get_allowlist_page, get_allowlist_stats,
+    get_allowlist_timeseries, get_allowlist_daily_counts, rebuild_allowlist_stats,
+    add_allowlist_listener, remove_allowlist_listener, get_state, set_state,
+    get_application_answers, get_question_stats, get_allowlist_history,
+    add_review_message, get_review_messages, pop_review_messages, remove_review_messages
 )
+from utils.helpers import create_embed, can_use_allowlist_commands, format_time_difference
+from utils.guild_settings import guild_config, update_guild_settings, add_guild_settings_listener, remove_guild_settings_listener
+from utils.metrics import metrics
+from utils.question_bank import question_bank, add_question, update_question, move_question, retire_question
+from utils.sharding import local_shard_ids, owns_all_shards, shard_guilds, start_per_shard, task_name
+from utils.views import InstrumentedView, InstrumentedItem
 
 logger = logging.getLogger("bot.allowlist")
 
-class WhitelistReviewButtons(discord.ui.View):
-    def __init__(self, user_id, bot):
-        super().__init__(timeout=None)
-        self.user_id = user_id
-        self.bot = bot
-        
-        # Botão de aprovar
-        self.approve_button = discord.ui.Button(
-            style=discord.ButtonStyle.success,
-            label="Aprovar Whitelist",
-            custom_id=f"approve_whitelist_{user_id}"
-        )
-        self.approve_button.callback = self.approve_callback
-        
-        # Botão de rejeitar
-        self.reject_button = discord.ui.Button(
-            style=discord.ButtonStyle.danger,
-            label="Reprovar Whitelist",
-            custom_id=f"reject_whitelist_{user_id}"
-        )
-        self.reject_button.callback = self.reject_callback
-        
-        # Adiciona os botões à view
-        self.add_item(self.approve_button)
-        self.add_item(self.reject_button)
-        
-        # Menu de seleção para motivo de rejeição
-        self.reject_reasons = discord.ui.Select(
-            placeholder="Selecione um motivo para recusar...",
-            custom_id=f"reject_reason_{user_id}",
-            options=[
-                discord.SelectOption(label="Respostas incorretas", value="incorrect", description="Muitas respostas incorretas"),
-                discord.SelectOption(label="Respostas vagas", value="vague", description="Respostas muito vagas ou curtas"),
-                discord.SelectOption(label="Não entende RP", value="norpknowledge", description="Não demonstra conhecimento de RP"),
-                discord.SelectOption(label="Comportamento inadequado", value="behavior", description="Comportamento inadequado durante a whitelist"),
-                discord.SelectOption(label="Outro motivo", value="other", description="Outro motivo")
-            ]
+# Motivos de rejeição disponíveis no menu de revisão: valor -> (rótulo no menu, motivo registrado)
+REJECT_REASONS = {
+    "incorrect": ("Respostas incorretas", "Muitas respostas incorretas"),
+    "vague": ("Respostas vagas", "Respostas muito vagas ou curtas"),
+    "norpknowledge": ("Não entende RP", "Não demonstra conhecimento de RP"),
+    "behavior": ("Comportamento inadequado", "Comportamento inadequado durante a whitelist"),
+    "other": ("Outro motivo", "Outro motivo")
+}
+
+
+class ApproveWhitelistButton(InstrumentedItem, discord.ui.DynamicItem[discord.ui.Button], template=r"approve_whitelist_(?P<user_id>\d+)"):
+    """Botão de aprovação roteado pelo custom_id, válido mesmo após reinícios"""
+
+    def __init__(self, user_id):
+        super().__init__(
+            discord.ui.Button(
+                style=discord.ButtonStyle.success,
+                label="Aprovar Whitelist",
+                custom_id=f"approve_whitelist_{user_id}"
+            )
         )
-        self.reject_reasons.callback = self.reject_reason_callback
-        self.add_item(self.reject_reasons)
-    
-    async def approve_callback(self, interaction: discord.Interaction):
+        self.user_id = user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["user_id"]))
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return await _check_reviewer(interaction)
+
+    async def callback(self, interaction: discord.Interaction):
         """Aprova a whitelist do usuário"""
-        # Obtém o usuário
-        user = interaction.client.get_user(self.user_id)
+        bot = interaction.client
+        
+        # Obtém o usuário (buscado na API se não estiver em cache)
+        user = await bot.member_resolver.user(bot, self.user_id)
         if not user:
             await interaction.response.send_message("Usuário não encontrado.", ephemeral=True)
             return
@@ -73,11 +74,11 @@ class WhitelistReviewButtons(discord.ui.View):
             update_allowlist_status(self.user_id, "approved", interaction.user.id)
             
             # Adiciona o cargo de aprovado e remove o de turista
-            for guild in self.bot.guilds:
-                member = guild.get_member(self.user_id)
+            for guild in bot.guilds:
+                member = await bot.member_resolver.get(guild, self.user_id)
                 if member:
                     # Remove cargo de turista
-                    config = load_config()
+                    config = guild_config(guild.id)
                     tourist_role_id = config.get('roles', {}).get('tourist')
                     if tourist_role_id:
                         tourist_role = guild.get_role(tourist_role_id)
@@ -120,38 +121,73 @@ class WhitelistReviewButtons(discord.ui.View):
             # Atualiza a mensagem para desabilitar os botões
             await interaction.message.edit(view=None, content=f"Whitelist aprovada por {interaction.user.mention}")
             
-            # Notifica canais apropriados
-            cog = self.bot.get_cog("Allowlist")
-            await cog._notify_approved_channels(user, interaction.user)
+            # Notifica canais apropriados e fecha outras revisões abertas
+            cog = bot.get_cog("Allowlist")
+            await cog._notify_approved_channels(user, interaction.user, interaction.guild)
+            await cog.close_review_messages(self.user_id, "aprovada", interaction.message.id)
             
         except Exception as e:
             logger.error(f"Erro ao aprovar whitelist: {e}")
             await interaction.response.send_message(f"Erro ao aprovar whitelist: {e}", ephemeral=True)
-    
-    async def reject_callback(self, interaction: discord.Interaction):
+
+
+class RejectWhitelistButton(InstrumentedItem, discord.ui.DynamicItem[discord.ui.Button], template=r"reject_whitelist_(?P<user_id>\d+)"):
+    """Botão de rejeição; o motivo é escolhido no menu de seleção"""
+
+    def __init__(self, user_id):
+        super().__init__(
+            discord.ui.Button(
+                style=discord.ButtonStyle.danger,
+                label="Reprovar Whitelist",
+                custom_id=f"reject_whitelist_{user_id}"
+            )
+        )
+        self.user_id = user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["user_id"]))
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return await _check_reviewer(interaction)
+
+    async def callback(self, interaction: discord.Interaction):
         """Rejeita a whitelist do usuário"""
         await interaction.response.defer(ephemeral=True)
         await interaction.followup.send("Por favor, selecione um motivo para rejeição no menu abaixo.", ephemeral=True)
-    
-    async def reject_reason_callback(self, interaction: discord.Interaction):
+
+
+class RejectReasonSelect(InstrumentedItem, discord.ui.DynamicItem[discord.ui.Select], template=r"reject_reason_(?P<user_id>\d+)"):
+    """Menu de motivo de rejeição que conclui a reprovação"""
+
+    def __init__(self, user_id):
+        super().__init__(
+            discord.ui.Select(
+                placeholder="Selecione um motivo para recusar...",
+                custom_id=f"reject_reason_{user_id}",
+                options=[
+                    discord.SelectOption(label=label, value=value, description=description)
+                    for value, (label, description) in REJECT_REASONS.items()
+                ]
+            )
+        )
+        self.user_id = user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["user_id"]))
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return await _check_reviewer(interaction)
+
+    async def callback(self, interaction: discord.Interaction):
         """Processa o motivo da rejeição"""
-        reason = self.reject_reasons.values[0]
-        reason_text = "Motivo não especificado"
-        
-        # Mapeia o valor para texto
-        reason_map = {
-            "incorrect": "Muitas respostas incorretas",
-            "vague": "Respostas muito vagas ou curtas",
-            "norpknowledge": "Não demonstra conhecimento de RP",
-            "behavior": "Comportamento inadequado durante a whitelist",
-            "other": "Outro motivo"
-        }
-        
-        if reason in reason_map:
-            reason_text = reason_map[reason]
+        bot = interaction.client
+        reason = self.item.values[0]
+        reason_text = REJECT_REASONS[reason][1] if reason in REJECT_REASONS else "Motivo não especificado"
         
-        # Obtém o usuário
-        user = interaction.client.get_user(self.user_id)
+        # Obtém o usuário (buscado na API se não estiver em cache)
+        user = await bot.member_resolver.user(bot, self.user_id)
         if not user:
             await interaction.response.send_message("Usuário não encontrado.", ephemeral=True)
             return
@@ -183,15 +219,38 @@ class WhitelistReviewButtons(discord.ui.View):
             # Atualiza a mensagem para desabilitar os botões
             await interaction.message.edit(view=None, content=f"Whitelist rejeitada por {interaction.user.mention}")
             
-            # Notifica canais apropriados
-            cog = self.bot.get_cog("Allowlist")
-            await cog._notify_rejected_channels(user, interaction.user, reason_text)
+            # Notifica canais apropriados e fecha outras revisões abertas
+            cog = bot.get_cog("Allowlist")
+            await cog._notify_rejected_channels(user, interaction.user, reason_text, interaction.guild)
+            await cog.close_review_messages(self.user_id, "rejeitada", interaction.message.id)
             
         except Exception as e:
             logger.error(f"Erro ao rejeitar whitelist: {e}")
             await interaction.response.send_message(f"Erro ao rejeitar whitelist: {e}", ephemeral=True)
 
 
+async def _check_reviewer(interaction):
+    """Garante que apenas staff use os controles de revisão"""
+    if isinstance(interaction.user, discord.Member) and can_use_allowlist_commands(interaction.user):
+        return True
+    await interaction.response.send_message("Você não tem permissão para revisar whitelists.", ephemeral=True)
+    return False
+
+
+class WhitelistReviewButtons(InstrumentedView):
+    """Controles de revisão de uma aplicação.
+    
+    Os itens são dinâmicos: após um reinício o bot os reconstrói a partir do
+    custom_id, sem manter uma view por aplicação pendente em memória.
+    """
+
+    def __init__(self, user_id):
+        super().__init__(timeout=None)
+        self.add_item(ApproveWhitelistButton(user_id))
+        self.add_item(RejectWhitelistButton(user_id))
+        self.add_item(RejectReasonSelect(user_id))
+
+
 class WhitelistButton(discord.ui.Button):
     def __init__(self):
         super().__init__(
@@ -228,7 +287,7 @@ class WhitelistButton(discord.ui.Button):
                 return
         
         # Verificar idade da conta
-        config = load_config()
+        config = guild_config(interaction.guild.id)
         min_age_days = config.get('allowlist', {}).get('min_account_age_days', 0)
         
         created_at = interaction.user.created_at
@@ -246,6 +305,13 @@ class WhitelistButton(discord.ui.Button):
             )
             return
         
+        # Reserva a vaga na sessão antes de criar o canal: com o limite atingido, nada é criado
+        cog = interaction.client.get_cog("Allowlist")
+        session = cog.sessions.open(interaction.user.id, None, "whitelist")
+        if session is None:
+            await interaction.response.send_message(embed=cog._sessions_full_embed(), ephemeral=True)
+            return
+        
         # Criamos um canal privado para o usuário
         try:
             guild = interaction.guild
@@ -286,9 +352,10 @@ class WhitelistButton(discord.ui.Button):
                 category=category,
                 topic=f"Whitelist para {user.display_name}"
             )
+            cog.sessions.attach(session, channel.id)
             
             # Registrar canal temporário no banco de dados
-            add_temp_channel(channel.id, user.id, "whitelist")
+            add_temp_channel(channel.id, user.id, "whitelist", guild_id=guild.id)
             
             # Informar ao usuário
             await interaction.response.send_message(
@@ -301,8 +368,7 @@ class WhitelistButton(discord.ui.Button):
             )
             
             # Iniciar o processo de whitelist no canal
-            cog = interaction.client.get_cog("Allowlist")
-            await cog.start_whitelist_channel(user, channel)
+            await cog.start_whitelist_channel(user, channel, session)
             
         except discord.Forbidden:
             await interaction.response.send_message(
@@ -323,6 +389,482 @@ class WhitelistButton(discord.ui.Button):
                 ),
                 ephemeral=True
             )
+        finally:
+            cog.sessions.close(session)
+
+
+class WhitelistPanelView(InstrumentedView):
+    """Painel público com o botão de iniciar whitelist (view persistente)"""
+
+    def __init__(self):
+        super().__init__(timeout=None)
+        self.add_item(WhitelistButton())
+
+
+class ReviewNextPendingView(InstrumentedView):
+    """Botão persistente do dashboard que abre a próxima aplicação pendente"""
+
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="Revisar Próximo Pendente", style=discord.ButtonStyle.primary, custom_id="review_next_pending")
+    async def review_next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if not await _check_reviewer(interaction):
+            return
+        
+        # Obtém a próxima aplicação pendente no momento do clique
+        next_pending = get_allowlist_page('pending', limit=1)
+        if not next_pending:
+            await interaction.response.send_message("Não há mais aplicações pendentes.", ephemeral=True)
+            return
+        
+        # Chama o método de revisão
+        await interaction.response.defer()
+        cog = interaction.client.get_cog("Allowlist")
+        await cog.review_application(interaction, next_pending[0]['user_id'])
+
+
+class AllowlistPaginator(InstrumentedView):
+    """Lista paginada de entradas da whitelist, buscando uma página por vez no banco.
+    
+    O total de entradas (rodapé) vem dos contadores materializados
+    (allowlist_stats), lidos ao carregar a primeira página; nem a abertura
+    nem as trocas de página contam a tabela.
+    """
+
+    def __init__(self, author_id, guild, status, title, page_size=20):
+        super().__init__(timeout=180)
+        self.author_id = author_id
+        self.guild = guild
+        self.status = status
+        self.title = title
+        self.page_size = page_size
+        self.page = 0
+        self.entries = []
+        self.has_next = False
+        self.total = 0
+        self.message = None
+
+        self.prev_button = discord.ui.Button(style=discord.ButtonStyle.secondary, label="◀ Anterior")
+        self.prev_button.callback = self.prev_callback
+        self.next_button = discord.ui.Button(style=discord.ButtonStyle.secondary, label="Próxima ▶")
+        self.next_button.callback = self.next_callback
+
+        self.add_item(self.prev_button)
+        self.add_item(self.next_button)
+
+    def load_first_page(self):
+        """Carrega (ou recarrega) a primeira página e o total de entradas do status"""
+        self.total = get_allowlist_stats().get(self.status, 0)
+        rows = get_allowlist_page(self.status, limit=self.page_size + 1)
+        self.page = 0
+        self.has_next = len(rows) > self.page_size
+        self.entries = rows[:self.page_size]
+        self._update_buttons()
+
+    def load_next_page(self):
+        """Carrega a página seguinte a partir do último user_id exibido"""
+        if not self.entries:
+            return
+        rows = get_allowlist_page(self.status, after_user_id=self.entries[-1]['user_id'], limit=self.page_size + 1)
+        if not rows:
+            self.has_next = False
+        else:
+            self.page += 1
+            self.has_next = len(rows) > self.page_size
+            self.entries = rows[:self.page_size]
+        self._update_buttons()
+
+    def load_prev_page(self):
+        """Carrega a página anterior a partir do primeiro user_id exibido"""
+        if not self.entries or self.page == 0:
+            return
+        rows = get_allowlist_page(self.status, before_user_id=self.entries[0]['user_id'], limit=self.page_size)
+        if rows:
+            self.page -= 1
+            self.has_next = True
+            self.entries = rows
+        else:
+            self.page = 0
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.prev_button.disabled = self.page == 0
+        self.next_button.disabled = not self.has_next
+
+    def build_embed(self, footer_text=None):
+        """Monta o embed da página atual"""
+        if self.entries:
+            lines = []
+            for entry in self.entries:
+                # A menção é renderizada pelo cliente do Discord, sem depender do cache de membros
+                lines.append(f"• <@{entry['user_id']}>")
+            description = "\n".join(lines)
+        else:
+            description = "Nenhuma entrada encontrada."
+
+        # Entradas novas desde a contagem podem somar páginas além do total contado
+        pages = max(self.page + 1, (self.total + self.page_size - 1) // self.page_size)
+
+        embed = create_embed(self.title, description, color="info")
+        embed.set_footer(text=footer_text or f"Página {self.page + 1}/{pages} • {self.total} entradas")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Apenas quem executou o comando pode navegar nesta lista.", ephemeral=True)
+            return False
+        return True
+
+    async def prev_callback(self, interaction: discord.Interaction):
+        self.load_prev_page()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    async def next_callback(self, interaction: discord.Interaction):
+        self.load_next_page()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    async def on_timeout(self):
+        # Desabilita a navegação quando a view expira
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+
+class LiveDashboard:
+    """Mensagem de dashboard persistente, editada no lugar quando os contadores mudam"""
+
+    def __init__(self, cog, channel_id, debounce=10.0):
+        self.cog = cog
+        self.bot = cog.bot
+        self.channel_id = channel_id
+        self.debounce = debounce
+        self.message = None
+        self._last_render = None
+        self._dirty = False
+        self._attach_task = None
+        self._refresh_task = None
+
+    @property
+    def state_key(self):
+        return f"dashboard_message:{self.channel_id}"
+
+    def start(self):
+        """Passa a ouvir mudanças da whitelist e publica/recupera a mensagem"""
+        add_allowlist_listener(self.request_refresh)
+        add_guild_settings_listener(self.request_refresh)
+        self._attach_task = asyncio.create_task(self._attach())
+
+    def stop(self):
+        remove_allowlist_listener(self.request_refresh)
+        remove_guild_settings_listener(self.request_refresh)
+        for task in (self._attach_task, self._refresh_task):
+            if task and not task.done():
+                task.cancel()
+
+    def request_refresh(self, *_):
+        """Agenda uma atualização; mudanças dentro da janela de debounce são agrupadas"""
+        self._dirty = True
+        if self._refresh_task is None or self._refresh_task.done():
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._refresh_task = loop.create_task(self._run_refresh())
+
+    async def _run_refresh(self):
+        while self._dirty:
+            await asyncio.sleep(self.debounce)
+            self._dirty = False
+            await self.refresh()
+
+    async def _attach(self):
+        await self.bot.wait_until_ready()
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            logger.warning(f"Canal de dashboard {self.channel_id} não encontrado")
+            return
+
+        # Reutiliza a mensagem publicada antes de um reinício, se ainda existir
+        message_id = get_state(self.state_key)
+        if message_id:
+            try:
+                self.message = await channel.fetch_message(int(message_id))
+            except (discord.NotFound, discord.Forbidden):
+                self.message = None
+
+        await self.refresh()
+
+    async def refresh(self):
+        """Edita a mensagem do dashboard se o conteúdo mudou"""
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            return
+
+        embed, _ = self.cog.build_dashboard_embed(channel.guild)
+        rendered = embed.to_dict()
+        if self.message is not None and rendered == self._last_render:
+            return
+
+        embed.set_footer(text="Atualizado automaticamente")
+        embed.timestamp = datetime.now().astimezone()
+
+        try:
+            if self.message is not None:
+                try:
+                    await self.message.edit(embed=embed)
+                except discord.NotFound:
+                    self.message = None
+
+            if self.message is None:
+                self.message = await channel.send(embed=embed)
+                set_state(self.state_key, self.message.id)
+
+            self._last_render = rendered
+        except discord.HTTPException as e:
+            logger.error(f"Erro ao atualizar dashboard ao vivo: {e}")
+
+
+class WhitelistSession:
+    """Estado de uma sessão de perguntas em andamento (canal temporário ou DM)"""
+
+    __slots__ = ("user_id", "channel_id", "kind", "started_at", "touched_at", "question", "score", "answers", "task")
+
+    def __init__(self, user_id, channel_id, kind):
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.kind = kind
+        self.started_at = self.touched_at = time.monotonic()
+        self.question = 0
+        self.score = 0
+        self.answers = []
+        self.task = asyncio.current_task()
+
+    def record(self, answer):
+        """Guarda uma resposta e renova o prazo da sessão"""
+        self.answers.append(answer)
+        self.question += 1
+        self.score += answer['score'] or 0
+        self.touched_at = time.monotonic()
+
+    def nbytes(self):
+        """Tamanho aproximado do objeto e das respostas guardadas"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.answers)
+        for answer in self.answers:
+            size += sys.getsizeof(answer) + sum(sys.getsizeof(value) for value in answer.values())
+        return size
+
+
+class SessionRegistry:
+    """Sessões de whitelist vivas, indexadas pelo canal.
+
+    Cada sessão é aberta no início do questionário e fechada no `finally` de
+    quem a abriu. Os fluxos que criam um canal reservam a vaga antes (open
+    sem canal) e só então criam o canal, associado com attach(): com o
+    registro cheio, nenhum canal é criado. Sessões sem atividade há mais de `ttl` segundos (uma
+    tarefa presa, por exemplo) são canceladas e descartadas na próxima
+    varredura, e o registro nunca passa de `max_sessions`: quando está
+    cheio, novas sessões são recusadas em vez de derrubar uma em andamento.
+    """
+
+    def __init__(self, ttl=900, max_sessions=500):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.expired = 0
+        self.refused = 0
+        self._reservations = itertools.count(1)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, channel_id):
+        return channel_id in self.sessions
+
+    def open(self, user_id, channel_id, kind):
+        """Registra uma sessão; None se o limite foi atingido.
+        
+        Com channel_id None a vaga fica reservada até attach() informar o canal.
+        """
+        if len(self.sessions) >= self.max_sessions:
+            self.sweep()
+            if len(self.sessions) >= self.max_sessions:
+                self.refused += 1
+                logger.warning(f"Limite de {self.max_sessions} sessões de whitelist atingido; sessão de {user_id} recusada")
+                return None
+        if channel_id is None:
+            channel_id = ("reserva", next(self._reservations))
+        session = self.sessions[channel_id] = WhitelistSession(user_id, channel_id, kind)
+        return session
+
+    def attach(self, session, channel_id):
+        """Associa uma sessão reservada ao canal criado para ela"""
+        if self.sessions.get(session.channel_id) is session:
+            del self.sessions[session.channel_id]
+            self.sessions[channel_id] = session
+        session.channel_id = channel_id
+
+    def close(self, session):
+        if session is not None and self.sessions.get(session.channel_id) is session:
+            del self.sessions[session.channel_id]
+
+    def sweep(self):
+        """Cancela e remove as sessões paradas há mais de ttl; retorna quantas saíram"""
+        deadline = time.monotonic() - self.ttl
+        stale = [session for session in self.sessions.values() if session.touched_at < deadline]
+        for session in stale:
+            del self.sessions[session.channel_id]
+            if session.task is not None and not session.task.done():
+                session.task.cancel()
+            logger.warning(f"Sessão de whitelist de {session.user_id} expirada após {self.ttl}s sem atividade")
+        self.expired += len(stale)
+        return len(stale)
+
+    def nbytes(self):
+        return sys.getsizeof(self.sessions) + sum(session.nbytes() for session in self.sessions.values())
+
+
+class TempChannelReaper:
+    """Remove canais temporários órfãos, cujas sessões morreram com o processo"""
+
+    # Canais mais novos que isso ainda podem estar iniciando uma sessão
+    GRACE_PERIOD = timedelta(minutes=2)
+
+    def __init__(self, cog, interval_minutes=30, max_age_hours=24, delete_interval=1.0):
+        self.cog = cog
+        self.bot = cog.bot
+        self.interval = interval_minutes * 60
+        self.max_age = timedelta(hours=max_age_hours)
+        self.delete_interval = delete_interval
+        self.queue = asyncio.Queue()
+        self._queued = set()
+        self._deleted = 0
+        # Os shards compartilham a fila de exclusão; uma passada por vez mantém as contagens separadas
+        self._reaping = asyncio.Lock()
+        self._task = None
+        self._worker = None
+
+    def start(self):
+        # Uma passada por shard, cada uma só com os canais dos servidores daquele shard
+        self._task = start_per_shard(self.bot, "temp_channel_reaper", self._run)
+        self._worker = asyncio.create_task(self._delete_worker())
+        metrics.track_task("temp_channel_delete_worker", self._worker)
+
+    def stop(self):
+        for task in (self._task, self._worker):
+            if task and not task.done():
+                task.cancel()
+
+    async def _run(self, shard_id):
+        """Executa na inicialização e depois periodicamente"""
+        while not self.bot.is_closed():
+            try:
+                # Sessões presas primeiro, para que seus canais possam ser recolhidos nesta passada.
+                # As sessões são do processo, não do shard: basta um shard varrê-las
+                if shard_id == local_shard_ids(self.bot)[0]:
+                    self.cog.sessions.sweep()
+                await self.reap(shard_id)
+            except Exception as e:
+                logger.error(f"Erro na limpeza de canais temporários (shard {shard_id}): {e}")
+            metrics.heartbeat(task_name(self.bot, "temp_channel_reaper", shard_id))
+            await asyncio.sleep(self.interval)
+
+    def _is_orphan(self, row, channel, now):
+        if channel.id in self.cog.sessions or channel.id in self._queued:
+            return False
+        age = now - channel.created_at
+        if age < self.GRACE_PERIOD:
+            return False
+        # Canais de whitelist só existem durante a sessão; os de aplicação aguardam a staff até max_age
+        return row['purpose'] == 'whitelist' or age > self.max_age
+
+    async def reap(self, shard_id=0):
+        """Compara temp_channels do shard com o cache de canais e remove os órfãos"""
+        async with self._reaping:
+            return await self._reap(shard_id)
+
+    async def _reap(self, shard_id):
+        started = time.perf_counter()
+        now = discord.utils.utcnow()
+        stale_ids = []
+        orphans = []
+        
+        # Registros sem guild_id (anteriores ao sharding) ficam com o shard 0
+        guild_ids = [guild.id for guild in shard_guilds(self.bot, shard_id)]
+        for row in get_temp_channels(guild_ids=guild_ids, include_unassigned=shard_id == 0):
+            channel = self.bot.get_channel(row['channel_id'])
+            if channel is None:
+                # Sem guild_id, o canal pode ser de um shard de outro processo: na dúvida, fica
+                if row['guild_id'] is None and not owns_all_shards(self.bot):
+                    continue
+                # O canal já não existe: só o registro ficou para trás
+                stale_ids.append(row['channel_id'])
+            elif self._is_orphan(row, channel, now):
+                orphans.append(channel)
+        
+        if stale_ids:
+            remove_temp_channels(stale_ids)
+        
+        deleted_before = self._deleted
+        for channel in orphans:
+            self._queued.add(channel.id)
+            self.queue.put_nowait(channel)
+        if orphans:
+            await self.queue.join()
+        
+        reclaimed = self._deleted - deleted_before
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Limpeza de canais temporários: {reclaimed} canais excluídos, "
+            f"{len(stale_ids)} registros obsoletos removidos em {elapsed:.2f}s"
+        )
+        
+        if reclaimed or stale_ids:
+            await self._report(reclaimed, len(stale_ids), elapsed)
+        return reclaimed, len(stale_ids), elapsed
+
+    async def _delete_worker(self):
+        """Exclui os canais da fila em ritmo constante para não estourar o rate limit"""
+        while True:
+            channel = await self.queue.get()
+            try:
+                await channel.delete(reason="Canal temporário órfão")
+                remove_temp_channel(channel.id)
+                self._deleted += 1
+            except discord.NotFound:
+                remove_temp_channel(channel.id)
+            except discord.HTTPException as e:
+                logger.error(f"Erro ao excluir canal temporário {channel.id}: {e}")
+            except Exception as e:
+                # Um erro inesperado não pode derrubar o worker: o resto da fila ficaria parado
+                logger.error(f"Erro inesperado ao excluir canal temporário {channel.id}: {e}")
+            finally:
+                self._queued.discard(channel.id)
+                self.queue.task_done()
+            await asyncio.sleep(self.delete_interval)
+
+    async def _report(self, reclaimed, stale, elapsed):
+        log_channel_id = guild_config().get('channels', {}).get('logs')
+        log_channel = self.bot.get_channel(log_channel_id) if log_channel_id else None
+        if not log_channel:
+            return
+        try:
+            await log_channel.send(
+                embed=create_embed(
+                    "Limpeza de Canais Temporários",
+                    "Canais de whitelist órfãos foram removidos.",
+                    color="info",
+                    fields=[
+                        {"name": "Canais excluídos", "value": str(reclaimed), "inline": True},
+                        {"name": "Registros obsoletos", "value": str(stale), "inline": True},
+                        {"name": "Duração", "value": f"{elapsed:.2f}s", "inline": True}
+                    ]
+                )
+            )
+        except discord.HTTPException as e:
+            logger.error(f"Erro ao enviar relatório de limpeza: {e}")
 
 
 class Allowlist(commands.Cog):
@@ -330,9 +872,64 @@ class Allowlist(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.config = load_config()
-        self.pending_applications = {}
-        self.user_scores = {}
+        allowlist_config = guild_config().get('allowlist', {})
+        self.sessions = SessionRegistry(
+            ttl=allowlist_config.get('session_ttl_minutes', 15) * 60,
+            max_sessions=allowlist_config.get('max_sessions', 500)
+        )
+        self.live_dashboard = None
+        self._restore_task = None
+        self.reaper = None
+    
+    async def cog_load(self):
+        # Controles persistentes: os itens dinâmicos são roteados pelo custom_id,
+        # então mensagens antigas continuam funcionando após reinícios
+        self.bot.add_dynamic_items(ApproveWhitelistButton, RejectWhitelistButton, RejectReasonSelect)
+        self.bot.add_view(WhitelistPanelView())
+        self.bot.add_view(ReviewNextPendingView())
+        self._restore_task = asyncio.create_task(self._restore_review_messages())
+        
+        # Limpeza de canais temporários deixados por sessões interrompidas
+        allowlist_config = guild_config().get('allowlist', {})
+        self.reaper = TempChannelReaper(
+            self,
+            interval_minutes=allowlist_config.get('temp_channel_reap_minutes', 30),
+            max_age_hours=allowlist_config.get('temp_channel_max_age_hours', 24)
+        )
+        self.reaper.start()
+        
+        metrics.register_gauge(
+            "bot_whitelist_sessions_in_flight",
+            "Whitelist sessions currently running (temporary channels and DMs)",
+            lambda: len(self.sessions)
+        )
+        metrics.register_gauge(
+            "bot_whitelist_session_bytes",
+            "Approximate memory held by live whitelist sessions",
+            self.sessions.nbytes
+        )
+        
+        # Dashboard ao vivo no canal configurado, atualizado por eventos da whitelist
+        dashboard_channel_id = guild_config().get('channels', {}).get('dashboard')
+        if dashboard_channel_id:
+            debounce = guild_config().get('allowlist', {}).get('dashboard_debounce_seconds', 10)
+            self.live_dashboard = LiveDashboard(self, dashboard_channel_id, debounce)
+            self.live_dashboard.start()
+    
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(ApproveWhitelistButton, RejectWhitelistButton, RejectReasonSelect)
+        if self._restore_task and not self._restore_task.done():
+            self._restore_task.cancel()
+        if self.reaper:
+            self.reaper.stop()
+        metrics.unregister_gauge("bot_whitelist_sessions_in_flight")
+        metrics.unregister_gauge("bot_whitelist_session_bytes")
+        if self.live_dashboard:
+            self.live_dashboard.stop()
+    
+    def settings(self, guild):
+        """Configuração do servidor `guild` (a do servidor padrão em DMs)"""
+        return guild_config(guild.id if guild else None)
     
     @commands.group(name="allowlist", aliases=["wl"])
     async def allowlist(self, ctx):
@@ -340,6 +937,84 @@ class Allowlist(commands.Cog):
         if ctx.invoked_subcommand is None:
             await ctx.send("Please specify a subcommand. Use `!help allowlist` for more information.")
     
+    async def _restore_review_messages(self):
+        """Carrega as revisões registradas em uma única consulta e encerra as já decididas"""
+        await self.bot.wait_until_ready()
+        
+        rows = get_review_messages()
+        stale = [row for row in rows if row['status'] != 'pending']
+        
+        for row in stale:
+            message = self.bot.get_partial_messageable(row['channel_id']).get_partial_message(row['message_id'])
+            try:
+                await message.edit(view=None)
+            except discord.HTTPException:
+                pass
+        
+        if stale:
+            remove_review_messages([row['message_id'] for row in stale])
+        
+        logger.info(f"Revisões de whitelist: {len(rows) - len(stale)} abertas, {len(stale)} encerradas na inicialização")
+    
+    def _settings_error_embed(self):
+        return create_embed(
+            "Erro",
+            "Não foi possível salvar a configuração no banco de dados. Tente novamente.",
+            color="error"
+        )
+    
+    def _sessions_full_embed(self):
+        return create_embed(
+            "Whitelist Indisponível",
+            "Há muitas whitelists em andamento no momento. Por favor, tente novamente em alguns minutos.",
+            color="error"
+        )
+    
+    async def _ask(self, user, channel, embed, timeout):
+        """Envia uma pergunta e espera a resposta do usuário no canal.
+        
+        O wait_for é registrado antes do envio: uma resposta que chega ao bot
+        antes de o Discord confirmar o envio da pergunta não se perde.
+        Levanta asyncio.TimeoutError se o usuário não responder a tempo.
+        """
+        response = asyncio.ensure_future(
+            self.bot.wait_for(
+                'message',
+                check=lambda m: m.author == user and m.channel == channel,
+                timeout=timeout
+            )
+        )
+        try:
+            await channel.send(embed=embed)
+        except BaseException:
+            response.cancel()
+            raise
+        return await response
+    
+    async def _delete_temp_channel(self, channel, delay=0):
+        """Exclui um canal temporário e remove seu registro do banco"""
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            await channel.delete()
+        except discord.NotFound:
+            pass
+        except Exception as e:
+            logger.error(f"Erro ao excluir canal: {e}")
+            return
+        remove_temp_channel(channel.id)
+    
+    async def close_review_messages(self, user_id, decision, except_message_id=None):
+        """Remove os controles de todas as mensagens de revisão de um usuário"""
+        for row in pop_review_messages(user_id):
+            if row['message_id'] == except_message_id:
+                continue
+            message = self.bot.get_partial_messageable(row['channel_id']).get_partial_message(row['message_id'])
+            try:
+                await message.edit(view=None, content=f"Whitelist já {decision}.")
+            except discord.HTTPException:
+                pass
+    
     @allowlist.command(name="apply")
     async def apply(self, ctx):
         """Start the allowlist application process"""
@@ -370,7 +1045,7 @@ class Allowlist(commands.Cog):
                 pass
         
         # Check account age requirement
-        min_age_days = self.config.get('allowlist', {}).get('min_account_age_days', 0)
+        min_age_days = self.settings(ctx.guild).get('allowlist', {}).get('min_account_age_days', 0)
         
         # Converter para datas do mesmo tipo (aware)
         created_at = ctx.author.created_at
@@ -387,10 +1062,16 @@ class Allowlist(commands.Cog):
             )
             return
         
+        # Reserve the session before creating the channel: when the registry is full nothing is created
+        session = self.sessions.open(ctx.author.id, None, "allowlist")
+        if session is None:
+            await ctx.send(embed=self._sessions_full_embed())
+            return
+        
         # Create a private channel for the application
         try:
             # Get the allowlist category
-            category_id = self.config.get('channels', {}).get('allowlist_category')
+            category_id = self.settings(ctx.guild).get('channels', {}).get('allowlist_category')
             category = None
             
             if category_id:
@@ -404,8 +1085,8 @@ class Allowlist(commands.Cog):
             }
             
             # Add admin/mod role permissions
-            admin_role_id = self.config.get('roles', {}).get('admin')
-            mod_role_id = self.config.get('roles', {}).get('moderator')
+            admin_role_id = self.settings(ctx.guild).get('roles', {}).get('admin')
+            mod_role_id = self.settings(ctx.guild).get('roles', {}).get('moderator')
             
             if admin_role_id:
                 admin_role = ctx.guild.get_role(admin_role_id)
@@ -424,9 +1105,10 @@ class Allowlist(commands.Cog):
                 category=category,
                 topic=f"Allowlist application for {ctx.author.display_name}"
             )
+            self.sessions.attach(session, channel.id)
             
             # Save temp channel to database
-            add_temp_channel(channel.id, ctx.author.id, "allowlist")
+            add_temp_channel(channel.id, ctx.author.id, "allowlist", guild_id=ctx.guild.id)
             
             # Send confirmation message
             await ctx.send(
@@ -438,7 +1120,7 @@ class Allowlist(commands.Cog):
             )
             
             # Start the application process
-            await self._process_application(ctx.author, channel)
+            await self._process_application(ctx.author, channel, session)
             
         except discord.errors.Forbidden:
             await ctx.send(
@@ -457,8 +1139,10 @@ class Allowlist(commands.Cog):
                     color="error"
                 )
             )
+        finally:
+            self.sessions.close(session)
     
-    async def _process_application(self, user, channel):
+    async def _process_application(self, user, channel, session):
         """Process an allowlist application in the given channel"""
         # Send welcome message
         await channel.send(
@@ -472,8 +1156,8 @@ class Allowlist(commands.Cog):
         
         await asyncio.sleep(2)  # Small delay
         
-        # Get questions from config
-        questions = self.config.get('allowlist', {}).get('questions', [])
+        # Snapshot of the question bank, kept for the whole application
+        questions = question_bank()
         
         if not questions:
             await channel.send(
@@ -485,25 +1169,18 @@ class Allowlist(commands.Cog):
             )
             return
         
-        # Store answers
-        answers = []
-        
+        # Answers are kept on the session (scored when the question has an answer key)
         # Ask each question
-        for i, question in enumerate(questions):
+        for question in questions:
             question_embed = create_embed(
-                f"Question {i+1}/{len(questions)}", 
-                question,
+                f"Question {question.position}/{len(questions)}", 
+                question.text,
                 color="info"
             )
-            await channel.send(embed=question_embed)
             
-            # Wait for response
+            # Send it and wait for the response
             try:
-                response_msg = await self.bot.wait_for(
-                    'message',
-                    check=lambda m: m.author == user and m.channel == channel,
-                    timeout=300  # 5 minutes
-                )
+                response_msg = await self._ask(user, channel, question_embed, timeout=300)  # 5 minutes
                 
                 if response_msg.content.lower() == 'cancel':
                     await channel.send(
@@ -514,14 +1191,15 @@ class Allowlist(commands.Cog):
                         )
                     )
                     # Schedule channel deletion
-                    await asyncio.sleep(5)
-                    await channel.delete()
+                    await self._delete_temp_channel(channel, delay=5)
                     return
                 
                 # Store the answer
-                answers.append({
-                    'question': question,
-                    'answer': response_msg.content
+                session.record({
+                    'question_id': question.id,
+                    'question': question.text,
+                    'answer': response_msg.content,
+                    'score': questions.score(question, response_msg.content)
                 })
                 
             except asyncio.TimeoutError:
@@ -533,8 +1211,7 @@ class Allowlist(commands.Cog):
                     )
                 )
                 # Schedule channel deletion
-                await asyncio.sleep(5)
-                await channel.delete()
+                await self._delete_temp_channel(channel, delay=5)
                 return
         
         # Application completed
@@ -548,15 +1225,14 @@ class Allowlist(commands.Cog):
         
         # Save application to database
         try:
-            answers_json = json.dumps(answers)
-            add_to_allowlist(user.id, status="pending", answers=answers_json)
+            add_to_allowlist(user.id, status="pending", answers=session.answers)
             
             # If auto-approve is enabled, approve immediately
-            if self.config.get('allowlist', {}).get('auto_approve', False):
+            if self.settings(channel.guild).get('allowlist', {}).get('auto_approve', False):
                 update_allowlist_status(user.id, "approved", self.bot.user.id)
                 
                 # Add allowed role if configured
-                allowed_role_id = self.config.get('roles', {}).get('allowed')
+                allowed_role_id = self.settings(channel.guild).get('roles', {}).get('allowed')
                 if allowed_role_id:
                     allowed_role = channel.guild.get_role(allowed_role_id)
                     if allowed_role:
@@ -571,8 +1247,7 @@ class Allowlist(commands.Cog):
                 )
                 
                 # Schedule channel deletion
-                await asyncio.sleep(30)
-                await channel.delete()
+                await self._delete_temp_channel(channel, delay=30)
             else:
                 # Notify staff that a new application is pending
                 staff_msg = create_embed(
@@ -615,11 +1290,11 @@ class Allowlist(commands.Cog):
         
         # Add to allowlist and approve
         try:
-            answers = json.dumps([{"question": "Direct Addition", "answer": reason}])
+            answers = [{"question_id": 0, "question": "Direct Addition", "answer": reason}]
             add_to_allowlist(user.id, ctx.author.id, "approved", answers)
             
             # Add allowed role if configured
-            allowed_role_id = self.config.get('roles', {}).get('allowed')
+            allowed_role_id = self.settings(ctx.guild).get('roles', {}).get('allowed')
             if allowed_role_id:
                 allowed_role = ctx.guild.get_role(allowed_role_id)
                 if allowed_role:
@@ -664,7 +1339,7 @@ class Allowlist(commands.Cog):
             remove_from_allowlist(user.id)
             
             # Remove allowed role if configured
-            allowed_role_id = self.config.get('roles', {}).get('allowed')
+            allowed_role_id = self.settings(ctx.guild).get('roles', {}).get('allowed')
             if allowed_role_id:
                 allowed_role = ctx.guild.get_role(allowed_role_id)
                 if allowed_role and allowed_role in user.roles:
@@ -709,7 +1384,7 @@ class Allowlist(commands.Cog):
             # Get the approver info if available
             approver_info = "Unknown"
             if entry['approved_by']:
-                approver = ctx.guild.get_member(entry['approved_by'])
+                approver = await self.bot.member_resolver.get(ctx.guild, entry['approved_by'])
                 if approver:
                     approver_info = approver.mention
             
@@ -742,6 +1417,46 @@ class Allowlist(commands.Cog):
                 )
             )
     
+    @allowlist.command(name="history")
+    @commands.check(can_use_allowlist_commands)
+    async def history(self, ctx, user: discord.User):
+        """Show a user's allowlist application attempts"""
+        attempts = get_allowlist_history(user.id, limit=10)
+        
+        if not attempts:
+            await ctx.send(
+                embed=create_embed(
+                    "Allowlist History", 
+                    f"{user.mention} has never applied to the allowlist.",
+                    color="info"
+                )
+            )
+            return
+        
+        status_icons = {"approved": "✅", "rejected": "❌", "pending": "⏳", "removed": "🚫"}
+        fields = []
+        for attempt in attempts:
+            decided = ""
+            if attempt['decided_at'] and attempt['status'] in ("approved", "rejected"):
+                decided_by = f"<@{attempt['decided_by']}>" if attempt['decided_by'] else "system"
+                decided = f"\n**Decided:** {format_time_difference(attempt['decided_at'])} ago by {decided_by}"
+            score = f"\n**Score:** {attempt['score']}" if attempt['score'] is not None else ""
+            applied = f"{format_time_difference(attempt['created_at'])} ago" if attempt['created_at'] else "Unknown"
+            fields.append({
+                "name": f"{status_icons.get(attempt['status'], '•')} Attempt #{attempt['attempt']} - {attempt['status']}",
+                "value": f"**Applied:** {applied}{score}{decided}",
+                "inline": False
+            })
+        
+        await ctx.send(
+            embed=create_embed(
+                "Allowlist History", 
+                f"Latest application attempts of {user.mention}.",
+                color="info",
+                fields=fields
+            )
+        )
+    
     @allowlist.command(name="setup")
     @commands.has_permissions(administrator=True)
     async def setup_whitelist(self, ctx, channel: discord.TextChannel = None):
@@ -749,7 +1464,7 @@ class Allowlist(commands.Cog):
         if channel is None:
             channel = ctx.channel
             
-        server_name = self.config.get('allowlist', {}).get('server_name', 'GTA RP Server')
+        server_name = self.settings(ctx.guild).get('allowlist', {}).get('server_name', 'GTA RP Server')
         
         # Cria o embed de boas-vindas para whitelist
         embed = discord.Embed(
@@ -770,25 +1485,24 @@ class Allowlist(commands.Cog):
         )
         
         # Adiciona o logotipo do servidor como imagem
-        logo_url = self.config.get('allowlist', {}).get('server_logo_url')
+        logo_url = self.settings(ctx.guild).get('allowlist', {}).get('server_logo_url')
         if logo_url:
             embed.set_image(url=logo_url)
             
         # Adiciona rodapé
         embed.set_footer(text=f"{server_name} © Todos os direitos reservados")
         
-        # Cria o botão de iniciar whitelist
-        view = discord.ui.View(timeout=None)
-        view.add_item(WhitelistButton())
+        # Cria o botão de iniciar whitelist (registrado como view persistente no carregamento do cog)
+        view = WhitelistPanelView()
         
         # Envia a mensagem com o botão
         await channel.send(embed=embed, view=view)
         await ctx.send("Painel de whitelist configurado com sucesso!")
         
-    async def start_whitelist_channel(self, user, channel):
-        """Inicia o processo de whitelist no canal privado"""
+    async def start_whitelist_channel(self, user, channel, session):
+        """Inicia o processo de whitelist no canal privado, com a sessão reservada antes de criá-lo"""
         # Obtém o nome do servidor
-        server_name = self.config.get('allowlist', {}).get('server_name', 'GTA RP Server')
+        server_name = self.settings(channel.guild).get('allowlist', {}).get('server_name', 'GTA RP Server')
         
         # Cria o embed de boas-vindas
         embed = discord.Embed(
@@ -814,7 +1528,7 @@ class Allowlist(commands.Cog):
         )
         
         # Adiciona o logotipo do servidor como imagem
-        logo_url = self.config.get('allowlist', {}).get('server_logo_url')
+        logo_url = self.settings(channel.guild).get('allowlist', {}).get('server_logo_url')
         if logo_url:
             embed.set_image(url=logo_url)
             
@@ -827,7 +1541,7 @@ class Allowlist(commands.Cog):
             
             # Inicia o questionário após pequeno delay
             await asyncio.sleep(3)
-            await self._process_whitelist_questions(user, channel, in_channel=True)
+            await self._process_whitelist_questions(user, channel, session, in_channel=True)
         except Exception as e:
             logger.error(f"Erro ao iniciar whitelist no canal: {e}")
             await channel.send(
@@ -837,11 +1551,14 @@ class Allowlist(commands.Cog):
                     color="error"
                 )
             )
+        finally:
+            # A partir daqui o canal só existe se a sessão falhou; o reaper cuida dele
+            self.sessions.close(session)
             
     async def start_whitelist_dm(self, user):
         """Inicia o processo de whitelist por DM"""
         # Vamos enviar uma mensagem informativa primeiro
-        server_name = self.config.get('allowlist', {}).get('server_name', 'GTA RP Server')
+        server_name = self.settings(None).get('allowlist', {}).get('server_name', 'GTA RP Server')
         
         # Cria o embed de boas-vindas
         embed = discord.Embed(
@@ -855,26 +1572,35 @@ class Allowlist(commands.Cog):
             color=0x3498db
         )
         
+        session = None
         try:
-            # Envia a mensagem de boas-vindas
             dm_channel = await user.create_dm()
+            session = self.sessions.open(user.id, dm_channel.id, "dm")
+            if session is None:
+                await dm_channel.send(embed=self._sessions_full_embed())
+                return None
+            
+            # Envia a mensagem de boas-vindas
             await dm_channel.send(embed=embed)
             
             # Inicia o questionário
-            await self._process_whitelist_questions(user, dm_channel)
+            await self._process_whitelist_questions(user, dm_channel, session)
         except discord.Forbidden:
             logger.error(f"Não foi possível enviar DM para {user}")
             return None
         except Exception as e:
             logger.error(f"Erro ao iniciar whitelist por DM: {e}")
             return None
+        finally:
+            self.sessions.close(session)
     
-    async def _process_whitelist_questions(self, user, channel, in_channel=False):
+    async def _process_whitelist_questions(self, user, channel, session, in_channel=False):
         """Processa as perguntas da whitelist em formato visual"""
-        questions = self.config.get('allowlist', {}).get('questions', [])
-        correct_answers = self.config.get('allowlist', {}).get('correct_answers', [])
+        config = self.settings(getattr(channel, 'guild', None))
+        # Snapshot do banco de perguntas, mantido até o fim da sessão
+        questions = question_bank()
         
-        if not questions or len(questions) != len(correct_answers):
+        if not questions or questions.max_score == 0:
             await channel.send(
                 embed=create_embed(
                     "Erro", 
@@ -884,46 +1610,28 @@ class Allowlist(commands.Cog):
             )
             return
         
-        # Inicializa score
-        self.user_scores[user.id] = 0
-        answers = []
-        
         # Envia cada pergunta
-        for i, question in enumerate(questions):
+        for question in questions:
             # Cria o embed da pergunta
             embed = discord.Embed(
-                title=f"{i+1}. {question}",
+                title=f"{question.position}. {question.text}",
                 description="Digite sua resposta abaixo.",
                 color=0x2F3136
             )
             
-            await channel.send(embed=embed)
-            
-            # Espera a resposta
+            # Envia e espera a resposta
             try:
-                response = await self.bot.wait_for(
-                    'message',
-                    check=lambda m: m.author == user and m.channel == channel,
-                    timeout=60.0  # 60 segundos para responder
-                )
+                response = await self._ask(user, channel, embed, timeout=60.0)  # 60 segundos para responder
                 
-                # Armazena a resposta
-                answers.append({
-                    'question': question,
+                # Verifica se a resposta contém as palavras-chave da resposta correta
+                # (pontuação = peso da pergunta) e armazena a resposta na sessão
+                session.record({
+                    'question_id': question.id,
+                    'question': question.text,
                     'answer': response.content,
-                    'correct_answer': correct_answers[i]
+                    'score': questions.score(question, response.content)
                 })
                 
-                # Verifica se a resposta está correta (comparação simplificada)
-                user_answer = response.content.lower().strip()
-                correct = correct_answers[i].lower().strip()
-                
-                # Verifica se a resposta contém as palavras-chave da resposta correta
-                is_correct = all(keyword in user_answer for keyword in correct.split()[:3])
-                
-                if is_correct:
-                    self.user_scores[user.id] += 1
-                
             except asyncio.TimeoutError:
                 await channel.send(
                     embed=create_embed(
@@ -934,53 +1642,52 @@ class Allowlist(commands.Cog):
                 )
                 # Se estiver em um canal, agenda a exclusão do canal
                 if in_channel:
-                    await asyncio.sleep(10)
-                    try:
-                        await channel.delete()
-                    except Exception as e:
-                        logger.error(f"Erro ao excluir canal: {e}")
+                    await self._delete_temp_channel(channel, delay=10)
                 return
         
         # Calcula o resultado
-        passing_score = self.config.get('allowlist', {}).get('passing_score', 7)
-        score = self.user_scores[user.id]
-        passed = score >= passing_score
+        passing_score = config.get('allowlist', {}).get('passing_score', 7)
+        score = session.score
+        max_score = questions.max_score
+        # Perguntas obrigatórias precisam estar certas, qualquer que seja a pontuação
+        missed_required = questions.missed_required(session.answers)
+        passed = score >= passing_score and not missed_required
         
         # Cria o embed de resultado
         if passed:
             result_embed = discord.Embed(
                 title="✅ Whitelist Aprovada!",
                 description=(
-                    f"Parabéns! Você acertou {score}/{len(questions)} perguntas.\n\n"
+                    f"Parabéns! Você fez {score}/{max_score} pontos.\n\n"
                     "Seu acesso ao servidor foi liberado. Divirta-se!"
                 ),
                 color=0x2ecc71
             )
             
             # Aprova automaticamente a whitelist
-            add_to_allowlist(user.id, approved_by=self.bot.user.id, status="approved")
+            add_to_allowlist(user.id, approved_by=self.bot.user.id, status="approved", answers=session.answers)
             
             # Gerencia os cargos do usuário
             for guild in self.bot.guilds:
-                member = guild.get_member(user.id)
+                member = await self.bot.member_resolver.get(guild, user.id)
                 if member:
                     try:
                         # Remove cargo de turista
-                        tourist_role_id = self.config.get('roles', {}).get('tourist')
+                        tourist_role_id = self.settings(guild).get('roles', {}).get('tourist')
                         if tourist_role_id:
                             tourist_role = guild.get_role(tourist_role_id)
                             if tourist_role and tourist_role in member.roles:
                                 await member.remove_roles(tourist_role)
                         
                         # Adiciona cargo de morador/residente
-                        resident_role_id = self.config.get('roles', {}).get('resident')
+                        resident_role_id = self.settings(guild).get('roles', {}).get('resident')
                         if resident_role_id:
                             resident_role = guild.get_role(resident_role_id)
                             if resident_role:
                                 await member.add_roles(resident_role)
                                 
                         # Também adiciona o cargo de "allowed" por compatibilidade
-                        allowed_role_id = self.config.get('roles', {}).get('allowed')
+                        allowed_role_id = self.settings(guild).get('roles', {}).get('allowed')
                         if allowed_role_id and allowed_role_id != resident_role_id:
                             allowed_role = guild.get_role(allowed_role_id)
                             if allowed_role:
@@ -990,14 +1697,14 @@ class Allowlist(commands.Cog):
             
             # Notifica canal de aprovados
             try:
-                approved_channel_id = self.config.get('channels', {}).get('allowlist_approved')
+                approved_channel_id = config.get('channels', {}).get('allowlist_approved')
                 if approved_channel_id:
                     approved_channel = self.bot.get_channel(approved_channel_id)
                     if approved_channel:
                         await approved_channel.send(
                             embed=discord.Embed(
                                 title="Nova Whitelist Aprovada",
-                                description=f"{user.mention} foi aprovado na whitelist com {score}/{len(questions)} acertos!",
+                                description=f"{user.mention} foi aprovado na whitelist com {score}/{max_score} pontos!",
                                 color=0x2ecc71
                             ).set_thumbnail(url=user.display_avatar.url)
                         )
@@ -1006,14 +1713,14 @@ class Allowlist(commands.Cog):
                 
             # Notifica canal de resultados geral
             try:
-                results_channel_id = self.config.get('channels', {}).get('allowlist_results')
+                results_channel_id = config.get('channels', {}).get('allowlist_results')
                 if results_channel_id:
                     results_channel = self.bot.get_channel(results_channel_id)
                     if results_channel:
                         await results_channel.send(
                             embed=discord.Embed(
                                 title="Resultado de Whitelist",
-                                description=f"✅ {user.mention} foi **APROVADO** na whitelist com {score}/{len(questions)} acertos!",
+                                description=f"✅ {user.mention} foi **APROVADO** na whitelist com {score}/{max_score} pontos!",
                                 color=0x2ecc71,
                                 timestamp=datetime.now().astimezone()
                             ).set_thumbnail(url=user.display_avatar.url)
@@ -1025,25 +1732,29 @@ class Allowlist(commands.Cog):
             result_embed = discord.Embed(
                 title="❌ Whitelist Reprovada",
                 description=(
-                    f"Você acertou {score}/{len(questions)} perguntas, mas são necessários {passing_score} acertos para aprovação.\n\n"
-                    "Você pode tentar novamente mais tarde."
+                    (
+                        f"Você errou {len(missed_required)} pergunta(s) obrigatória(s).\n\n"
+                        if missed_required else
+                        f"Você fez {score}/{max_score} pontos, mas são necessários {passing_score} pontos para aprovação.\n\n"
+                    )
+                    + "Você pode tentar novamente mais tarde."
                 ),
                 color=0xe74c3c
             )
             
             # Registra a reprovação
-            add_to_allowlist(user.id, approved_by=None, status="rejected")
+            add_to_allowlist(user.id, approved_by=None, status="rejected", answers=session.answers)
             
             # Notifica canal de reprovados
             try:
-                rejected_channel_id = self.config.get('channels', {}).get('allowlist_rejected')
+                rejected_channel_id = config.get('channels', {}).get('allowlist_rejected')
                 if rejected_channel_id:
                     rejected_channel = self.bot.get_channel(rejected_channel_id)
                     if rejected_channel:
                         await rejected_channel.send(
                             embed=discord.Embed(
                                 title="Whitelist Reprovada",
-                                description=f"{user.mention} foi reprovado na whitelist com {score}/{len(questions)} acertos.",
+                                description=f"{user.mention} foi reprovado na whitelist com {score}/{max_score} pontos.",
                                 color=0xe74c3c
                             ).set_thumbnail(url=user.display_avatar.url)
                         )
@@ -1052,14 +1763,14 @@ class Allowlist(commands.Cog):
                 
             # Notifica canal de resultados geral
             try:
-                results_channel_id = self.config.get('channels', {}).get('allowlist_results')
+                results_channel_id = config.get('channels', {}).get('allowlist_results')
                 if results_channel_id:
                     results_channel = self.bot.get_channel(results_channel_id)
                     if results_channel:
                         await results_channel.send(
                             embed=discord.Embed(
                                 title="Resultado de Whitelist",
-                                description=f"❌ {user.mention} foi **REPROVADO** na whitelist com {score}/{len(questions)} acertos.",
+                                description=f"❌ {user.mention} foi **REPROVADO** na whitelist com {score}/{max_score} pontos.",
                                 color=0xe74c3c,
                                 timestamp=datetime.now().astimezone()
                             ).set_thumbnail(url=user.display_avatar.url)
@@ -1077,31 +1788,16 @@ class Allowlist(commands.Cog):
         except Exception as e:
             logger.error(f"Erro ao enviar resultado por DM: {e}")
         
-        # Registra as respostas no banco de dados
-        try:
-            answers_json = json.dumps(answers)
-            update_allowlist_status(
-                user.id, 
-                "approved" if passed else "rejected",
-                self.bot.user.id if passed else None,
-                answers_json
-            )
-        except Exception as e:
-            logger.error(f"Erro ao salvar respostas: {e}")
-            
         # Se estamos em um canal temporário, agenda sua exclusão
         if in_channel:
-            await asyncio.sleep(30)  # Aguarda 30 segundos para o usuário ler o resultado
-            try:
-                await channel.delete()
-            except Exception as e:
-                logger.error(f"Erro ao excluir canal: {e}")
+            # Aguarda 30 segundos para o usuário ler o resultado
+            await self._delete_temp_channel(channel, delay=30)
             
-    async def _notify_approved_channels(self, user, approver):
+    async def _notify_approved_channels(self, user, approver, guild=None):
         """Notifica os canais configurados sobre uma aprovação de whitelist"""
         # Notifica canal de aprovados
         try:
-            approved_channel_id = self.config.get('channels', {}).get('allowlist_approved')
+            approved_channel_id = self.settings(guild).get('channels', {}).get('allowlist_approved')
             if approved_channel_id:
                 approved_channel = self.bot.get_channel(approved_channel_id)
                 if approved_channel:
@@ -1121,7 +1817,7 @@ class Allowlist(commands.Cog):
             
         # Notifica canal de resultados geral
         try:
-            results_channel_id = self.config.get('channels', {}).get('allowlist_results')
+            results_channel_id = self.settings(guild).get('channels', {}).get('allowlist_results')
             if results_channel_id:
                 results_channel = self.bot.get_channel(results_channel_id)
                 if results_channel:
@@ -1139,11 +1835,11 @@ class Allowlist(commands.Cog):
         except Exception as e:
             logger.error(f"Erro ao enviar resultado: {e}")
     
-    async def _notify_rejected_channels(self, user, rejecter, reason="Não especificado"):
+    async def _notify_rejected_channels(self, user, rejecter, reason="Não especificado", guild=None):
         """Notifica os canais configurados sobre uma rejeição de whitelist"""
         # Notifica canal de reprovados
         try:
-            rejected_channel_id = self.config.get('channels', {}).get('allowlist_rejected')
+            rejected_channel_id = self.settings(guild).get('channels', {}).get('allowlist_rejected')
             if rejected_channel_id:
                 rejected_channel = self.bot.get_channel(rejected_channel_id)
                 if rejected_channel:
@@ -1166,7 +1862,7 @@ class Allowlist(commands.Cog):
             
         # Notifica canal de resultados geral
         try:
-            results_channel_id = self.config.get('channels', {}).get('allowlist_results')
+            results_channel_id = self.settings(guild).get('channels', {}).get('allowlist_results')
             if results_channel_id:
                 results_channel = self.bot.get_channel(results_channel_id)
                 if results_channel:
@@ -1187,19 +1883,16 @@ class Allowlist(commands.Cog):
         except Exception as e:
             logger.error(f"Erro ao enviar resultado: {e}")
     
-    @allowlist.command(name="dashboard")
-    @commands.has_permissions(administrator=True)
-    async def dashboard(self, ctx):
-        """Painel de controle e status da whitelist"""
-        from utils.db import get_allowlist
-        
-        # Obtém todas as entradas da whitelist
-        entries = get_allowlist()
-        
-        # Separa por status
-        approved = [e for e in entries if e['status'] == 'approved']
-        pending = [e for e in entries if e['status'] == 'pending']
-        rejected = [e for e in entries if e['status'] == 'rejected']
+    def build_dashboard_embed(self, guild):
+        """Monta o embed do dashboard e retorna (embed, primeira página de pendentes)"""
+        # Contadores materializados e apenas a primeira página de pendentes
+        stats = get_allowlist_stats()
+        approved_count = stats.get('approved', 0)
+        pending_count = stats.get('pending', 0)
+        rejected_count = stats.get('rejected', 0)
+        total_count = sum(stats.values())
+        pending = get_allowlist_page('pending', limit=5)
+        last_day = get_allowlist_timeseries(hours=24)
         
         # Cria o embed principal do dashboard
         embed = discord.Embed(
@@ -1212,21 +1905,48 @@ class Allowlist(commands.Cog):
         embed.add_field(
             name="📈 Estatísticas",
             value=(
-                f"**Total de entradas:** {len(entries)}\n"
-                f"**Aprovados:** {len(approved)}\n"
-                f"**Pendentes:** {len(pending)}\n"
-                f"**Reprovados:** {len(rejected)}\n"
+                f"**Total de entradas:** {total_count}\n"
+                f"**Aprovados:** {approved_count}\n"
+                f"**Pendentes:** {pending_count}\n"
+                f"**Reprovados:** {rejected_count}\n"
+            ),
+            inline=False
+        )
+        
+        # Atividade das últimas 24 horas
+        applied_24h = sum(point['applied'] for point in last_day)
+        approved_24h = sum(point['approved'] for point in last_day)
+        rejected_24h = sum(point['rejected'] for point in last_day)
+        embed.add_field(
+            name="🕒 Últimas 24 horas",
+            value=(
+                f"**Aplicações:** {applied_24h}\n"
+                f"**Aprovadas:** {approved_24h}\n"
+                f"**Reprovadas:** {rejected_24h}\n"
+                f"**Taxa de aprovação:** {self._format_approval_rate(approved_24h, rejected_24h)}\n"
             ),
             inline=False
         )
         
+        # Resumo diário da última semana
+        last_week = get_allowlist_daily_counts(days=7)
+        if last_week:
+            embed.add_field(
+                name="📅 Últimos 7 dias",
+                value="\n".join(
+                    f"`{point['day'][5:]}` 📝 {point['applied']} • ✅ {point['approved']} • ❌ {point['rejected']}"
+                    for point in last_week
+                ),
+                inline=False
+            )
+        
         # Configurações atuais
         embed.add_field(
             name="⚙️ Configurações",
             value=(
-                f"**Pontuação mínima:** {self.config.get('allowlist', {}).get('passing_score', 7)}\n"
-                f"**Idade mínima da conta:** {self.config.get('allowlist', {}).get('min_account_age_days', 7)} dias\n"
-                f"**Aprovação automática:** {'Ativada' if self.config.get('allowlist', {}).get('auto_approve', False) else 'Desativada'}\n"
+                f"**Pontuação mínima:** {self.settings(guild).get('allowlist', {}).get('passing_score', 7)}\n"
+                f"**Idade mínima da conta:** {self.settings(guild).get('allowlist', {}).get('min_account_age_days', 7)} dias\n"
+                f"**Aprovação automática:** {'Ativada' if self.settings(guild).get('allowlist', {}).get('auto_approve', False) else 'Desativada'}\n"
             ),
             inline=False
         )
@@ -1234,13 +1954,11 @@ class Allowlist(commands.Cog):
         # Aplicações pendentes
         if pending:
             pending_text = ""
-            for i, entry in enumerate(pending[:5]):
-                user = ctx.guild.get_member(entry['user_id'])
-                username = f"{user.mention}" if user else f"ID: {entry['user_id']}"
-                pending_text += f"{i+1}. {username}\n"
+            for i, entry in enumerate(pending):
+                pending_text += f"{i+1}. <@{entry['user_id']}>\n"
             
-            if len(pending) > 5:
-                pending_text += f"*E mais {len(pending) - 5} aplicações pendentes...*"
+            if pending_count > len(pending):
+                pending_text += f"*E mais {pending_count - len(pending)} aplicações pendentes... Use `!allowlist list pending` para ver todas.*"
                 
             embed.add_field(
                 name="⏳ Aplicações Pendentes",
@@ -1248,40 +1966,154 @@ class Allowlist(commands.Cog):
                 inline=False
             )
         
+        return embed, pending
+    
+    @allowlist.command(name="dashboard")
+    @commands.has_permissions(administrator=True)
+    async def dashboard(self, ctx):
+        """Painel de controle e status da whitelist"""
+        embed, pending = self.build_dashboard_embed(ctx.guild)
+        
         # Envia o dashboard
         await ctx.send(embed=embed)
         
         # Se houver pendentes, oferece revisão
         if pending:
-            # Cria botões para revisar
-            view = discord.ui.View(timeout=None)
-            
-            # Adiciona botão para revisar próximo
-            review_button = discord.ui.Button(
-                style=discord.ButtonStyle.primary,
-                label="Revisar Próximo Pendente",
-                custom_id="review_next_pending"
-            )
-            
-            # Define callback para o botão
-            async def review_callback(interaction):
-                if interaction.user.id != ctx.author.id:
-                    await interaction.response.send_message("Apenas o administrador que iniciou esta ação pode revisar.", ephemeral=True)
-                    return
-                
-                # Obtém a próxima aplicação pendente
-                entry = pending[0]
-                user_id = entry['user_id']
-                
-                # Chama o método de revisão
-                await interaction.response.defer()
-                await self.review_application(interaction, user_id)
-                
-            review_button.callback = review_callback
-            view.add_item(review_button)
-            
+            view = ReviewNextPendingView()
             await ctx.send("Deseja revisar as aplicações pendentes?", view=view)
     
+    @staticmethod
+    def _format_approval_rate(approved, rejected):
+        """Formata a taxa de aprovação entre as decisões tomadas"""
+        decided = approved + rejected
+        if not decided:
+            return "N/A"
+        return f"{approved / decided:.0%}"
+    
+    @allowlist.command(name="stats")
+    @commands.check(can_use_allowlist_commands)
+    async def stats(self, ctx, hours: int = 12):
+        """Mostra aplicações por hora e taxa de aprovação das últimas horas"""
+        hours = max(1, min(hours, 72))
+        series = get_allowlist_timeseries(hours=hours)
+        
+        if not series:
+            await ctx.send(
+                embed=create_embed(
+                    "Estatísticas de Whitelist", 
+                    f"Nenhuma atividade registrada nas últimas {hours} horas.",
+                    color="info"
+                )
+            )
+            return
+        
+        lines = []
+        for point in series:
+            rate = self._format_approval_rate(point['approved'], point['rejected'])
+            lines.append(
+                f"`{point['bucket'][5:]}` 📝 {point['applied']} • ✅ {point['approved']} • ❌ {point['rejected']} • {rate}"
+            )
+        
+        approved = sum(point['approved'] for point in series)
+        rejected = sum(point['rejected'] for point in series)
+        
+        await ctx.send(
+            embed=create_embed(
+                f"Estatísticas de Whitelist - últimas {hours}h", 
+                "\n".join(lines[-24:]),
+                color="info",
+                fields=[
+                    {"name": "Aplicações", "value": str(sum(point['applied'] for point in series)), "inline": True},
+                    {"name": "Taxa de aprovação", "value": self._format_approval_rate(approved, rejected), "inline": True}
+                ]
+            )
+        )
+    
+    @allowlist.command(name="rebuild_stats")
+    @commands.has_permissions(administrator=True)
+    async def rebuild_stats(self, ctx):
+        """Recalcula os contadores da whitelist a partir da tabela principal"""
+        stats = rebuild_allowlist_stats()
+        
+        if stats is None:
+            await ctx.send(
+                embed=create_embed(
+                    "Erro", 
+                    "Não foi possível recalcular as estatísticas. Verifique os logs.",
+                    color="error"
+                )
+            )
+            return
+        
+        summary = "\n".join(f"**{status}:** {count}" for status, count in sorted(stats.items())) or "Nenhuma entrada."
+        await ctx.send(
+            embed=create_embed(
+                "Estatísticas Recalculadas", 
+                summary,
+                color="success"
+            )
+        )
+    
+    @allowlist.command(name="sessions")
+    @commands.check(can_use_allowlist_commands)
+    async def sessions_command(self, ctx):
+        """Mostra as sessões de whitelist em andamento e a memória usada por elas"""
+        expired = self.sessions.sweep()
+        now = time.monotonic()
+        live = sorted(self.sessions.sessions.values(), key=lambda session: session.started_at)
+        
+        lines = [
+            f"<@{session.user_id}> · {session.kind} · pergunta {session.question + 1} · "
+            f"{(now - session.started_at) / 60:.0f} min"
+            for session in live[:15]
+        ]
+        if len(live) > 15:
+            lines.append(f"... e mais {len(live) - 15}")
+        
+        await ctx.send(
+            embed=create_embed(
+                "Sessões de Whitelist",
+                "\n".join(lines) or "Nenhuma sessão em andamento.",
+                color="info",
+                fields=[
+                    {"name": "Em andamento", "value": f"{len(self.sessions)}/{self.sessions.max_sessions}", "inline": True},
+                    {"name": "Memória", "value": f"{self.sessions.nbytes() / 1024:.1f} KiB", "inline": True},
+                    {"name": "Expiradas / recusadas", "value": f"{self.sessions.expired} / {self.sessions.refused}", "inline": True}
+                ]
+            ).set_footer(text=f"Sessões sem atividade por {self.sessions.ttl // 60} min expiram" + (f" · {expired} expiradas agora" if expired else ""))
+        )
+    
+    @allowlist.command(name="question_stats")
+    @commands.check(can_use_allowlist_commands)
+    async def question_stats(self, ctx):
+        """Mostra a taxa de acerto de cada pergunta da whitelist"""
+        rows = get_question_stats()
+        
+        if not rows:
+            await ctx.send(
+                embed=create_embed(
+                    "Estatísticas por Pergunta", 
+                    "Nenhuma resposta avaliada registrada ainda.",
+                    color="info"
+                )
+            )
+            return
+        
+        lines = []
+        for row in rows:
+            question = row['question'] or f"Pergunta {row['question_id']}"
+            if len(question) > 60:
+                question = question[:57] + "..."
+            lines.append(f"**{row['question_id']}.** {question}\n{row['correct']}/{row['answered']} acertos ({row['correct_rate']:.0%})")
+        
+        await ctx.send(
+            embed=create_embed(
+                "Estatísticas por Pergunta", 
+                "\n".join(lines),
+                color="info"
+            )
+        )
+    
     async def review_application(self, interaction, user_id):
         """Revisão interativa de uma aplicação pendente"""
         # Obtém a entrada da whitelist
@@ -1311,18 +2143,15 @@ class Allowlist(commands.Cog):
         
         # Obtém o usuário do servidor
         guild = interaction.guild
-        user = guild.get_member(user_id)
+        user = await interaction.client.member_resolver.get(guild, user_id)
         
         if not user:
             user_display = f"ID: {user_id} (não está no servidor)"
         else:
             user_display = f"{user.mention} ({user.name})"
         
-        # Analisa as respostas
-        try:
-            answers = json.loads(entry['answers'])
-        except (json.JSONDecodeError, TypeError):
-            answers = []
+        # Busca apenas as respostas da tentativa em revisão
+        answers = get_application_answers(user_id, entry['attempt'])
         
         # Cria um embed com as respostas (como na interface da imagem)
         review_embed = discord.Embed(
@@ -1336,20 +2165,15 @@ class Allowlist(commands.Cog):
         
         # Adiciona cada pergunta e resposta como um campo
         for i, qa in enumerate(answers):
-            question = qa.get('question', 'Pergunta desconhecida')
-            answer = qa.get('answer', 'Sem resposta')
+            question = qa['question'] or 'Pergunta desconhecida'
+            answer = qa['answer'] or 'Sem resposta'
             
-            # Verifica se a resposta está correta
-            correct_answer = qa.get('correct_answer', '')
-            user_answer = answer.lower().strip()
-            correct = correct_answer.lower().strip()
-            
-            # Verifica se contém palavras-chave da resposta correta
-            is_correct = all(keyword in user_answer for keyword in correct.split()[:3])
-            
-            # Formata o campo com emoji de correto/incorreto
+            # Formata o campo com emoji de correto/incorreto (pontuação salva na resposta)
             field_name = f"{i+1}. {question}"
-            field_value = f"{'✅' if is_correct else '❌'} {answer}"
+            if qa['score'] is None:
+                field_value = answer
+            else:
+                field_value = f"{'✅' if qa['score'] else '❌'} {answer}"
             
             review_embed.add_field(
                 name=field_name,
@@ -1358,14 +2182,178 @@ class Allowlist(commands.Cog):
             )
         
         # Adiciona um rodapé com a data da aplicação
-        if entry.get('created_at'):
-            review_embed.set_footer(text=f"Aplicação enviada em: {entry['created_at']}")
+        if answers and answers[0]['answered_at']:
+            review_embed.set_footer(text=f"Aplicação enviada em: {answers[0]['answered_at']}")
         
         # Cria os botões de aprovação/rejeição
-        view = WhitelistReviewButtons(user_id, self.bot)
+        view = WhitelistReviewButtons(user_id)
         
         # Envia o embed de revisão com os botões
-        await interaction.followup.send(embed=review_embed, view=view)
+        message = await interaction.followup.send(embed=review_embed, view=view, wait=True)
+        add_review_message(message.id, message.channel.id, user_id)
+    
+    @allowlist.group(name="questions", aliases=["perguntas"], invoke_without_command=True)
+    @commands.check(can_use_allowlist_commands)
+    async def questions(self, ctx):
+        """Lista as perguntas ativas da whitelist, na ordem em que são feitas
+        
+        Subcomandos (administradores):
+        - add <pergunta> | <resposta esperada> [| peso]
+        - move <id> <posição>
+        - weight <id> <peso>
+        - required <id> <sim/não>
+        - retire <id>
+        """
+        bank = question_bank()
+        if not bank:
+            await ctx.send(
+                embed=create_embed(
+                    "Perguntas da Whitelist",
+                    "Nenhuma pergunta ativa. Use `!allowlist questions add <pergunta> | <resposta esperada>`.",
+                    color="warning"
+                )
+            )
+            return
+        
+        lines = []
+        for question in bank:
+            text = question.text if len(question.text) <= 80 else question.text[:77] + "..."
+            flags = f"peso {question.weight}" + (", obrigatória" if question.required else "") + ("" if question.keywords else ", sem gabarito")
+            lines.append(f"**{question.position}.** `#{question.id}` ({flags})\n{text}")
+        
+        await ctx.send(
+            embed=create_embed(
+                "Perguntas da Whitelist",
+                "\n".join(lines)[:4000],
+                color="info",
+                footer=f"{len(bank)} perguntas · pontuação máxima {bank.max_score}"
+            )
+        )
+    
+    @questions.command(name="add")
+    @commands.has_permissions(administrator=True)
+    async def questions_add(self, ctx, *, text=None):
+        """Adiciona uma pergunta ao fim da whitelist: <pergunta> | <resposta esperada> [| peso]"""
+        parts = [part.strip() for part in (text or "").split("|")]
+        question, answer_key = (parts + ["", ""])[:2]
+        weight = parts[2] if len(parts) == 3 else "1"
+        if len(parts) > 3 or not question or not answer_key or not weight.isdigit() or int(weight) < 1:
+            await ctx.send(
+                embed=create_embed(
+                    "Erro",
+                    "Uso: `!allowlist questions add <pergunta> | <resposta esperada> [| peso]` (peso a partir de 1).",
+                    color="error"
+                )
+            )
+            return
+        weight = int(weight)
+        
+        question_id = add_question(question, answer_key, weight)
+        if question_id is None:
+            await ctx.send(embed=self._settings_error_embed())
+            return
+        await ctx.send(
+            embed=create_embed(
+                "Pergunta Adicionada",
+                f"Pergunta `#{question_id}` adicionada na posição {len(question_bank())}, com peso {weight}.",
+                color="success"
+            )
+        )
+    
+    @questions.command(name="move")
+    @commands.has_permissions(administrator=True)
+    async def questions_move(self, ctx, question_id: int, position: int):
+        """Muda a posição de uma pergunta na whitelist"""
+        if not move_question(question_id, position):
+            await ctx.send(embed=self._question_not_found_embed(question_id))
+            return
+        # Se o banco não puder ser relido agora, informa a posição pedida
+        moved = question_bank().get(question_id)
+        await ctx.send(
+            embed=create_embed(
+                "Pergunta Movida",
+                f"A pergunta `#{question_id}` agora é a {moved.position if moved else position}ª.",
+                color="success"
+            )
+        )
+    
+    @questions.command(name="weight")
+    @commands.has_permissions(administrator=True)
+    async def questions_weight(self, ctx, question_id: int, weight: int):
+        """Define quantos pontos vale uma pergunta"""
+        if weight < 1:
+            await ctx.send(embed=create_embed("Erro", "O peso deve ser a partir de 1.", color="error"))
+            return
+        if not update_question(question_id, weight=weight):
+            await ctx.send(embed=self._question_not_found_embed(question_id))
+            return
+        await ctx.send(
+            embed=create_embed(
+                "Peso Atualizado",
+                f"A pergunta `#{question_id}` agora vale {weight} ponto(s). Pontuação máxima: {question_bank().max_score}.",
+                color="success"
+            )
+        )
+    
+    @questions.command(name="required")
+    @commands.has_permissions(administrator=True)
+    async def questions_required(self, ctx, question_id: int, value: str):
+        """Marca uma pergunta como obrigatória: errá-la reprova, qualquer que seja a pontuação"""
+        if value.lower() in ["true", "yes", "sim", "1", "on"]:
+            required = True
+        elif value.lower() in ["false", "no", "não", "nao", "0", "off"]:
+            required = False
+        else:
+            await ctx.send(embed=create_embed("Erro", "O valor deve ser 'sim' ou 'não'.", color="error"))
+            return
+        question = question_bank().get(question_id)
+        if required and question is not None and not question.keywords:
+            await ctx.send(
+                embed=create_embed(
+                    "Erro",
+                    f"A pergunta `#{question_id}` não tem resposta esperada, então não pode ser corrigida nem ser obrigatória.",
+                    color="error"
+                )
+            )
+            return
+        if not update_question(question_id, required=required):
+            await ctx.send(embed=self._question_not_found_embed(question_id))
+            return
+        await ctx.send(
+            embed=create_embed(
+                "Pergunta Atualizada",
+                f"A pergunta `#{question_id}` {'agora é' if required else 'deixou de ser'} obrigatória.",
+                color="success"
+            )
+        )
+    
+    @questions.command(name="retire")
+    @commands.has_permissions(administrator=True)
+    async def questions_retire(self, ctx, question_id: int):
+        """Remove uma pergunta da whitelist (as respostas já registradas são mantidas)"""
+        if not retire_question(question_id):
+            await ctx.send(embed=self._question_not_found_embed(question_id))
+            return
+        bank = question_bank()
+        passing_score = self.settings(ctx.guild).get('allowlist', {}).get('passing_score', 7)
+        warning = (
+            f"\n⚠️ A pontuação mínima ({passing_score}) agora é maior que a máxima ({bank.max_score})."
+            if passing_score > bank.max_score else ""
+        )
+        await ctx.send(
+            embed=create_embed(
+                "Pergunta Retirada",
+                f"A pergunta `#{question_id}` não será mais feita. Restam {len(bank)} perguntas.{warning}",
+                color="success"
+            )
+        )
+    
+    def _question_not_found_embed(self, question_id):
+        return create_embed(
+            "Erro",
+            f"Nenhuma pergunta ativa com o id `#{question_id}`. Veja os ids com `!allowlist questions`.",
+            color="error"
+        )
     
     @allowlist.command(name="configure")
     @commands.has_permissions(administrator=True)
@@ -1388,7 +2376,7 @@ class Allowlist(commands.Cog):
             embed.add_field(
                 name="Comandos de Configuração",
                 value=(
-                    f"`!allowlist configure passing_score <valor>` - Define pontuação mínima (1-10)\n"
+                    f"`!allowlist configure passing_score <valor>` - Define pontuação mínima (1 até a soma dos pesos)\n"
                     f"`!allowlist configure min_account_age <dias>` - Define idade mínima da conta\n"
                     f"`!allowlist configure auto_approve <true/false>` - Ativa/desativa aprovação automática\n"
                 ),
@@ -1398,9 +2386,9 @@ class Allowlist(commands.Cog):
             embed.add_field(
                 name="Valores Atuais",
                 value=(
-                    f"**Pontuação mínima:** {self.config.get('allowlist', {}).get('passing_score', 7)}\n"
-                    f"**Idade mínima da conta:** {self.config.get('allowlist', {}).get('min_account_age_days', 7)} dias\n"
-                    f"**Aprovação automática:** {'Ativada' if self.config.get('allowlist', {}).get('auto_approve', False) else 'Desativada'}\n"
+                    f"**Pontuação mínima:** {self.settings(ctx.guild).get('allowlist', {}).get('passing_score', 7)}\n"
+                    f"**Idade mínima da conta:** {self.settings(ctx.guild).get('allowlist', {}).get('min_account_age_days', 7)} dias\n"
+                    f"**Aprovação automática:** {'Ativada' if self.settings(ctx.guild).get('allowlist', {}).get('auto_approve', False) else 'Desativada'}\n"
                 ),
                 inline=False
             )
@@ -1419,33 +2407,24 @@ class Allowlist(commands.Cog):
             )
             return
         
-        # Atualiza a configuração
-        config = load_config()
-        
         if setting == "passing_score":
             try:
                 score = int(value)
-                if score < 1 or score > 10:
+                max_score = question_bank().max_score
+                if score < 1 or score > max_score:
                     await ctx.send(
                         embed=create_embed(
                             "Erro", 
-                            "A pontuação mínima deve ser um número entre 1 e 10.",
+                            f"A pontuação mínima deve ser um número entre 1 e {max_score} (a soma dos pesos das perguntas).",
                             color="error"
                         )
                     )
                     return
                 
-                # Atualiza a configuração
-                if 'allowlist' not in config:
-                    config['allowlist'] = {}
-                config['allowlist']['passing_score'] = score
-                
-                # Salva a configuração
-                with open('config.json', 'w') as f:
-                    json.dump(config, f, indent=4)
-                
-                # Recarrega a configuração
-                self.config = load_config()
+                # Salva a configuração deste servidor (os ouvintes atualizam o dashboard, também nos outros processos)
+                if update_guild_settings(ctx.guild.id, {"allowlist.passing_score": score}) is None:
+                    await ctx.send(embed=self._settings_error_embed())
+                    return
                 
                 await ctx.send(
                     embed=create_embed(
@@ -1476,17 +2455,10 @@ class Allowlist(commands.Cog):
                     )
                     return
                 
-                # Atualiza a configuração
-                if 'allowlist' not in config:
-                    config['allowlist'] = {}
-                config['allowlist']['min_account_age_days'] = days
-                
-                # Salva a configuração
-                with open('config.json', 'w') as f:
-                    json.dump(config, f, indent=4)
-                
-                # Recarrega a configuração
-                self.config = load_config()
+                # Salva a configuração deste servidor (os ouvintes atualizam o dashboard, também nos outros processos)
+                if update_guild_settings(ctx.guild.id, {"allowlist.min_account_age_days": days}) is None:
+                    await ctx.send(embed=self._settings_error_embed())
+                    return
                 
                 await ctx.send(
                     embed=create_embed(
@@ -1519,17 +2491,10 @@ class Allowlist(commands.Cog):
                 )
                 return
             
-            # Atualiza a configuração
-            if 'allowlist' not in config:
-                config['allowlist'] = {}
-            config['allowlist']['auto_approve'] = auto_approve
-            
-            # Salva a configuração
-            with open('config.json', 'w') as f:
-                json.dump(config, f, indent=4)
-            
-            # Recarrega a configuração
-            self.config = load_config()
+            # Salva a configuração deste servidor (os ouvintes atualizam o dashboard, também nos outros processos)
+            if update_guild_settings(ctx.guild.id, {"allowlist.auto_approve": auto_approve}) is None:
+                await ctx.send(embed=self._settings_error_embed())
+                return
             
             await ctx.send(
                 embed=create_embed(
@@ -1549,49 +2514,40 @@ class Allowlist(commands.Cog):
     
     @allowlist.command(name="list")
     @commands.check(can_use_allowlist_commands)
-    async def list_allowlist(self, ctx):
-        """List all users on the allowlist"""
-        from utils.db import get_allowlist
+    async def list_allowlist(self, ctx, status: str = "approved"):
+        """List users on the allowlist, one page at a time (status: approved, pending, rejected)"""
+        status = status.lower()
+        titles = {
+            "approved": "Allowlist - Approved Users",
+            "pending": "Allowlist - Pending Applications",
+            "rejected": "Allowlist - Rejected Applications"
+        }
+        
+        if status not in titles:
+            await ctx.send(
+                embed=create_embed(
+                    "Error", 
+                    "Invalid status. Use `approved`, `pending` or `rejected`.",
+                    color="error"
+                )
+            )
+            return
         
-        entries = get_allowlist()
+        # Only the first page is fetched now; the buttons fetch the others on demand
+        view = AllowlistPaginator(ctx.author.id, ctx.guild, status, titles[status])
+        view.load_first_page()
         
-        if not entries:
+        if not view.entries:
             await ctx.send(
                 embed=create_embed(
                     "Allowlist", 
-                    "There are no users on the allowlist.",
+                    f"There are no {status} entries on the allowlist.",
                     color="info"
                 )
             )
             return
         
-        # Filter to show only approved entries
-        approved_entries = [e for e in entries if e['status'] == 'approved']
-        pending_entries = [e for e in entries if e['status'] == 'pending']
-        
-        # Create paginated embeds for approved users
-        if approved_entries:
-            approved_text = "**Approved Users:**\n"
-            for entry in approved_entries[:20]:  # Limit to 20 users per page
-                user = ctx.guild.get_member(entry['user_id'])
-                username = user.mention if user else f"Unknown User ({entry['user_id']})"
-                approved_text += f"• {username}\n"
-            
-            if len(approved_entries) > 20:
-                approved_text += f"\n*And {len(approved_entries) - 20} more users...*"
-        else:
-            approved_text = "No approved users."
-        
-        # Show count of pending applications
-        pending_text = f"There are **{len(pending_entries)}** pending applications."
-        
-        await ctx.send(
-            embed=create_embed(
-                "Allowlist Status", 
-                f"{approved_text}\n\n{pending_text}",
-                color="info"
-            )
-        )
+        view.message = await ctx.send(embed=view.build_embed(), view=view)
     
     @allowlist.command(name="review")
     @commands.check(can_use_allowlist_commands)
@@ -1622,17 +2578,14 @@ class Allowlist(commands.Cog):
                 return
             
             # Get the user from the guild
-            user = ctx.guild.get_member(user_id)
+            user = await self.bot.member_resolver.get(ctx.guild, user_id)
             if not user:
                 user_display = f"ID: {user_id} (não está no servidor)"
             else:
                 user_display = f"{user.mention} ({user.name})"
             
-            # Parse the answers
-            try:
-                answers = json.loads(entry['answers'])
-            except (json.JSONDecodeError, TypeError):
-                answers = []
+            # Fetch only the answers of the attempt under review
+            answers = get_application_answers(user_id, entry['attempt'])
             
             # Create an embed with the answers (like the image interface)
             review_embed = discord.Embed(
@@ -1645,30 +2598,16 @@ class Allowlist(commands.Cog):
                 review_embed.set_thumbnail(url=user.display_avatar.url)
             
             # Add each question and answer as a field
-            correct_answers = self.config.get('allowlist', {}).get('correct_answers', [])
-            
             for i, qa in enumerate(answers):
-                question = qa.get('question', 'Pergunta desconhecida')
-                answer = qa.get('answer', 'Sem resposta')
-                
-                # Check if the answer is correct if possible
-                correct_answer = None
-                if i < len(correct_answers):
-                    correct_answer = correct_answers[i]
+                question = qa['question'] or 'Pergunta desconhecida'
+                answer = qa['answer'] or 'Sem resposta'
                 
-                if correct_answer:
-                    user_answer = answer.lower().strip()
-                    correct = correct_answer.lower().strip()
-                    
-                    # Check if it contains keywords of the correct answer
-                    is_correct = all(keyword in user_answer for keyword in correct.split()[:3])
-                    
-                    # Format field with correct/incorrect emoji
-                    field_name = f"{i+1}. {question}"
-                    field_value = f"{'✅' if is_correct else '❌'} {answer}"
-                else:
-                    field_name = f"{i+1}. {question}"
+                # Format field with correct/incorrect emoji when the answer was scored
+                field_name = f"{i+1}. {question}"
+                if qa['score'] is None:
                     field_value = answer
+                else:
+                    field_value = f"{'✅' if qa['score'] else '❌'} {answer}"
                 
                 review_embed.add_field(
                     name=field_name,
@@ -1677,14 +2616,15 @@ class Allowlist(commands.Cog):
                 )
             
             # Add footer with application date
-            if entry.get('created_at'):
-                review_embed.set_footer(text=f"Aplicação enviada em: {entry['created_at']}")
+            if answers and answers[0]['answered_at']:
+                review_embed.set_footer(text=f"Aplicação enviada em: {answers[0]['answered_at']}")
             
             # Create approval/rejection buttons
-            view = WhitelistReviewButtons(user_id, self.bot)
+            view = WhitelistReviewButtons(user_id)
             
             # Send the review embed with buttons
-            await ctx.send(embed=review_embed, view=view)
+            message = await ctx.send(embed=review_embed, view=view)
+            add_review_message(message.id, message.channel.id, user_id)
                 
         except Exception as e:
             logger.error(f"Erro ao revisar aplicação: {e}")
@@ -1709,7 +2649,7 @@ class Allowlist(commands.Cog):
         if entry and entry['status'] == 'approved':
             try:
                 # Remove cargo de turista
-                tourist_role_id = self.config.get('roles', {}).get('tourist')
+                tourist_role_id = self.settings(member.guild).get('roles', {}).get('tourist')
                 if tourist_role_id:
                     tourist_role = member.guild.get_role(tourist_role_id)
                     if tourist_role and tourist_role in member.roles:
@@ -1717,7 +2657,7 @@ class Allowlist(commands.Cog):
                         logger.info(f"Removido cargo de turista de {member.id} ao entrar no servidor")
                 
                 # Adiciona cargo de morador/residente
-                resident_role_id = self.config.get('roles', {}).get('resident')
+                resident_role_id = self.settings(member.guild).get('roles', {}).get('resident')
                 if resident_role_id:
                     resident_role = member.guild.get_role(resident_role_id)
                     if resident_role:
@@ -1725,7 +2665,7 @@ class Allowlist(commands.Cog):
                         logger.info(f"Adicionado cargo de morador para {member.id} ao entrar no servidor")
                 
                 # Também adiciona o cargo de "allowed" por compatibilidade
-                allowed_role_id = self.config.get('roles', {}).get('allowed')
+                allowed_role_id = self.settings(member.guild).get('roles', {}).get('allowed')
                 if allowed_role_id and allowed_role_id != resident_role_id:
                     allowed_role = member.guild.get_role(allowed_role_id)
                     if allowed_role:
@@ -1733,7 +2673,7 @@ class Allowlist(commands.Cog):
                         logger.info(f"Adicionado cargo de permitido para {member.id} ao entrar no servidor")
                 
                 # Envia mensagem de boas-vindas por DM
-                server_name = self.config.get('server_name', 'Servidor')
+                server_name = self.settings(member.guild).get('server_name', 'Servidor')
                 try:
                     await member.send(
                         embed=create_embed(
@@ -5,7 +5,7 @@ import logging
 from datetime import datetime
 
 from utils.helpers import (
-    create_embed, load_config, can_use_announcement_commands
+    create_embed, load_config, can_use_announcement_commands, get_channel_id
 )
 
 logger = logging.getLogger("bot.announcements")
@@ -27,7 +27,7 @@ class Announcements(commands.Cog):
             return
         
         # Get the announcement channel from config
-        announcement_channel_id = self.config.get('channels', {}).get('announcements')
+        announcement_channel_id = get_channel_id('announcements', ctx.guild.id)
         if not announcement_channel_id:
             # If no channel configured, ask for one
             await ctx.send(
@@ -0,0 +1,277 @@
+import discord
+from discord.ext import commands
+import io
+import time
+import asyncio
+import logging
+import math
+import threading
+
+from aiohttp import web
+
+from utils.helpers import create_embed, load_config
+from utils.loop_monitor import LoopWatchdog
+from utils.profiler import StackSampler, memory_diff
+from utils.metrics import metrics
+from utils.sharding import is_sharded, shard_guilds
+from utils.cluster import cluster_id
+
+logger = logging.getLogger("bot.diagnostics")
+
+
+def format_ms(seconds):
+    return "N/A" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+class Diagnostics(commands.Cog):
+    """Exposes the bot's runtime metrics to admins and to a local scrape endpoint"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.config = load_config()
+        self.runner = None
+        monitor = self.config.get('loop_monitor', {})
+        self.watchdog = LoopWatchdog(
+            budget=monitor.get('stall_budget_ms', 250) / 1000,
+            tick_interval=monitor.get('tick_interval_ms', 100) / 1000,
+            slow_callback=monitor.get('slow_callback_ms', 100) / 1000,
+            asyncio_debug=monitor.get('asyncio_debug', False)
+        )
+        # Um perfil (CPU ou memória) por vez: dois amostradores juntos distorcem um ao outro
+        self.profiling = asyncio.Lock()
+
+    async def cog_load(self):
+        settings = self.config.get('metrics', {})
+        # O watchdog mede o atraso do loop continuamente e atribui travamentos ao código responsável
+        self.watchdog.start()
+        metrics.register_gauge(
+            "bot_gateway_latency_seconds",
+            "Heartbeat latency of each gateway connection (shard)",
+            self.shard_latencies,
+            label="shard"
+        )
+        metrics.register_gauge("bot_guilds", "Guilds in the cache", lambda: len(self.bot.guilds))
+        if settings.get('enabled', False):
+            # In a cluster each process listens on port + cluster id
+            await self.start_server(settings.get('host', '127.0.0.1'), settings.get('port', 9108) + (cluster_id() or 0))
+
+    async def cog_unload(self):
+        self.watchdog.stop()
+        metrics.unregister_gauge("bot_gateway_latency_seconds")
+        metrics.unregister_gauge("bot_guilds")
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def shard_latencies(self):
+        """{shard_id: latency in seconds, or None before the first heartbeat}"""
+        latencies = self.bot.latencies if is_sharded(self.bot) else [(self.bot.shard_id or 0, self.bot.latency)]
+        return {shard_id: None if math.isinf(latency) else latency for shard_id, latency in latencies}
+
+    async def start_server(self, host, port):
+        """Start the local HTTP endpoint on the bot's own event loop"""
+        app = web.Application()
+        app.router.add_get('/stats.json', self.handle_stats_json)
+        app.router.add_get('/metrics', self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, host, port).start()
+            logger.info(f"Metrics endpoint listening on http://{host}:{port}")
+        except OSError as e:
+            logger.error(f"Could not start metrics endpoint on {host}:{port}: {e}")
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_stats_json(self, request):
+        return web.json_response(metrics.snapshot())
+
+    async def handle_metrics(self, request):
+        return web.Response(
+            text=metrics.render_prometheus(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    @commands.group(name="stats", invoke_without_command=True)
+    @commands.has_permissions(administrator=True)
+    async def stats(self, ctx):
+        """Latência por comando (p50/p95/p99) com tempo de banco e REST"""
+        snapshot = metrics.snapshot()
+        ranked = sorted(snapshot['commands'].items(), key=lambda item: item[1]['count'], reverse=True)
+
+        lines = []
+        for name, data in ranked[:15]:
+            latency = data['latency']
+            lines.append(
+                f"`{name}` ×{data['count']} ({data['errors']} erros)\n"
+                f"p50 {format_ms(latency['p50'])} · p95 {format_ms(latency['p95'])} · p99 {format_ms(latency['p99'])}"
+                f" · DB p95 {format_ms(data['db']['p95'])} · REST p95 {format_ms(data['rest']['p95'])}"
+            )
+
+        db = snapshot['db_queries']
+        rest = snapshot['rest_requests']
+        embed = create_embed(
+            "Métricas do Bot",
+            "\n".join(lines) or "Nenhum comando executado desde o início.",
+            color="info",
+            fields=[
+                {"name": "Consultas ao banco", "value": f"{db['count']} · p95 {format_ms(db['p95'])} · máx {format_ms(db['max'])}", "inline": True},
+                {"name": "Requisições REST", "value": f"{rest['count']} · p95 {format_ms(rest['p95'])} · máx {format_ms(rest['max'])}", "inline": True},
+                {"name": "Latência do gateway", "value": f"{self.bot.latency * 1000:.0f}ms", "inline": True}
+            ]
+        )
+        embed.set_footer(text=f"Uptime: {snapshot['uptime_seconds'] / 3600:.1f}h · use !stats command <nome> para detalhes")
+        await ctx.send(embed=embed)
+
+    @stats.command(name="command")
+    @commands.has_permissions(administrator=True)
+    async def stats_command(self, ctx, *, name: str):
+        """Detalhes de um comando ou interação"""
+        stats = metrics.commands.get(name)
+        if not stats:
+            await ctx.send(f"❌ Nenhuma métrica para `{name}`.")
+            return
+
+        data = stats.snapshot()
+        fields = []
+        for label, key in (("Total", "latency"), ("Banco", "db"), ("REST", "rest")):
+            hist = data[key]
+            fields.append({
+                "name": label,
+                "value": f"p50 {format_ms(hist['p50'])}\np95 {format_ms(hist['p95'])}\np99 {format_ms(hist['p99'])}\nmáx {format_ms(hist['max'])}",
+                "inline": True
+            })
+        await ctx.send(embed=create_embed(
+            f"Métricas: {name}",
+            f"**{data['count']}** execuções, **{data['errors']}** com erro.",
+            color="info",
+            fields=fields
+        ))
+
+    @stats.command(name="loop")
+    @commands.has_permissions(administrator=True)
+    async def stats_loop(self, ctx, action: str = None):
+        """Travamentos do event loop agrupados pelo código que os causou"""
+        if action == "reset":
+            self.watchdog.reset()
+            await ctx.send("✅ Relatórios de travamento do event loop foram zerados.")
+            return
+
+        lag = metrics.loop_lag.snapshot()
+        lines = []
+        for entry in self.watchdog.top("stalls", limit=8):
+            lines.append(
+                f"`{entry.site}`\n×{entry.count} · total {format_ms(entry.total)} · máx {format_ms(entry.max)}"
+            )
+
+        embed = create_embed(
+            "Event Loop",
+            "\n".join(lines) or f"Nenhum travamento acima de {format_ms(self.watchdog.budget)} registrado.",
+            color="info",
+            fields=[
+                {"name": "Atraso", "value": f"p50 {format_ms(lag['p50'])} · p99 {format_ms(lag['p99'])} · máx {format_ms(lag['max'])}", "inline": False}
+            ]
+        )
+        slow = self.watchdog.top("slow_callbacks", limit=5)
+        if slow:
+            embed.add_field(
+                name="Callbacks lentos (asyncio debug)",
+                value="\n".join(f"`{entry.site[:80]}` ×{entry.count} · máx {format_ms(entry.max)}" for entry in slow)[:1024],
+                inline=False
+            )
+        worst = self.watchdog.top("stalls", limit=1)
+        if worst and worst[0].stack:
+            embed.add_field(name="Stack do maior ofensor", value=f"```{worst[0].stack[-1000:]}```", inline=False)
+        embed.set_footer(text="Use !stats loop reset para zerar")
+        await ctx.send(embed=embed)
+
+    @stats.command(name="shards")
+    @commands.has_permissions(administrator=True)
+    async def stats_shards(self, ctx):
+        """Latência, servidores e taxa de eventos de cada shard deste processo"""
+        events = metrics.snapshot()['shards']
+        lines = []
+        for shard_id, latency in sorted(self.shard_latencies().items()):
+            shard = events.get(shard_id, {"events": 0, "rate": None})
+            rate = "N/A" if shard['rate'] is None else f"{shard['rate']:.1f}/s"
+            lines.append(
+                f"**Shard {shard_id}** · {format_ms(latency)} · {len(shard_guilds(self.bot, shard_id))} servidores"
+                f" · {shard['events']} eventos ({rate})"
+            )
+        embed = create_embed("Shards", "\n".join(lines), color="info")
+        embed.set_footer(
+            text=f"{len(lines)} de {self.bot.shard_count or 1} shard(s) neste processo · este servidor está no shard {ctx.guild.shard_id}"
+        )
+        await ctx.send(embed=embed)
+
+    async def _profile_duration(self, ctx, seconds):
+        """Return the requested duration, or None (after telling the user) if it is outside 1..profiler.max_seconds or a profile is already running"""
+        limit = self.config.get('profiler', {}).get('max_seconds', 120)
+        if seconds < 1 or seconds > limit:
+            await ctx.send(f"❌ A duração deve ficar entre 1 e {limit} segundos.")
+            return None
+        if self.profiling.locked():
+            await ctx.send("❌ Já existe um perfil em andamento. Aguarde ele terminar.")
+            return None
+        return seconds
+
+    @commands.command(name="profile")
+    @commands.has_permissions(administrator=True)
+    async def profile(self, ctx, seconds: int = 30, scope: str = "loop"):
+        """Amostra as stacks do bot por alguns segundos e envia o relatório"""
+        if await self._profile_duration(ctx, seconds) is None:
+            return
+        settings = self.config.get('profiler', {})
+        # "loop" amostra só a thread do event loop (onde fica a lentidão dos comandos); "all" inclui as demais threads
+        thread_ids = None if scope == "all" else {threading.get_ident()}
+
+        async with self.profiling:
+            await ctx.send(f"⏳ Amostrando {'todas as threads' if thread_ids is None else 'o event loop'} por {seconds}s...")
+            sampler = StackSampler(interval=settings.get('interval_ms', 10) / 1000, thread_ids=thread_ids)
+            await sampler.run(seconds)
+            # Montar o relatório percorre todas as stacks coletadas; fica fora do event loop
+            collapsed, summary, ranked = await asyncio.to_thread(
+                lambda: (sampler.collapsed(), sampler.summary(settings.get('top', 25)), sampler.top(8))
+            )
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        seen = sum(sampler.stacks.values()) or 1
+        top = "\n".join(f"`{total / seen:.0%}` {label}" for label, _, total in ranked)
+        embed = create_embed(
+            "Perfil de CPU",
+            top[:4000] or "Nenhuma amostra coletada.",
+            color="info",
+            fields=[
+                {"name": "Amostras", "value": f"{sampler.samples} em {sampler.elapsed:.1f}s", "inline": True},
+                {"name": "Intervalo", "value": f"{sampler.interval * 1000:.0f}ms", "inline": True}
+            ]
+        )
+        embed.set_footer(text="O arquivo .collapsed abre no speedscope.app ou no flamegraph.pl")
+        await ctx.send(embed=embed, files=[
+            discord.File(io.BytesIO(summary.encode()), filename=f"profile-{stamp}-top.txt"),
+            discord.File(io.BytesIO(collapsed.encode()), filename=f"profile-{stamp}.collapsed")
+        ])
+        logger.info(f"{ctx.author} profiled the bot for {seconds}s ({sampler.samples} samples)")
+
+    @commands.command(name="memprofile")
+    @commands.has_permissions(administrator=True)
+    async def memprofile(self, ctx, seconds: int = 30):
+        """Compara dois snapshots do tracemalloc e mostra onde a memória cresceu"""
+        if await self._profile_duration(ctx, seconds) is None:
+            return
+        settings = self.config.get('profiler', {})
+
+        async with self.profiling:
+            await ctx.send(f"⏳ Rastreando alocações por {seconds}s...")
+            report = await memory_diff(seconds, settings.get('top', 25), settings.get('tracemalloc_frames', 1))
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        await ctx.send(
+            f"```{report[:1800]}```",
+            file=discord.File(io.BytesIO(report.encode()), filename=f"memprofile-{stamp}.txt")
+        )
+        logger.info(f"{ctx.author} ran a {seconds}s memory profile")
+
+
+async def setup(bot):
+    await bot.add_cog(Diagnostics(bot))
@@ -11,8 +11,10 @@ from utils.db import (
 )
 from utils.helpers import (
     create_embed, load_config, can_use_moderation_commands,
-    parse_time, format_time_difference
+    parse_time, format_time_difference, get_channel_id
 )
+from utils.metrics import metrics
+from utils.sharding import shard_guilds, start_per_shard, task_name
 
 logger = logging.getLogger("bot.moderation")
 
@@ -22,20 +24,26 @@ class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = load_config()
-        self.ban_check_task = self.bot.loop.create_task(self.check_temp_bans())
+        self.ban_check_task = None
+    
+    async def cog_load(self):
+        """Start background tasks once per cog instance"""
+        if self.ban_check_task is None or self.ban_check_task.done():
+            # Uma verificação por shard, cada uma só com os servidores daquele shard
+            self.ban_check_task = start_per_shard(self.bot, "temp_ban_check", self.check_temp_bans)
     
     def cog_unload(self):
         """Clean up when cog is unloaded"""
-        self.ban_check_task.cancel()
+        if self.ban_check_task:
+            self.ban_check_task.cancel()
     
-    async def check_temp_bans(self):
-        """Background task to check for expired temporary bans"""
-        await self.bot.wait_until_ready()
-        
+    async def check_temp_bans(self, shard_id):
+        """Background task to check for expired temporary bans of one shard's guilds"""
         while not self.bot.is_closed():
             try:
-                # Get all active bans
-                bans = get_all_bans()
+                guilds = {guild.id: guild for guild in shard_guilds(self.bot, shard_id)}
+                # Bans registered before guild_id existed are handled by shard 0, in all of its guilds
+                bans = get_all_bans(guild_ids=list(guilds), include_unassigned=shard_id == 0)
                 now = datetime.now()
                 
                 for ban in bans:
@@ -52,10 +60,12 @@ class Moderation(commands.Cog):
                     # Check if ban has expired
                     if now >= expires_at:
                         # Mark as inactive in database
-                        remove_ban(ban['user_id'])
+                        remove_ban(ban['user_id'], ban['guild_id'])
                         
                         # Try to unban on Discord
-                        for guild in self.bot.guilds:
+                        # Legacy rows without guild_id are tried in every guild of this process
+                        targets = [guilds[ban['guild_id']]] if ban['guild_id'] in guilds else list(self.bot.guilds)
+                        for guild in targets:
                             try:
                                 # Get ban info from Discord
                                 banned_user = await guild.fetch_ban(discord.Object(id=ban['user_id']))
@@ -67,7 +77,7 @@ class Moderation(commands.Cog):
                                     logger.info(f"Unbanned user {ban['user_id']} (temp ban expired)")
                                     
                                     # Try to log the unban
-                                    log_channel_id = self.config.get('channels', {}).get('logs')
+                                    log_channel_id = get_channel_id('logs', guild.id)
                                     if log_channel_id:
                                         log_channel = guild.get_channel(log_channel_id)
                                         if log_channel:
@@ -85,9 +95,10 @@ class Moderation(commands.Cog):
                                 logger.error(f"Error unbanning user {ban['user_id']}: {e}")
             
             except Exception as e:
-                logger.error(f"Error in temp ban check task: {e}")
+                logger.error(f"Error in temp ban check task (shard {shard_id}): {e}")
             
             # Check every 5 minutes
+            metrics.heartbeat(task_name(self.bot, "temp_ban_check", shard_id))
             await asyncio.sleep(300)
     
     @commands.command(name="warn")
@@ -145,7 +156,7 @@ class Moderation(commands.Cog):
                     await ctx.send("Note: Unable to DM user about this warning.")
                 
                 # Log the warning
-                log_channel_id = self.config.get('channels', {}).get('logs')
+                log_channel_id = get_channel_id('logs', ctx.guild.id)
                 if log_channel_id:
                     log_channel = ctx.guild.get_channel(log_channel_id)
                     if log_channel:
@@ -273,7 +284,7 @@ class Moderation(commands.Cog):
                     pass
                 
                 # Log the action
-                log_channel_id = self.config.get('channels', {}).get('logs')
+                log_channel_id = get_channel_id('logs', ctx.guild.id)
                 if log_channel_id:
                     log_channel = ctx.guild.get_channel(log_channel_id)
                     if log_channel:
@@ -312,7 +323,7 @@ class Moderation(commands.Cog):
             pass
         
         # Don't allow banning staff (if user is in the guild)
-        member = ctx.guild.get_member(user.id)
+        member = await self.bot.member_resolver.get(ctx.guild, user.id)
         if member and can_use_moderation_commands(member):
             await ctx.send("You cannot ban other staff members.")
             return
@@ -334,7 +345,7 @@ class Moderation(commands.Cog):
         # Ban the user
         try:
             # Add ban to database first
-            ban_id = add_ban(user.id, ctx.author.id, reason, expires_at)
+            ban_id = add_ban(user.id, ctx.author.id, reason, expires_at, guild_id=ctx.guild.id)
             
             if not ban_id:
                 await ctx.send("Failed to record ban in database. Aborting.")
@@ -364,7 +375,7 @@ class Moderation(commands.Cog):
             )
             
             # Log the ban
-            log_channel_id = self.config.get('channels', {}).get('logs')
+            log_channel_id = get_channel_id('logs', ctx.guild.id)
             if log_channel_id:
                 log_channel = ctx.guild.get_channel(log_channel_id)
                 if log_channel:
@@ -404,7 +415,7 @@ class Moderation(commands.Cog):
                 return
             
             # Update database
-            success = remove_ban(user_id)
+            success = remove_ban(user_id, ctx.guild.id)
             
             # Unban on Discord
             await ctx.guild.unban(user, reason=reason)
@@ -424,7 +435,7 @@ class Moderation(commands.Cog):
             )
             
             # Log the unban
-            log_channel_id = self.config.get('channels', {}).get('logs')
+            log_channel_id = get_channel_id('logs', ctx.guild.id)
             if log_channel_id:
                 log_channel = ctx.guild.get_channel(log_channel_id)
                 if log_channel:
@@ -497,7 +508,7 @@ class Moderation(commands.Cog):
             )
             
             # Log the kick
-            log_channel_id = self.config.get('channels', {}).get('logs')
+            log_channel_id = get_channel_id('logs', ctx.guild.id)
             if log_channel_id:
                 log_channel = ctx.guild.get_channel(log_channel_id)
                 if log_channel:
@@ -591,7 +602,7 @@ class Moderation(commands.Cog):
                 pass
             
             # Log the mute
-            log_channel_id = self.config.get('channels', {}).get('logs')
+            log_channel_id = get_channel_id('logs', ctx.guild.id)
             if log_channel_id:
                 log_channel = ctx.guild.get_channel(log_channel_id)
                 if log_channel:
@@ -661,7 +672,7 @@ class Moderation(commands.Cog):
                 pass
             
             # Log the unmute
-            log_channel_id = self.config.get('channels', {}).get('logs')
+            log_channel_id = get_channel_id('logs', ctx.guild.id)
             if log_channel_id:
                 log_channel = ctx.guild.get_channel(log_channel_id)
                 if log_channel:
@@ -9,7 +9,7 @@ from utils.db import (
     get_suggestion, get_suggestion_by_message
 )
 from utils.helpers import (
-    create_embed, load_config, can_use_suggestion_management
+    create_embed, load_config, can_use_suggestion_management, get_channel_id
 )
 
 logger = logging.getLogger("bot.suggestions")
@@ -29,7 +29,7 @@ class Suggestions(commands.Cog):
             return
         
         # Get the suggestion channel from config
-        suggestion_channel_id = self.config.get('channels', {}).get('suggestions')
+        suggestion_channel_id = get_channel_id('suggestions', ctx.guild.id)
         
         if not suggestion_channel_id:
             # If no channel configured, check if there are channel mentions
@@ -173,7 +173,7 @@ class Suggestions(commands.Cog):
             
             # Try to notify the suggester
             try:
-                suggester = ctx.guild.get_member(suggestion['user_id'])
+                suggester = await self.bot.member_resolver.get(ctx.guild, suggestion['user_id'])
                 if suggester:
                     await suggester.send(
                         embed=create_embed(
@@ -260,7 +260,7 @@ class Suggestions(commands.Cog):
             
             # Try to notify the suggester
             try:
-                suggester = ctx.guild.get_member(suggestion['user_id'])
+                suggester = await self.bot.member_resolver.get(ctx.guild, suggestion['user_id'])
                 if suggester:
                     await suggester.send(
                         embed=create_embed(
@@ -347,7 +347,7 @@ class Suggestions(commands.Cog):
             
             # Try to notify the suggester
             try:
-                suggester = ctx.guild.get_member(suggestion['user_id'])
+                suggester = await self.bot.member_resolver.get(ctx.guild, suggestion['user_id'])
                 if suggester:
                     await suggester.send(
                         embed=create_embed(
@@ -434,7 +434,7 @@ class Suggestions(commands.Cog):
             
             # Try to notify the suggester
             try:
-                suggester = ctx.guild.get_member(suggestion['user_id'])
+                suggester = await self.bot.member_resolver.get(ctx.guild, suggestion['user_id'])
                 if suggester:
                     await suggester.send(
                         embed=create_embed(
@@ -464,7 +464,7 @@ class Suggestions(commands.Cog):
             return
         
         # Check if this is in the suggestions channel
-        suggestion_channel_id = self.config.get('channels', {}).get('suggestions')
+        suggestion_channel_id = get_channel_id('suggestions', payload.guild_id)
         if not suggestion_channel_id or payload.channel_id != suggestion_channel_id:
             return
         
@@ -482,7 +482,8 @@ class Suggestions(commands.Cog):
                 if not guild:
                     return
                 
-                member = guild.get_member(payload.user_id)
+                # O gateway envia o membro junto com a reação, mesmo sem cache de membros
+                member = payload.member or await self.bot.member_resolver.get(guild, payload.user_id)
                 if not member:
                     return
                 
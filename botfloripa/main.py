@@ -1,84 +1,281 @@
 import os
 import json
 import logging
-import discord
-from discord.ext import commands
 import asyncio
+import time
 from dotenv import load_dotenv
-from utils.db import setup_database
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("bot.log"),
-        logging.StreamHandler()
-    ]
+# The boot profiler is imported before the heavy modules so their import time is recorded
+from utils.boot_profiler import boot_profiler
+
+with boot_profiler.span("discord", "import"):
+    import discord
+    from discord.ext import commands
+with boot_profiler.span("utils.db", "import"):
+    from utils.db import setup_database, configure_database, add_allowlist_listener, notify_allowlist_change
+with boot_profiler.span("utils.helpers", "import"):
+    from utils.helpers import create_embed, get_channel_id
+from utils.guild_settings import (
+    reload_guild_settings, update_guild_settings, add_guild_settings_listener, notify_guild_settings_change
 )
-logger = logging.getLogger("bot")
+from utils.question_bank import add_question_bank_listener, invalidate_question_bank
+from utils.lazy_extensions import LazyExtension, LazyExtensionManager
+from utils.logging_setup import setup_logging
+from utils.event_loop import install_event_loop
+from utils.metrics import metrics, build_http_trace, instrument_gateway
+from utils.member_cache import MemberResolver, member_cache_options
+from utils.sharding import bot_class, shard_options, is_sharded
+from utils.cluster import ClusterBus, apply_cluster_env
 
-# Load configuration
+# Load configuration (errors are reported once logging is configured)
+config_error = None
 try:
     with open('config.json', 'r') as f:
         config = json.load(f)
 except FileNotFoundError:
-    logger.error("config.json not found. Please create a config file.")
-    exit(1)
+    config, config_error = {}, "config.json not found. Please create a config file."
 except json.JSONDecodeError:
-    logger.error("config.json is not valid JSON. Please check the format.")
+    config, config_error = {}, "config.json is not valid JSON. Please check the format."
+
+# Started by cluster.py: this process only runs some of the shards
+cluster_id = apply_cluster_env(config)
+
+# Configure logging: handlers run on a background thread fed by a queue
+setup_logging(config.get('logging'))
+logger = logging.getLogger("bot")
+
+if config_error:
+    logger.error(config_error)
     exit(1)
 
+configure_database(config.get('database'))
+
 # Discord Bot setup
-# Using minimal intents that don't require privileged access
 intents = discord.Intents.default()
 intents.message_content = True  # Only enabling message content intent
 
-# For full functionality, enable these intents in Discord Developer Portal
-# and then uncomment these lines:
-# intents.members = True       # SERVER MEMBERS INTENT
-# intents.presences = True     # PRESENCE INTENT
+# The members intent (SERVER MEMBERS INTENT in the Developer Portal), the member
+# cache and guild chunking follow member_cache.profile; see utils/member_cache.py
+member_cache_profile, member_cache_kwargs = member_cache_options(intents, config.get('member_cache'))
+
+# Cog modules loaded once at startup
+INITIAL_EXTENSIONS = [
+    'cogs.allowlist',
+    'cogs.moderation',
+    'cogs.announcements',
+    'cogs.suggestions',
+    'cogs.diagnostics'
+]
+
+# Rarely used cogs: stub commands are registered at boot and the real module
+# is imported on first use. Set "lazy_extensions": false in config.json to load them eagerly.
+LAZY_EXTENSIONS = {
+    'cogs.announcements': LazyExtension(commands=['announce', 'embed']),
+    'cogs.suggestions': LazyExtension(
+        commands=['suggest', 'approve', 'reject', 'consider', 'implement'],
+        # Votes on existing suggestions must still be moderated after a restart
+        events={'on_raw_reaction_add': lambda payload: payload.channel_id == get_channel_id('suggestions', payload.guild_id)}
+    )
+}
+
+class GTARPBot(bot_class(config.get('sharding'))):
+    """Bot with a one-shot startup pipeline.
+    
+    Extensions are loaded from setup_hook, which discord.py runs once after
+    login, instead of from on_ready, which fires again on every gateway
+    reconnect. With sharding.enabled the base class is AutoShardedBot.
+    """
+    
+    def __init__(self, *args, extensions=(), lazy_extensions=None, member_resolver=None, cluster_bus=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.member_resolver = member_resolver or MemberResolver()
+        self.cluster_bus = cluster_bus or ClusterBus()
+        self.initial_extensions = list(extensions)
+        self.lazy_extensions = LazyExtensionManager(self, lazy_extensions or {})
+        self.cog_load_times = {}
+        self.ready_count = 0
+        self._extensions_loaded = False
+    
+    async def invoke(self, ctx):
+        """Invoke a command inside a metrics span (latency, DB and REST time)"""
+        if ctx.command is None or ctx.command.extras.get('lazy_stub'):
+            # A lazy extension's stub invokes the real command again, which gets the span
+            return await super().invoke(ctx)
+        with metrics.span(ctx.command.qualified_name) as span:
+            await super().invoke(ctx)
+            # Errors are handled inside invoke and dispatched to on_command_error,
+            # which is the same path that sets command_failed
+            span.error = ctx.command_failed
+    
+    async def setup_hook(self):
+        # setup_hook runs right after the HTTP login succeeds
+        boot_profiler.mark("login")
+        instrument_gateway()
+        # Per-guild settings are read once; lookups are served from memory afterwards
+        reload_guild_settings()
+        if self.cluster_bus.enabled:
+            self.connect_cluster_bus()
+        with boot_profiler.span("setup_hook"):
+            await self.load_initial_extensions()
+    
+    def connect_cluster_bus(self):
+        """Share cache invalidations with the other processes of the cluster.
+        
+        Allowlist changes, guild settings changes and question bank edits
+        made here are published; the ones published by other processes run
+        the local listeners (live dashboard, cached settings and questions) as
+        if they had happened here, after reloading the guild settings from
+        the database. config.json itself is not shared: it is read from disk
+        by each process.
+        """
+        bus = self.cluster_bus
+        bus.start()
+        add_allowlist_listener(
+            lambda user_id, old_status, new_status: bus.publish("allowlist", {"user_id": user_id, "old": old_status, "new": new_status})
+        )
+        add_guild_settings_listener(lambda guild_id, keys: bus.publish("guild_settings", {"guild_id": guild_id, "keys": keys}))
+        add_question_bank_listener(lambda: bus.publish("questions"))
+        bus.subscribe("allowlist", lambda data: notify_allowlist_change(data['user_id'], data['old'], data['new']))
+        bus.subscribe("guild_settings", self._on_remote_guild_settings)
+        bus.subscribe("questions", lambda _: invalidate_question_bank())
+        metrics.register_gauge("bot_cluster_bus_connected", "1 while connected to the cluster hub", lambda: int(bus.connected))
+        metrics.register_gauge("bot_cluster_messages_sent", "Messages published to the other cluster processes", lambda: bus.sent)
+        metrics.register_gauge("bot_cluster_messages_received", "Messages received from the other cluster processes", lambda: bus.received)
+        metrics.register_gauge("bot_cluster_messages_dropped", "Messages dropped while the hub was unreachable", lambda: bus.dropped)
+    
+    def _on_remote_guild_settings(self, data):
+        reload_guild_settings()
+        notify_guild_settings_change(data['guild_id'], data['keys'])
+    
+    async def before_identify_hook(self, shard_id, *, initial=False):
+        """In a cluster the launcher hands out IDENTIFY slots, so the processes together respect Discord's limit"""
+        if not self.cluster_bus.enabled:
+            return await super().before_identify_hook(shard_id, initial=initial)
+        try:
+            await self.cluster_bus.request("identify", {"shard_id": shard_id})
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logger.warning(f"No IDENTIFY slot from the cluster hub for shard {shard_id} ({e!r}), waiting 5s instead")
+            await asyncio.sleep(5.0)
+    
+    async def load_initial_extensions(self):
+        """Load all initial extensions concurrently, at most once per process"""
+        if self._extensions_loaded:
+            logger.warning("Initial extensions already loaded, skipping")
+            return
+        self._extensions_loaded = True
+        
+        started = time.perf_counter()
+        eager = [ext for ext in self.initial_extensions if ext not in self.lazy_extensions.extensions]
+        await asyncio.gather(*(self._load_extension_timed(ext) for ext in eager))
+        self.lazy_extensions.install()
+        logger.info(f"Loaded {len(self.extensions)}/{len(eager)} cogs in {time.perf_counter() - started:.3f}s ({len(self.lazy_extensions.extensions)} lazy)")
+    
+    async def _load_extension_timed(self, extension):
+        started = time.perf_counter()
+        try:
+            await self.load_extension(extension)
+            self.cog_load_times[extension] = time.perf_counter() - started
+            boot_profiler.add_span(extension, started, started + self.cog_load_times[extension], "cog")
+            logger.info(f"Loaded cog: {extension} ({self.cog_load_times[extension] * 1000:.1f}ms)")
+        except Exception as e:
+            logger.error(f"Error loading cog {extension}: {str(e)}")
+
+# Presence is sent with IDENTIFY, so it survives reconnects without change_presence
+activity = discord.Activity(
+    type=getattr(discord.ActivityType, config.get('activity_type', 'playing').lower()),
+    name=config.get('activity_name', 'GTA RP')
+)
 
-bot = commands.Bot(
+bot = GTARPBot(
     command_prefix=config.get('prefix', '!'),
     intents=intents,
-    case_insensitive=True
+    case_insensitive=True,
+    help_command=None,  # replaced by the !ajuda command below (alias "help")
+    activity=activity,
+    http_trace=build_http_trace(),
+    extensions=INITIAL_EXTENSIONS,
+    lazy_extensions=LAZY_EXTENSIONS if config.get('lazy_extensions', True) else None,
+    member_resolver=MemberResolver(
+        size=config.get('member_cache', {}).get('lru_size', 1000),
+        ttl=config.get('member_cache', {}).get('lru_ttl_seconds', 300)
+    ),
+    cluster_bus=ClusterBus.from_env(),
+    **member_cache_kwargs,
+    **shard_options(config.get('sharding'))
 )
 
+@bot.listen('on_raw_member_remove')
+async def forget_removed_member(payload):
+    """Members who leave must not be served from the resolver's LRU"""
+    bot.member_resolver.invalidate(payload.guild_id, payload.user.id)
+
 @bot.event
 async def on_ready():
-    """Event triggered when the bot is ready and connected to Discord"""
+    """Event triggered when the bot is ready and connected to Discord (also after reconnects)"""
+    bot.ready_count += 1
+    if bot.ready_count > 1:
+        logger.info(f"Reconnected to Discord (ready #{bot.ready_count})")
+        return
+    
     logger.info(f'Logged in as {bot.user.name} - {bot.user.id}')
+    logger.info(f"Bot is ready! Serving {len(bot.guilds)} servers.")
+    if cluster_id is not None:
+        logger.info(f"Cluster process {cluster_id}, hub at {bot.cluster_bus.address}")
+    if is_sharded(bot):
+        logger.info(f"Shards in this process: {', '.join(str(shard_id) for shard_id in sorted(bot.shards))} of {bot.shard_count}")
+    logger.info(
+        f"Member cache profile: {member_cache_profile} "
+        f"(members intent {'on' if bot.intents.members else 'off'}, "
+        f"{sum(len(guild.members) for guild in bot.guilds)} members cached)"
+    )
     
-    # Set bot status
-    activity_name = config.get('activity_name', 'GTA RP')
-    activity_type = getattr(discord.ActivityType, config.get('activity_type', 'playing').lower())
-    activity = discord.Activity(type=activity_type, name=activity_name)
-    await bot.change_presence(activity=activity)
+    if boot_profiler.enabled:
+        boot_profiler.mark("gateway_ready")
+        boot_profiler.write()
+        await post_boot_summary()
+
+@bot.listen('on_command_completion')
+async def record_first_command(ctx):
+    """Fecha a linha do tempo de inicialização no primeiro comando atendido"""
+    if boot_profiler.mark("first_command"):
+        logger.info(f"First command served ({ctx.command.qualified_name}) at {boot_profiler.milestone_ms('first_command'):.0f}ms")
+        boot_profiler.write()
+
+async def post_boot_summary():
+    """Envia o resumo da inicialização para o canal de logs"""
+    log_channel_id = get_channel_id('logs')
+    log_channel = bot.get_channel(log_channel_id) if log_channel_id else None
+    if not log_channel:
+        return
     
-    # Load cogs (modules)
-    await load_cogs()
+    def format_spans(category, limit=5):
+        spans = sorted(boot_profiler.by_category(category), key=lambda entry: entry['duration_ms'], reverse=True)
+        lines = [f"`{entry['name']}` {entry['duration_ms']:.0f}ms" for entry in spans[:limit]]
+        return "\n".join(lines) or "N/A"
     
-    logger.info(f"Bot is ready! Serving {len(bot.guilds)} servers.")
-
-async def load_cogs():
-    """Load all cog modules"""
-    cogs = [
-        'cogs.allowlist',
-        'cogs.moderation',
-        'cogs.announcements',
-        'cogs.suggestions'
-    ]
-    
-    for cog in cogs:
-        try:
-            await bot.load_extension(cog)
-            logger.info(f"Loaded cog: {cog}")
-        except Exception as e:
-            logger.error(f"Error loading cog {cog}: {str(e)}")
+    milestones = "\n".join(
+        f"{entry['name']}: {entry['start_ms']:.0f}ms"
+        for entry in boot_profiler.by_category("milestone")
+    )
+    embed = create_embed(
+        "Perfil de Inicialização",
+        f"Pronto em **{boot_profiler.milestone_ms('gateway_ready'):.0f}ms** desde o início do processo.",
+        color="info",
+        fields=[
+            {"name": "Marcos", "value": milestones or "N/A", "inline": False},
+            {"name": "Imports", "value": format_spans("import"), "inline": True},
+            {"name": "Cogs", "value": format_spans("cog"), "inline": True},
+            {"name": "Fases", "value": format_spans("phase"), "inline": True}
+        ]
+    )
+    embed.set_footer(text=f"Linha do tempo completa em {boot_profiler.output_path}")
+    try:
+        await log_channel.send(embed=embed)
+    except discord.HTTPException as e:
+        logger.error(f"Erro ao enviar perfil de inicialização: {e}")
 
 @bot.event
 async def on_command_error(ctx, error):
@@ -110,7 +307,12 @@ async def ping(ctx):
 async def reload_cog(ctx, cog: str):
     """Recarrega um módulo específico do bot"""
     try:
-        await bot.reload_extension(f"cogs.{cog}")
+        extension = f"cogs.{cog}"
+        if extension in bot.lazy_extensions.extensions and not bot.lazy_extensions.is_loaded(extension):
+            # Módulo preguiçoso ainda não importado: carrega pela primeira vez
+            await bot.lazy_extensions.ensure_loaded(extension)
+        else:
+            await bot.reload_extension(extension)
         await ctx.send(f"✅ Módulo '{cog}' foi recarregado com sucesso.")
     except Exception as e:
         await ctx.send(f"❌ Falha ao recarregar módulo '{cog}': {str(e)}")
@@ -190,9 +392,14 @@ async def help_command(ctx, modulo=None):
             value=(
                 "**`!allowlist dashboard`** - Painel de status da whitelist\n"
                 "**`!allowlist review <ID>`** - Revisa uma aplicação pendente\n"
+                "**`!allowlist history @usuário`** - Histórico de tentativas de whitelist\n"
+                "**`!allowlist stats [horas]`** - Aplicações por hora e taxa de aprovação\n"
+                "**`!allowlist rebuild_stats`** - Recalcula os contadores do dashboard\n"
+                "**`!allowlist question_stats`** - Taxa de acerto de cada pergunta\n"
+                "**`!allowlist questions`** - Banco de perguntas (adicionar, reordenar, retirar)\n"
                 "**`!allowlist add @usuário`** - Adiciona usuário à whitelist\n"
                 "**`!allowlist remove @usuário`** - Remove usuário da whitelist\n"
-                "**`!allowlist list`** - Lista usuários na whitelist"
+                "**`!allowlist list [status]`** - Lista usuários na whitelist (paginado)"
             ),
             inline=False
         )
@@ -286,7 +493,13 @@ async def help_command(ctx, modulo=None):
             value=(
                 "**`!setup`** - Assistente interativo de configuração do servidor\n"
                 "**`!reload <cog>`** - Recarrega um módulo específico do bot\n"
-                "**`!restart`** - Reinicia o bot completamente"
+                "**`!restart`** - Reinicia o bot completamente\n"
+                "**`!stats`** - Latência dos comandos (p50/p95/p99) com tempo de banco e REST\n"
+                "**`!stats command <nome>`** - Detalhes de um comando ou interação\n"
+                "**`!stats loop [reset]`** - Travamentos do event loop por ponto do código\n"
+                "**`!stats shards`** - Latência, servidores e eventos por segundo de cada shard\n"
+                "**`!profile [segundos] [loop|all]`** - Perfil de CPU por amostragem, enviado como anexo\n"
+                "**`!memprofile [segundos]`** - Crescimento de memória entre dois snapshots do tracemalloc"
             ),
             inline=False
         )
@@ -387,31 +600,27 @@ async def setup_server(ctx):
         approved_id = int(approved_input.strip('<#>'))
         rejected_id = int(rejected_input.strip('<#>'))
         
-        # Carrega a configuração atual
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-        
-        # Atualiza a configuração
-        config['server_name'] = server_name
+        # Configuração deste servidor: só as chaves que mudaram são gravadas no banco
+        changed = update_guild_settings(ctx.guild.id, {
+            'server_name': server_name,
+            'roles.admin': admin_id,
+            'roles.moderator': mod_id,
+            'roles.tourist': tourist_id,
+            'roles.resident': resident_id,
+            'roles.allowed': resident_id,  # Usa o mesmo ID para compatibilidade
+            'channels.announcements': announcements_id,
+            'channels.allowlist_results': results_id,
+            'channels.allowlist_approved': approved_id,
+            'channels.allowlist_rejected': rejected_id
+        })
+        if changed is None:
+            await ctx.send("❌ **Erro ao salvar**\nNão foi possível gravar a configuração no banco de dados. Tente novamente.")
+            return
         
-        # Atualiza cargos
-        config['roles']['admin'] = admin_id
-        config['roles']['moderator'] = mod_id
-        config['roles']['tourist'] = tourist_id
-        config['roles']['resident'] = resident_id
-        config['roles']['allowed'] = resident_id  # Usa o mesmo ID para compatibilidade
-        
-        # Atualiza canais
-        config['channels']['announcements'] = announcements_id
-        config['channels']['allowlist_results'] = results_id
-        config['channels']['allowlist_approved'] = approved_id
-        config['channels']['allowlist_rejected'] = rejected_id
-        
-        # Salva a configuração
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=4)
-        
-        await ctx.send("✅ **Configuração concluída com sucesso!**\nAs configurações do servidor foram atualizadas.")
+        await ctx.send(
+            "✅ **Configuração concluída com sucesso!**\n"
+            f"{len(changed)} configuração(ões) do servidor atualizada(s)."
+        )
         
     except ValueError:
         await ctx.send("❌ **Erro de formato**\nAlgumas entradas não eram menções válidas. Use @cargo para cargos e #canal para canais.")
@@ -421,7 +630,8 @@ async def setup_server(ctx):
 
 if __name__ == "__main__":
     # Initialize database
-    setup_database()
+    with boot_profiler.span("setup_database"):
+        setup_database()
     
     # Start the bot
     bot_token = os.getenv("DISCORD_TOKEN")
@@ -429,4 +639,9 @@ if __name__ == "__main__":
         logger.error("No Discord token found. Set the DISCORD_TOKEN environment variable.")
         exit(1)
     
-    bot.run(bot_token)
+    # uvloop quando disponível ("event_loop": "auto"), senão o loop padrão do asyncio
+    logger.info(f"Event loop: {install_event_loop(config.get('event_loop', 'auto'))}")
+    
+    boot_profiler.mark("run")
+    # log_handler=None: discord.py logs go through the root queue handler instead of its own
+    bot.run(bot_token, log_handler=None)
@@ -0,0 +1,16 @@
+import os
+import sys
+import shutil
+
+import pytest
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory with a copy of config.json, so bot_data.db and bot.log are not touched"""
+    shutil.copy(os.path.join(BOT_DIR, "config.json"), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
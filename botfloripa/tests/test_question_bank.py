@@ -0,0 +1,37 @@
+"""Scoring of whitelist answers against a question bank snapshot."""
+from utils.helpers import answer_keywords
+from utils.question_bank import Question, QuestionBank
+
+
+def _question(question_id, answer_key, weight=1, required=False):
+    return Question(
+        id=question_id, position=question_id, text=f"Pergunta {question_id}?", answer_key=answer_key,
+        keywords=answer_keywords(answer_key) if answer_key else (), weight=weight, required=required
+    )
+
+
+def _answers(bank, responses):
+    return [
+        {'question_id': question.id, 'score': bank.score(question, response)}
+        for question, response in zip(bank, responses)
+    ]
+
+
+def test_score_is_weighted_and_none_without_answer_key():
+    bank = QuestionBank([_question(1, "usar informações de fora", weight=3), _question(2, None)])
+
+    assert bank.max_score == 3
+    assert [answer['score'] for answer in _answers(bank, ["É usar informações de fora do jogo", "qualquer"])] == [3, None]
+    assert bank.score(bank.get(1), "não sei") == 0
+
+
+def test_missed_required_ignores_questions_without_answer_key():
+    bank = QuestionBank([
+        _question(1, "usar informações de fora", required=True),
+        _question(2, None, required=True),
+        _question(3, "sair do jogo", required=True),
+    ])
+
+    answers = _answers(bank, ["é usar informações de fora", "qualquer coisa", "não sei"])
+
+    assert bank.missed_required(answers) == [3]
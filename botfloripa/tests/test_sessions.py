@@ -0,0 +1,28 @@
+"""The whitelist session registry reserves a slot before a channel exists, so
+a full registry refuses applicants without creating anything."""
+import asyncio
+
+from cogs.allowlist import SessionRegistry
+
+
+def test_reservation_counts_against_the_limit_and_attach_moves_it_to_the_channel():
+    async def run():
+        registry = SessionRegistry(max_sessions=2)
+        first = registry.open(1, None, "whitelist")
+        second = registry.open(2, None, "allowlist")
+        refused = registry.open(3, None, "whitelist")
+
+        registry.attach(first, 100)
+        attached = (100 in registry, first.channel_id, len(registry))
+
+        registry.close(second)
+        after_close = registry.open(3, None, "whitelist")
+        registry.close(first)
+        return refused, attached, registry.refused, after_close is not None, len(registry)
+
+    refused, attached, refused_count, reopened, remaining = asyncio.run(run())
+
+    assert refused is None and refused_count == 1
+    assert attached == (True, 100, 2)
+    assert reopened
+    assert remaining == 1
@@ -0,0 +1,74 @@
+"""The startup pipeline runs once per process: repeated setup_hook calls and
+gateway reconnects (on_ready firing again) must not load cogs or start
+background tasks twice."""
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+from utils import db
+
+
+def _tasks_running(qualname):
+    return [
+        task for task in asyncio.all_tasks()
+        if not task.done() and getattr(task.get_coro(), "__qualname__", None) == qualname
+    ]
+
+
+async def _start_twice_and_reconnect(main, reconnects=3):
+    bot = main.bot
+    # async with sets up the loop-bound state that login() would, without connecting
+    async with bot:
+        db.setup_database()
+        bot._connection.user = SimpleNamespace(name="test-bot", id=1)
+
+        await bot.setup_hook()
+        await bot.setup_hook()
+        await bot.load_initial_extensions()
+
+        # The first READY and then one per simulated reconnect
+        bot._ready.set()
+        for _ in range(1 + reconnects):
+            bot.dispatch("ready")
+            await asyncio.sleep(0.05)
+
+        moderation = bot.get_cog("Moderation")
+        allowlist = bot.get_cog("Allowlist")
+        # cog_load again on the same instance keeps the running ban check
+        first_ban_check = moderation.ban_check_task
+        await moderation.cog_load()
+        await asyncio.sleep(0.05)
+        result = {
+            "ready_count": bot.ready_count,
+            "extensions": sorted(bot.extensions),
+            "cog_types": [type(cog).__name__ for cog in bot.cogs.values()],
+            "ban_check_task_kept": moderation.ban_check_task is first_ban_check,
+            "ban_checks": len(_tasks_running("Moderation.check_temp_bans")),
+            "reapers": len(_tasks_running("TempChannelReaper._run")),
+            "delete_workers": len(_tasks_running("TempChannelReaper._delete_worker")),
+            "dashboards": sum(
+                1 for callback in db._allowlist_listeners
+                if type(getattr(callback, "__self__", None)).__name__ == "LiveDashboard"
+            ),
+            "live_dashboard": allowlist.live_dashboard,
+        }
+        return result
+
+
+def test_setup_hook_and_reconnects_start_everything_once(workdir):
+    main = importlib.import_module("main")
+    result = asyncio.run(_start_twice_and_reconnect(main))
+
+    assert result["ready_count"] == 4
+    eager = [ext for ext in main.INITIAL_EXTENSIONS if ext not in main.bot.lazy_extensions.extensions]
+    assert result["extensions"] == sorted(eager)
+    assert len(result["cog_types"]) == len(set(result["cog_types"]))
+    assert {"Allowlist", "Moderation", "Diagnostics"} <= set(result["cog_types"])
+
+    assert result["ban_check_task_kept"]
+    assert result["ban_checks"] == 1
+    assert result["reapers"] == 1
+    assert result["delete_workers"] == 1
+    # config.json has a dashboard channel: one LiveDashboard, listening once
+    assert result["live_dashboard"] is not None
+    assert result["dashboards"] == 1
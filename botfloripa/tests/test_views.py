@@ -0,0 +1,103 @@
+"""Component interactions are timed once each, and failures are counted as
+errors whatever on_error the view defines."""
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from utils.metrics import metrics
+from utils.views import InstrumentedItem, InstrumentedView
+
+
+class Broken(Exception):
+    pass
+
+
+def _interaction():
+    return SimpleNamespace(data={"custom_id": "x", "component_type": 2})
+
+
+def _stats(name):
+    stats = metrics.commands.get(name)
+    return (stats.count, stats.errors) if stats else (0, 0)
+
+
+class DefaultErrorView(InstrumentedView):
+    @discord.ui.button(label="ok", custom_id="test_view_ok")
+    async def ok(self, interaction, button):
+        pass
+
+    @discord.ui.button(label="fail", custom_id="test_view_fail")
+    async def fail(self, interaction, button):
+        raise Broken()
+
+
+class OwnErrorView(DefaultErrorView):
+    handled = []
+
+    async def on_error(self, interaction, error, item):
+        # Does not call super(), like a view that reports errors to the user itself
+        self.handled.append(error)
+
+
+class DynamicButton(InstrumentedItem, discord.ui.DynamicItem[discord.ui.Button], template=r"test_dynamic_(?P<fail>\d)"):
+    def __init__(self, fail):
+        super().__init__(discord.ui.Button(label="dyn", custom_id=f"test_dynamic_{int(fail)}"))
+        self.fail = fail
+
+    async def callback(self, interaction):
+        if self.fail:
+            raise Broken()
+
+
+async def _click(view, custom_id):
+    item = next(item for item in view.children if item.custom_id == custom_id)
+    await view._scheduled_task(item, _interaction())
+
+
+def test_view_callbacks_are_timed_and_errors_counted_with_default_on_error():
+    before_ok, before_fail = _stats("interaction:test_view_ok"), _stats("interaction:test_view_fail")
+
+    async def run():
+        view = DefaultErrorView(timeout=None)
+        await _click(view, "test_view_ok")
+        await _click(view, "test_view_fail")
+
+    asyncio.run(run())
+
+    assert _stats("interaction:test_view_ok") == (before_ok[0] + 1, before_ok[1])
+    assert _stats("interaction:test_view_fail") == (before_fail[0] + 1, before_fail[1] + 1)
+
+
+def test_overridden_on_error_still_counts_the_error():
+    before = _stats("interaction:test_view_fail")
+
+    async def run():
+        await _click(OwnErrorView(timeout=None), "test_view_fail")
+
+    asyncio.run(run())
+
+    assert len(OwnErrorView.handled) == 1
+    assert _stats("interaction:test_view_fail") == (before[0] + 1, before[1] + 1)
+
+
+def test_dynamic_item_callbacks_are_timed_once():
+    before = _stats("interaction:test_dynamic_#")
+
+    async def run():
+        # Inside a view, as discord.py does when it dispatches a dynamic item
+        view = InstrumentedView(timeout=None)
+        ok, fail = DynamicButton(False), DynamicButton(True)
+        view.add_item(ok)
+        view.add_item(fail)
+        await ok.callback(_interaction())
+        try:
+            await fail.callback(_interaction())
+        except Broken:
+            pass
+        else:
+            raise AssertionError("the callback error was swallowed")
+
+    asyncio.run(run())
+
+    assert _stats("interaction:test_dynamic_#") == (before[0] + 2, before[1] + 1)
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger("bot.boot")
+
+# Opt-in: set BOOT_PROFILE=1 to record the startup timeline
+BOOT_PROFILE_ENV = "BOOT_PROFILE"
+BOOT_PROFILE_PATH_ENV = "BOOT_PROFILE_PATH"
+DEFAULT_OUTPUT_PATH = "boot_profile.json"
+
+
+class BootProfiler:
+    """Records a timeline of the bot's cold start.
+
+    Every entry is stored in milliseconds relative to the moment this module
+    was imported, which main.py does before any heavy import. Spans have a
+    start and a duration; milestones only have a start.
+    """
+
+    def __init__(self, enabled=False, output_path=DEFAULT_OUTPUT_PATH):
+        self.enabled = enabled
+        self.output_path = output_path
+        self.started_at = datetime.now()
+        self.t0 = time.perf_counter()
+        self.entries = []
+        self._marks = set()
+
+    def _elapsed_ms(self, at=None):
+        return ((at if at is not None else time.perf_counter()) - self.t0) * 1000
+
+    @contextmanager
+    def span(self, name, category="phase"):
+        """Time the wrapped block as a span"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter(), category)
+
+    def add_span(self, name, start, end, category="phase"):
+        """Record a span from two perf_counter() readings"""
+        if not self.enabled:
+            return
+        self.entries.append({
+            "name": name,
+            "category": category,
+            "start_ms": round(self._elapsed_ms(start), 3),
+            "duration_ms": round((end - start) * 1000, 3)
+        })
+
+    def mark(self, name, once=True):
+        """Record a milestone; with once=True only the first call counts"""
+        if not self.enabled or (once and name in self._marks):
+            return False
+        self._marks.add(name)
+        self.entries.append({
+            "name": name,
+            "category": "milestone",
+            "start_ms": round(self._elapsed_ms(), 3),
+            "duration_ms": 0.0
+        })
+        return True
+
+    def has_mark(self, name):
+        return name in self._marks
+
+    def milestone_ms(self, name):
+        """Offset of a milestone in milliseconds, or None if it was not reached"""
+        for entry in self.entries:
+            if entry["category"] == "milestone" and entry["name"] == name:
+                return entry["start_ms"]
+        return None
+
+    def by_category(self, category):
+        return [entry for entry in self.entries if entry["category"] == category]
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_at.isoformat(),
+            "pid": os.getpid(),
+            "entries": sorted(self.entries, key=lambda entry: entry["start_ms"])
+        }
+
+    def write(self, path=None):
+        """Write the timeline as JSON, returning the path or None on failure"""
+        if not self.enabled:
+            return None
+        path = path or self.output_path
+        try:
+            with open(path, 'w') as f:
+                json.dump(self.to_dict(), f, indent=4)
+            return path
+        except OSError as e:
+            logger.error(f"Error writing boot profile to {path}: {e}")
+            return None
+
+
+boot_profiler = BootProfiler(
+    enabled=os.getenv(BOOT_PROFILE_ENV, "").lower() in ("1", "true", "yes"),
+    output_path=os.getenv(BOOT_PROFILE_PATH_ENV, DEFAULT_OUTPUT_PATH)
+)
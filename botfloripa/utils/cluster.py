@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import itertools
+
+logger = logging.getLogger("bot.cluster")
+
+# Set by cluster.py for every bot process it starts
+CLUSTER_ID_ENV = "BOT_CLUSTER_ID"
+SHARD_IDS_ENV = "BOT_SHARD_IDS"        # e.g. "2,3"
+SHARD_COUNT_ENV = "BOT_SHARD_COUNT"
+IPC_ADDRESS_ENV = "BOT_IPC_ADDRESS"    # host:port of the launcher's hub
+
+# Topics answered by the hub itself instead of being relayed
+HUB_TOPICS = {"identify"}
+
+
+def suffixed_path(path, suffix):
+    """bot.log -> bot.<suffix>.log"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{suffix}{ext}"
+
+
+def cluster_id():
+    """Id of this process in the cluster, or None when not started by cluster.py"""
+    value = os.getenv(CLUSTER_ID_ENV)
+    return int(value) if value else None
+
+
+def apply_cluster_env(config):
+    """Adapt main.py's copy of config.json to a process started by cluster.py.
+
+    Sharding is switched on with this process's shard ids and the log file
+    gets a per-process suffix, since a rotating log file cannot be shared
+    between processes (the metrics port is offset by the cluster id in the
+    diagnostics cog). Returns the cluster id, or None when not running
+    under the launcher.
+    """
+    process_id = cluster_id()
+    if process_id is None:
+        return None
+    config['sharding'] = dict(
+        config.get('sharding', {}),
+        enabled=True,
+        shard_count=int(os.environ[SHARD_COUNT_ENV]),
+        shard_ids=[int(shard_id) for shard_id in os.environ[SHARD_IDS_ENV].split(",")]
+    )
+    logging_settings = config.setdefault('logging', {})
+    logging_settings['file'] = suffixed_path(logging_settings.get('file', 'bot.log'), f"cluster{process_id}")
+    return process_id
+
+
+def _parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+
+class ClusterBus:
+    """Publish/subscribe between the processes of a cluster, relayed by the launcher's hub.
+
+    Messages are newline-delimited JSON over a local TCP connection. They
+    are best effort: while the hub is unreachable they are dropped (the bus
+    reconnects in the background), so they may only be used to invalidate
+    state that can be read again from the database or config.json.
+    Without an address (a single process) publish() does nothing.
+    """
+
+    def __init__(self, address=None, cluster_id=None, reconnect_delay=1.0):
+        self.address = address
+        self.cluster_id = cluster_id
+        self.reconnect_delay = reconnect_delay
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        # True while remote messages are handed to subscribers, so they are not published back
+        self.delivering = False
+        self._subscribers = {}
+        self._pending = {}
+        self._request_ids = itertools.count(1)
+        self._writer = None
+        self._connected = asyncio.Event()
+        self._task = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv(IPC_ADDRESS_ENV), cluster_id())
+
+    @property
+    def enabled(self):
+        return bool(self.address)
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    def subscribe(self, topic, callback):
+        """Call callback(data) for every message on `topic` published by another process"""
+        self._subscribers.setdefault(topic, []).append(callback)
+
+    def publish(self, topic, data=None):
+        """Send a message to every other process; returns False if it was dropped"""
+        if not self.enabled or self.delivering:
+            return False
+        if not self._send({"topic": topic, "data": data or {}, "origin": self.cluster_id}):
+            return False
+        self.sent += 1
+        return True
+
+    async def request(self, topic, data=None, timeout=60):
+        """Send a message the hub answers (see HUB_TOPICS) and wait for the reply"""
+        await asyncio.wait_for(self._connected.wait(), timeout)
+        request_id = next(self._request_ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            if not self._send({"topic": topic, "data": data or {}, "origin": self.cluster_id, "request": request_id}):
+                raise ConnectionError("cluster bus is not connected")
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _send(self, message):
+        if self._writer is None or self._writer.is_closing():
+            self.dropped += 1
+            return False
+        self._writer.write(json.dumps(message).encode() + b"\n")
+        return True
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    async def _run(self):
+        host, port = _parse_address(self.address)
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(host, port)
+                self._connected.set()
+                logger.info(f"Connected to the cluster hub at {self.address}")
+                while line := await reader.readline():
+                    self._deliver(json.loads(line))
+                logger.warning("The cluster hub closed the connection")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cluster hub at {self.address} unreachable: {e}")
+            finally:
+                self._connected.clear()
+                if self._writer:
+                    self._writer.close()
+                    self._writer = None
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("cluster hub connection lost"))
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _deliver(self, message):
+        if "reply" in message:
+            future = self._pending.get(message["reply"])
+            if future and not future.done():
+                future.set_result(message.get("data"))
+            return
+        self.received += 1
+        self.delivering = True
+        try:
+            for callback in self._subscribers.get(message.get("topic"), ()):
+                try:
+                    callback(message.get("data") or {})
+                except Exception as e:
+                    logger.error(f"Error in cluster bus subscriber for {message.get('topic')!r}: {e}")
+        finally:
+            self.delivering = False
+
+
+class ClusterHub:
+    """The launcher's end of the bus.
+
+    Relays every message to the other connected processes and hands out
+    IDENTIFY slots: Discord accepts one IDENTIFY per `identify_interval`
+    seconds per rate limit bucket (shard_id % max_concurrency), across all
+    processes of the bot.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, identify_interval=5.0, max_concurrency=1):
+        self.host = host
+        self.port = port
+        self.identify_interval = identify_interval
+        self.max_concurrency = max_concurrency
+        self.relayed = 0
+        self._clients = set()
+        self._handlers = set()
+        self._identify_locks = {}
+        self._last_identify = {}
+        self._server = None
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            # Closed connections end their handlers; let them finish instead of being cancelled at exit
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self._clients.add(writer)
+        self._handlers.add(asyncio.current_task())
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message.get("topic") in HUB_TOPICS:
+                    task = asyncio.create_task(self._grant_identify(writer, message))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    continue
+                for client in self._clients:
+                    if client is not writer and not client.is_closing():
+                        client.write(line)
+                self.relayed += 1
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Dropping cluster bus client: {e}")
+        finally:
+            self._clients.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _grant_identify(self, writer, message):
+        shard_id = message.get("data", {}).get("shard_id") or 0
+        bucket = shard_id % self.max_concurrency
+        lock = self._identify_locks.setdefault(bucket, asyncio.Lock())
+        async with lock:
+            wait = self._last_identify.get(bucket, float("-inf")) + self.identify_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_identify[bucket] = time.monotonic()
+        logger.info(f"IDENTIFY slot granted to shard {shard_id} (process {message.get('origin')})")
+        if not writer.is_closing():
+            writer.write(json.dumps({"reply": message.get("request"), "data": {"shard_id": shard_id}}).encode() + b"\n")
@@ -1,15 +1,85 @@
 import sqlite3
 import logging
 import os
-from datetime import datetime
+import json
+import time
+import random
+from datetime import datetime, timedelta
+
+from utils.metrics import TimedConnection, TimedCursor, metrics
 
 logger = logging.getLogger("bot.db")
 
 DB_PATH = "bot_data.db"
 
+# Several bot processes (cluster mode) share the database file. SQLite's own
+# locking serializes their writes: a connection waits up to BUSY_TIMEOUT
+# seconds for another process's write to finish, and a statement that still
+# finds the database locked is retried LOCK_RETRIES times with exponential
+# backoff (LOCK_BACKOFF, doubled per attempt, with jitter).
+# Both waits block the event loop of the calling bot, so they are kept
+# short: with these defaults a statement gives up after at most
+# (LOCK_RETRIES + 1) * BUSY_TIMEOUT + LOCK_BACKOFF * 7 * 1.5, about 0.6s,
+# and a write that waits for the lock usually gets it within BUSY_TIMEOUT.
+BUSY_TIMEOUT = 0.1
+LOCK_RETRIES = 3
+LOCK_BACKOFF = 0.02
+
+def configure_database(settings=None):
+    """Apply the database section of config.json"""
+    global BUSY_TIMEOUT, LOCK_RETRIES, LOCK_BACKOFF
+    settings = settings or {}
+    BUSY_TIMEOUT = settings.get('busy_timeout_ms', BUSY_TIMEOUT * 1000) / 1000
+    LOCK_RETRIES = settings.get('lock_retries', LOCK_RETRIES)
+    LOCK_BACKOFF = settings.get('lock_backoff_ms', LOCK_BACKOFF * 1000) / 1000
+
+def _is_locked(error):
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+def _retry_locked(connection, call, *args, **kwargs):
+    """Run call(), retrying while the database is locked by another connection.
+    
+    Only statements that start their own transaction are retried (after
+    rolling back the implicit BEGIN): inside an explicit transaction the
+    caller's earlier statements would be lost, so the error is raised as
+    before. COMMIT is always safe to retry.
+    """
+    retryable = not connection.in_transaction or call.__name__ == "commit"
+    for attempt in range(LOCK_RETRIES + 1):
+        try:
+            return call(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if not retryable or attempt == LOCK_RETRIES or not _is_locked(e):
+                raise
+            if call.__name__ != "commit" and connection.in_transaction:
+                connection.rollback()
+            metrics.db_lock_retries += 1
+            delay = LOCK_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+            logger.warning(f"Database locked, retrying in {delay * 1000:.0f}ms ({attempt + 1}/{LOCK_RETRIES})")
+            time.sleep(delay)
+
+class RetryingCursor(TimedCursor):
+    """Cursor whose statements are retried while another process holds the write lock"""
+
+    def execute(self, *args, **kwargs):
+        return _retry_locked(self.connection, super().execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return _retry_locked(self.connection, super().executemany, *args, **kwargs)
+
+class RetryingConnection(TimedConnection):
+    """Connection factory: timed cursors and commits, retried while the database is locked"""
+
+    def cursor(self, factory=RetryingCursor):
+        return super().cursor(factory)
+
+    def commit(self):
+        return _retry_locked(self, super().commit)
+
 def get_connection():
     """Creates and returns a connection to the database"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT, factory=RetryingConnection)
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
     return conn
 
@@ -19,6 +89,9 @@ def setup_database():
         conn = get_connection()
         cursor = conn.cursor()
         
+        # WAL lets readers in other processes run while one process writes (the mode is stored in the file)
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         # Allowlist table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS allowlist (
@@ -30,6 +103,12 @@ def setup_database():
         )
         ''')
         
+        # Index used by the keyset-paginated allowlist listings
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_allowlist_status_user
+        ON allowlist (status, user_id)
+        ''')
+        
         # Warnings table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS warnings (
@@ -88,27 +167,369 @@ def setup_database():
         )
         ''')
         
+        # Application attempts, one row per application (allowlist keeps only the current status)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS allowlist_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            attempt INTEGER NOT NULL,
+            status TEXT,
+            score INTEGER,
+            created_at TIMESTAMP,
+            decided_by INTEGER,
+            decided_at TIMESTAMP
+        )
+        ''')
+        cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_allowlist_attempts_user
+        ON allowlist_attempts (user_id, attempt)
+        ''')
+        
+        # Whitelist answers, one row per question of each application attempt
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS allowlist_answers (
+            user_id INTEGER,
+            attempt INTEGER,
+            question_id INTEGER,
+            question TEXT,
+            answer TEXT,
+            score INTEGER,
+            answered_at TIMESTAMP,
+            PRIMARY KEY (user_id, attempt, question_id)
+        )
+        ''')
+        
+        # Messages carrying whitelist review controls, used to restore and close them
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS review_messages (
+            message_id INTEGER PRIMARY KEY,
+            channel_id INTEGER,
+            user_id INTEGER,
+            created_at TIMESTAMP
+        )
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_review_messages_user
+        ON review_messages (user_id)
+        ''')
+        
+        # Per-guild settings (channels, roles, allowlist options), one JSON value per
+        # "section.key"; guild 0 holds the defaults imported from config.json
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (guild_id, key)
+        )
+        ''')
+        
+        # Small key/value store for bot state (e.g. persistent message IDs)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        ''')
+        
+        # Materialized allowlist counters, kept up to date by the allowlist write functions
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS allowlist_stats (
+            status TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        
+        # Hourly allowlist event counters (applied, approved, rejected, removed)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS allowlist_stats_hourly (
+            bucket TEXT,
+            event TEXT,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, event)
+        )
+        ''')
+        
         conn.commit()
+        
+        run_migrations(conn)
         logger.info("Database setup completed")
     except sqlite3.Error as e:
         logger.error(f"Database setup error: {e}")
     finally:
         conn.close()
 
+# Schema migrations
+def _migration_rebuild_allowlist_stats(cursor):
+    """Seed allowlist_stats from rows created before the table existed"""
+    _rebuild_allowlist_stats(cursor)
+
+def _migration_normalize_allowlist_answers(cursor):
+    """Move the JSON answer blobs in allowlist.answers into allowlist_answers"""
+    from utils.helpers import score_answer
+    
+    columns = [row['name'] for row in cursor.execute("PRAGMA table_info(allowlist)").fetchall()]
+    if 'attempt' not in columns:
+        cursor.execute("ALTER TABLE allowlist ADD COLUMN attempt INTEGER NOT NULL DEFAULT 0")
+    
+    reader = cursor.connection.cursor()
+    reader.execute("SELECT user_id, approved_at, answers FROM allowlist WHERE answers IS NOT NULL")
+    migrated = 0
+    while True:
+        rows = reader.fetchmany(500)
+        if not rows:
+            break
+        for row in rows:
+            try:
+                answers = json.loads(row['answers'])
+            except (json.JSONDecodeError, TypeError):
+                continue
+            cursor.executemany(
+                "INSERT OR IGNORE INTO allowlist_answers (user_id, attempt, question_id, question, answer, score, answered_at) "
+                "VALUES (?, 1, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        row['user_id'], i + 1, qa.get('question'), qa.get('answer'),
+                        score_answer(qa.get('answer'), qa['correct_answer']) if qa.get('correct_answer') else None,
+                        row['approved_at']
+                    )
+                    for i, qa in enumerate(answers) if isinstance(qa, dict)
+                ]
+            )
+            migrated += 1
+    
+    cursor.execute("UPDATE allowlist SET attempt = 1 WHERE answers IS NOT NULL AND attempt = 0")
+    cursor.execute("UPDATE allowlist SET answers = NULL WHERE answers IS NOT NULL")
+    logger.info(f"Migrated answers of {migrated} allowlist entries")
+
+def _migration_seed_allowlist_attempts(cursor):
+    """Record the current allowlist rows as the first entry of each user's attempt history"""
+    cursor.execute("UPDATE allowlist SET attempt = 1 WHERE attempt = 0")
+    cursor.execute(
+        "INSERT OR IGNORE INTO allowlist_attempts (user_id, attempt, status, score, created_at, decided_by, decided_at) "
+        "SELECT a.user_id, a.attempt, a.status, "
+        "(SELECT SUM(w.score) FROM allowlist_answers w WHERE w.user_id = a.user_id AND w.attempt = a.attempt), "
+        "COALESCE((SELECT MIN(w.answered_at) FROM allowlist_answers w WHERE w.user_id = a.user_id AND w.attempt = a.attempt), a.approved_at), "
+        "a.approved_by, a.approved_at "
+        "FROM allowlist a"
+    )
+
+def _migration_add_guild_ids(cursor):
+    """Record the owning guild of bans and temp channels, so each shard only handles its own guilds.
+    
+    Rows created before this migration keep guild_id NULL; they are handled by
+    the process that owns shard 0, as before sharding.
+    """
+    for table in ("bans", "temp_channels"):
+        columns = [row['name'] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+        if 'guild_id' not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN guild_id INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bans_guild_active ON bans (guild_id, active)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_temp_channels_guild ON temp_channels (guild_id)")
+
+def _migration_import_guild_settings(cursor):
+    """Import the guild sections of config.json (channels, roles, allowlist...) as the default guild's settings"""
+    from utils.helpers import load_config
+    from utils.guild_settings import DEFAULT_GUILD, flatten_settings
+    
+    now = datetime.now().astimezone().isoformat()
+    settings = flatten_settings(load_config())
+    cursor.executemany(
+        "INSERT OR IGNORE INTO guild_settings (guild_id, key, value, updated_at) VALUES (?, ?, ?, ?)",
+        [(DEFAULT_GUILD, key, json.dumps(value), now) for key, value in settings.items()]
+    )
+    logger.info(f"Imported {len(settings)} settings from config.json as the default guild")
+
+def _migration_question_bank(cursor):
+    """Turn allowlist_questions into the whitelist question bank, seeded from the default guild's questions.
+    
+    The seeded questions get ids 1..n in their configured order, the same
+    question_id the answers recorded so far were stored under. The bank
+    replaces the allowlist.questions/correct_answers settings, which are removed.
+    """
+    columns = [row['name'] for row in cursor.execute("PRAGMA table_info(allowlist_questions)").fetchall()]
+    for column, definition in (
+        ("answer_key", "TEXT"),
+        ("weight", "INTEGER NOT NULL DEFAULT 1"),
+        ("retired_at", "TIMESTAMP")
+    ):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE allowlist_questions ADD COLUMN {column} {definition}")
+    
+    if cursor.execute("SELECT COUNT(*) FROM allowlist_questions").fetchone()[0] == 0:
+        from utils.guild_settings import DEFAULT_GUILD
+        settings = {
+            row['key']: json.loads(row['value'])
+            for row in cursor.execute(
+                "SELECT key, value FROM guild_settings WHERE guild_id = ? "
+                "AND key IN ('allowlist.questions', 'allowlist.correct_answers')",
+                (DEFAULT_GUILD,)
+            ).fetchall()
+        }
+        questions = settings.get('allowlist.questions') or []
+        answers = settings.get('allowlist.correct_answers') or []
+        cursor.executemany(
+            "INSERT INTO allowlist_questions (id, question, answer_key, weight, required, order_num) VALUES (?, ?, ?, 1, 0, ?)",
+            [(i + 1, question, answers[i] if i < len(answers) else None, i + 1) for i, question in enumerate(questions)]
+        )
+        logger.info(f"Seeded the question bank with {len(questions)} questions")
+    cursor.execute("DELETE FROM guild_settings WHERE key IN ('allowlist.questions', 'allowlist.correct_answers')")
+
+# Ordered (version, migration) pairs; the applied version is kept in PRAGMA user_version
+MIGRATIONS = [
+    (1, _migration_rebuild_allowlist_stats),
+    (2, _migration_normalize_allowlist_answers),
+    (3, _migration_seed_allowlist_attempts),
+    (4, _migration_add_guild_ids),
+    (5, _migration_import_guild_settings),
+    (6, _migration_question_bank),
+]
+
+def run_migrations(conn):
+    """Apply pending schema migrations in order"""
+    cursor = conn.cursor()
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    
+    for target, migration in MIGRATIONS:
+        if version >= target:
+            continue
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Another process may have applied it while this one waited for the lock
+            if cursor.execute("PRAGMA user_version").fetchone()[0] >= target:
+                conn.rollback()
+                version = target
+                continue
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+            version = target
+            logger.info(f"Applied database migration {target} ({migration.__name__})")
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Database migration {target} failed: {e}")
+            break
+
+# Allowlist change listeners
+_allowlist_listeners = []
+
+def add_allowlist_listener(callback):
+    """Register callback(user_id, old_status, new_status), called after each committed allowlist change"""
+    if callback not in _allowlist_listeners:
+        _allowlist_listeners.append(callback)
+
+def remove_allowlist_listener(callback):
+    """Unregister a callback added with add_allowlist_listener"""
+    if callback in _allowlist_listeners:
+        _allowlist_listeners.remove(callback)
+
+def _notify_allowlist_change(user_id, old_status, new_status):
+    for callback in list(_allowlist_listeners):
+        try:
+            callback(user_id, old_status, new_status)
+        except Exception as e:
+            logger.error(f"Error in allowlist listener {callback!r}: {e}")
+
+def notify_allowlist_change(user_id, old_status, new_status):
+    """Run the allowlist listeners for a change committed by another process of the cluster"""
+    _notify_allowlist_change(user_id, old_status, new_status)
+
+# Allowlist statistics helpers
+def _stats_bucket(now=None):
+    """Hourly bucket key used by allowlist_stats_hourly"""
+    now = now or datetime.now().astimezone()
+    return now.strftime("%Y-%m-%d %H:00")
+
+def _bump_allowlist_stats(cursor, old_status, new_status, events=()):
+    """Move one entry between status counters and record hourly events.
+    
+    Must be called on the same cursor as the allowlist write so the counters
+    commit or roll back together with it.
+    """
+    if old_status != new_status:
+        if old_status:
+            cursor.execute(
+                "UPDATE allowlist_stats SET count = MAX(count - 1, 0) WHERE status = ?",
+                (old_status,)
+            )
+        if new_status:
+            cursor.execute(
+                "INSERT INTO allowlist_stats (status, count) VALUES (?, 1) "
+                "ON CONFLICT(status) DO UPDATE SET count = count + 1",
+                (new_status,)
+            )
+    
+    bucket = _stats_bucket()
+    for event in events:
+        cursor.execute(
+            "INSERT INTO allowlist_stats_hourly (bucket, event, count) VALUES (?, ?, 1) "
+            "ON CONFLICT(bucket, event) DO UPDATE SET count = count + 1",
+            (bucket, event)
+        )
+
+def _rebuild_allowlist_stats(cursor):
+    cursor.execute("DELETE FROM allowlist_stats")
+    cursor.execute(
+        "INSERT INTO allowlist_stats (status, count) "
+        "SELECT status, COUNT(*) FROM allowlist WHERE status IS NOT NULL GROUP BY status"
+    )
+
+def _decision_events(status):
+    return (status,) if status in ("approved", "rejected") else ()
+
 # Allowlist functions
 def add_to_allowlist(user_id, approved_by=None, status="pending", answers=None):
-    """Add a user to the allowlist"""
+    """Add a user to the allowlist as a new application attempt.
+    
+    The attempt is appended to allowlist_attempts and the user's row in
+    allowlist is upserted to point at it, so earlier attempts are kept.
+    answers is a list of dicts with question_id, question, answer and
+    (optionally) score; they are stored in allowlist_answers under the new
+    attempt number.
+    """
     conn = get_connection()
     cursor = conn.cursor()
     try:
         now = datetime.now().astimezone().isoformat()
+        cursor.execute("BEGIN IMMEDIATE")
+        previous = cursor.execute("SELECT status FROM allowlist WHERE user_id = ?", (user_id,)).fetchone()
+        attempt = cursor.execute(
+            "SELECT COALESCE(MAX(attempt), 0) + 1 FROM allowlist_attempts WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+        scores = [qa.get('score') for qa in answers or () if qa.get('score') is not None]
+        
+        cursor.execute(
+            "INSERT INTO allowlist_attempts (user_id, attempt, status, score, created_at, decided_by, decided_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_id, attempt, status, sum(scores) if scores else None, now, approved_by, now if approved_by else None)
+        )
         cursor.execute(
-            "INSERT OR REPLACE INTO allowlist (user_id, approved_by, approved_at, status, answers) VALUES (?, ?, ?, ?, ?)",
-            (user_id, approved_by, now if approved_by else None, status, answers)
+            "INSERT INTO allowlist (user_id, approved_by, approved_at, status, attempt) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET approved_by = excluded.approved_by, approved_at = excluded.approved_at, "
+            "status = excluded.status, attempt = excluded.attempt",
+            (user_id, approved_by, now if approved_by else None, status, attempt)
+        )
+        if answers:
+            cursor.executemany(
+                "INSERT INTO allowlist_answers (user_id, attempt, question_id, question, answer, score, answered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (user_id, attempt, qa['question_id'], qa.get('question'), qa.get('answer'), qa.get('score'), now)
+                    for qa in answers
+                ]
+            )
+        _bump_allowlist_stats(
+            cursor,
+            previous['status'] if previous else None,
+            status,
+            ("applied",) + _decision_events(status)
         )
         conn.commit()
+        _notify_allowlist_change(user_id, previous['status'] if previous else None, status)
         return True
     except sqlite3.Error as e:
+        conn.rollback()
         logger.error(f"Error adding user to allowlist: {e}")
         return False
     finally:
@@ -119,10 +540,23 @@ def remove_from_allowlist(user_id):
     conn = get_connection()
     cursor = conn.cursor()
     try:
+        cursor.execute("BEGIN IMMEDIATE")
+        previous = cursor.execute("SELECT status FROM allowlist WHERE user_id = ?", (user_id,)).fetchone()
+        if not previous:
+            conn.rollback()
+            return False
+        cursor.execute(
+            "UPDATE allowlist_attempts SET status = 'removed' "
+            "WHERE user_id = ? AND attempt = (SELECT attempt FROM allowlist WHERE user_id = ?)",
+            (user_id, user_id)
+        )
         cursor.execute("DELETE FROM allowlist WHERE user_id = ?", (user_id,))
+        _bump_allowlist_stats(cursor, previous['status'], None, ("removed",))
         conn.commit()
-        return cursor.rowcount > 0
+        _notify_allowlist_change(user_id, previous['status'], None)
+        return True
     except sqlite3.Error as e:
+        conn.rollback()
         logger.error(f"Error removing user from allowlist: {e}")
         return False
     finally:
@@ -155,24 +589,226 @@ def get_allowlist():
     finally:
         conn.close()
 
+def get_allowlist_page(status, after_user_id=None, before_user_id=None, limit=20):
+    """Get one page of allowlist entries with the given status.
+    
+    Uses keyset pagination on (status, user_id) so every page costs the same
+    regardless of table size. Pass after_user_id for the next page or
+    before_user_id for the previous one. The answers column is not selected.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        if before_user_id is not None:
+            cursor.execute(
+                "SELECT user_id, approved_by, approved_at, status FROM allowlist "
+                "WHERE status = ? AND user_id < ? ORDER BY user_id DESC LIMIT ?",
+                (status, before_user_id, limit)
+            )
+            return list(reversed(cursor.fetchall()))
+        
+        cursor.execute(
+            "SELECT user_id, approved_by, approved_at, status FROM allowlist "
+            "WHERE status = ? AND user_id > ? ORDER BY user_id ASC LIMIT ?",
+            (status, after_user_id if after_user_id is not None else -1, limit)
+        )
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error getting allowlist page: {e}")
+        return []
+    finally:
+        conn.close()
+
+def count_allowlist(status=None):
+    """Count allowlist entries, optionally filtered by status"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        if status is None:
+            cursor.execute("SELECT COUNT(*) FROM allowlist")
+        else:
+            cursor.execute("SELECT COUNT(*) FROM allowlist WHERE status = ?", (status,))
+        return cursor.fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error(f"Error counting allowlist: {e}")
+        return 0
+    finally:
+        conn.close()
+
 def update_allowlist_status(user_id, status, approved_by=None):
     """Update a user's allowlist status"""
     conn = get_connection()
     cursor = conn.cursor()
     try:
         now = datetime.now().astimezone().isoformat()
+        cursor.execute("BEGIN IMMEDIATE")
+        previous = cursor.execute("SELECT status FROM allowlist WHERE user_id = ?", (user_id,)).fetchone()
+        if not previous:
+            conn.rollback()
+            return False
         cursor.execute(
             "UPDATE allowlist SET status = ?, approved_by = ?, approved_at = ? WHERE user_id = ?",
             (status, approved_by, now if approved_by else None, user_id)
         )
+        cursor.execute(
+            "UPDATE allowlist_attempts SET status = ?, decided_by = ?, decided_at = ? "
+            "WHERE user_id = ? AND attempt = (SELECT attempt FROM allowlist WHERE user_id = ?)",
+            (status, approved_by, now, user_id, user_id)
+        )
+        if previous['status'] != status:
+            _bump_allowlist_stats(cursor, previous['status'], status, _decision_events(status))
         conn.commit()
-        return cursor.rowcount > 0
+        _notify_allowlist_change(user_id, previous['status'], status)
+        return True
     except sqlite3.Error as e:
+        conn.rollback()
         logger.error(f"Error updating allowlist status: {e}")
         return False
     finally:
         conn.close()
 
+def get_application_answers(user_id, attempt=None):
+    """Get the answers of one application attempt (the current one by default)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        if attempt is None:
+            row = cursor.execute("SELECT attempt FROM allowlist WHERE user_id = ?", (user_id,)).fetchone()
+            if not row:
+                return []
+            attempt = row['attempt']
+        cursor.execute(
+            "SELECT question_id, question, answer, score, answered_at FROM allowlist_answers "
+            "WHERE user_id = ? AND attempt = ? ORDER BY question_id",
+            (user_id, attempt)
+        )
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error getting application answers: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_allowlist_history(user_id, limit=10):
+    """Get a user's most recent application attempts, newest first"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT attempt, status, score, created_at, decided_by, decided_at FROM allowlist_attempts "
+            "WHERE user_id = ? ORDER BY attempt DESC LIMIT ?",
+            (user_id, limit)
+        )
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error getting allowlist history: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_question_stats():
+    """Get per-question answer counts and correct rate across all attempts"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT question_id, MAX(question) AS question, COUNT(*) AS answered, "
+            "SUM(score > 0) AS correct, AVG(score > 0) AS correct_rate "
+            "FROM allowlist_answers WHERE score IS NOT NULL "
+            "GROUP BY question_id ORDER BY question_id"
+        )
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error getting question stats: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_allowlist_stats():
+    """Get the materialized entry count for each allowlist status"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT status, count FROM allowlist_stats")
+        return {row['status']: row['count'] for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        logger.error(f"Error getting allowlist stats: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def get_allowlist_timeseries(hours=24):
+    """Get hourly allowlist event counts for the last `hours` hours, oldest first.
+    
+    Returns a list of dicts with bucket, applied, approved, rejected and removed.
+    Hours without any event are omitted.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        since = _stats_bucket(datetime.now().astimezone() - timedelta(hours=hours - 1))
+        cursor.execute(
+            "SELECT bucket, event, count FROM allowlist_stats_hourly WHERE bucket >= ? ORDER BY bucket",
+            (since,)
+        )
+        series = {}
+        for row in cursor.fetchall():
+            point = series.setdefault(row['bucket'], {
+                'bucket': row['bucket'], 'applied': 0, 'approved': 0, 'rejected': 0, 'removed': 0
+            })
+            point[row['event']] = row['count']
+        return list(series.values())
+    except sqlite3.Error as e:
+        logger.error(f"Error getting allowlist timeseries: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_allowlist_daily_counts(days=7):
+    """Get allowlist event counts per day for the last `days` days, oldest first"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        since = (datetime.now().astimezone() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        cursor.execute(
+            "SELECT substr(bucket, 1, 10) AS day, event, SUM(count) AS count "
+            "FROM allowlist_stats_hourly WHERE bucket >= ? GROUP BY day, event ORDER BY day",
+            (since,)
+        )
+        series = {}
+        for row in cursor.fetchall():
+            point = series.setdefault(row['day'], {
+                'day': row['day'], 'applied': 0, 'approved': 0, 'rejected': 0, 'removed': 0
+            })
+            point[row['event']] = row['count']
+        return list(series.values())
+    except sqlite3.Error as e:
+        logger.error(f"Error getting allowlist daily counts: {e}")
+        return []
+    finally:
+        conn.close()
+
+def rebuild_allowlist_stats():
+    """Recompute the allowlist status counters from the allowlist table.
+    
+    Only the per-status counters can be rebuilt; the hourly event series is
+    history and is left untouched.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        _rebuild_allowlist_stats(cursor)
+        conn.commit()
+        cursor.execute("SELECT status, count FROM allowlist_stats")
+        return {row['status']: row['count'] for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error(f"Error rebuilding allowlist stats: {e}")
+        return None
+    finally:
+        conn.close()
+
 # Warning functions
 def add_warning(user_id, moderator_id, reason):
     """Add a warning to a user"""
@@ -222,16 +858,24 @@ def clear_warnings(user_id, moderator_id=None):
     finally:
         conn.close()
 
+def _guild_filter(guild_ids, include_unassigned):
+    """SQL condition and parameters restricting rows to the given guilds"""
+    placeholders = ", ".join("?" * len(guild_ids))
+    condition = f"guild_id IN ({placeholders})" if guild_ids else "0"
+    if include_unassigned:
+        condition = f"({condition} OR guild_id IS NULL)"
+    return condition, list(guild_ids)
+
 # Ban functions
-def add_ban(user_id, moderator_id, reason, expires_at=None):
+def add_ban(user_id, moderator_id, reason, expires_at=None, guild_id=None):
     """Add a ban for a user"""
     conn = get_connection()
     cursor = conn.cursor()
     try:
         now = datetime.now().astimezone().isoformat()
         cursor.execute(
-            "INSERT INTO bans (user_id, moderator_id, reason, timestamp, expires_at) VALUES (?, ?, ?, ?, ?)",
-            (user_id, moderator_id, reason, now, expires_at)
+            "INSERT INTO bans (user_id, moderator_id, reason, timestamp, expires_at, guild_id) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, moderator_id, reason, now, expires_at, guild_id)
         )
         conn.commit()
         return cursor.lastrowid
@@ -241,12 +885,18 @@ def add_ban(user_id, moderator_id, reason, expires_at=None):
     finally:
         conn.close()
 
-def remove_ban(user_id):
-    """Remove a ban for a user"""
+def remove_ban(user_id, guild_id=None):
+    """Remove a ban for a user (only the guild's bans and legacy rows when guild_id is given)"""
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("UPDATE bans SET active = FALSE WHERE user_id = ? AND active = TRUE", (user_id,))
+        if guild_id is None:
+            cursor.execute("UPDATE bans SET active = FALSE WHERE user_id = ? AND active = TRUE", (user_id,))
+        else:
+            cursor.execute(
+                "UPDATE bans SET active = FALSE WHERE user_id = ? AND active = TRUE AND (guild_id = ? OR guild_id IS NULL)",
+                (user_id, guild_id)
+            )
         conn.commit()
         return cursor.rowcount > 0
     except sqlite3.Error as e:
@@ -268,12 +918,16 @@ def get_active_ban(user_id):
     finally:
         conn.close()
 
-def get_all_bans():
-    """Get all active bans"""
+def get_all_bans(guild_ids=None, include_unassigned=True):
+    """Get all active bans, optionally only those of the given guilds"""
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM bans WHERE active = TRUE")
+        if guild_ids is None:
+            cursor.execute("SELECT * FROM bans WHERE active = TRUE")
+        else:
+            condition, params = _guild_filter(guild_ids, include_unassigned)
+            cursor.execute(f"SELECT * FROM bans WHERE active = TRUE AND {condition}", params)
         return cursor.fetchall()
     except sqlite3.Error as e:
         logger.error(f"Error getting all bans: {e}")
@@ -341,15 +995,15 @@ def get_suggestion_by_message(message_id):
         conn.close()
 
 # Temp channel functions
-def add_temp_channel(channel_id, user_id, purpose):
+def add_temp_channel(channel_id, user_id, purpose, guild_id=None):
     """Add a temporary channel"""
     conn = get_connection()
     cursor = conn.cursor()
     try:
         now = datetime.now().astimezone().isoformat()
         cursor.execute(
-            "INSERT INTO temp_channels (channel_id, user_id, created_at, purpose) VALUES (?, ?, ?, ?)",
-            (channel_id, user_id, now, purpose)
+            "INSERT INTO temp_channels (channel_id, user_id, created_at, purpose, guild_id) VALUES (?, ?, ?, ?, ?)",
+            (channel_id, user_id, now, purpose, guild_id)
         )
         conn.commit()
         return True
@@ -373,15 +1027,264 @@ def remove_temp_channel(channel_id):
     finally:
         conn.close()
 
-def get_temp_channels():
-    """Get all temporary channels"""
+def remove_temp_channels(channel_ids):
+    """Remove several temporary channel records at once"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("DELETE FROM temp_channels WHERE channel_id = ?", [(cid,) for cid in channel_ids])
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Error removing temp channels: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def get_temp_channels(guild_ids=None, include_unassigned=True):
+    """Get all temporary channels, optionally only those of the given guilds"""
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM temp_channels")
+        if guild_ids is None:
+            cursor.execute("SELECT * FROM temp_channels")
+        else:
+            condition, params = _guild_filter(guild_ids, include_unassigned)
+            cursor.execute(f"SELECT * FROM temp_channels WHERE {condition}", params)
         return cursor.fetchall()
     except sqlite3.Error as e:
         logger.error(f"Error getting temp channels: {e}")
         return []
     finally:
         conn.close()
+
+# Bot state functions
+def get_state(key, default=None):
+    """Get a value from the bot_state table"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT value FROM bot_state WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row['value'] if row else default
+    except sqlite3.Error as e:
+        logger.error(f"Error getting bot state {key}: {e}")
+        return default
+    finally:
+        conn.close()
+
+def set_state(key, value):
+    """Store a value in the bot_state table"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO bot_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, None if value is None else str(value))
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error setting bot state {key}: {e}")
+        return False
+    finally:
+        conn.close()
+
+# Question bank functions
+def get_allowlist_questions(include_retired=False):
+    """Get the whitelist questions in order (retired ones last, if included)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT id, question, answer_key, weight, required, order_num, retired_at FROM allowlist_questions "
+            + ("" if include_retired else "WHERE retired_at IS NULL ")
+            + "ORDER BY retired_at IS NOT NULL, order_num, id"
+        )
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error getting allowlist questions: {e}")
+        return None
+    finally:
+        conn.close()
+
+def add_allowlist_question(question, answer_key, weight=1, required=False):
+    """Append a question to the bank; returns its id"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO allowlist_questions (question, answer_key, weight, required, order_num) "
+            "VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(order_num), 0) + 1 FROM allowlist_questions WHERE retired_at IS NULL))",
+            (question, answer_key, weight, int(required))
+        )
+        conn.commit()
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        logger.error(f"Error adding allowlist question: {e}")
+        return None
+    finally:
+        conn.close()
+
+def update_allowlist_question(question_id, weight=None, required=None):
+    """Change the weight and/or required flag of an active question"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE allowlist_questions SET weight = COALESCE(?, weight), required = COALESCE(?, required) "
+            "WHERE id = ? AND retired_at IS NULL",
+            (weight, None if required is None else int(required), question_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Error updating allowlist question {question_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def move_allowlist_question(question_id, position):
+    """Move an active question to `position` (1-based) and renumber the others"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        ids = [
+            row['id'] for row in cursor.execute(
+                "SELECT id FROM allowlist_questions WHERE retired_at IS NULL ORDER BY order_num, id"
+            ).fetchall()
+        ]
+        if question_id not in ids:
+            conn.rollback()
+            return False
+        ids.remove(question_id)
+        ids.insert(max(0, min(position - 1, len(ids))), question_id)
+        cursor.executemany(
+            "UPDATE allowlist_questions SET order_num = ? WHERE id = ?",
+            [(order, qid) for order, qid in enumerate(ids, start=1)]
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error(f"Error moving allowlist question {question_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def retire_allowlist_question(question_id):
+    """Take a question out of the bank; its id and recorded answers are kept for history"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE allowlist_questions SET retired_at = ? WHERE id = ? AND retired_at IS NULL",
+            (datetime.now().astimezone().isoformat(), question_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Error retiring allowlist question {question_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+# Guild settings functions
+def get_guild_settings():
+    """Return every row of guild_settings as (guild_id, key, value), values decoded from JSON"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT guild_id, key, value FROM guild_settings")
+        return [(row['guild_id'], row['key'], json.loads(row['value'])) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error getting guild settings: {e}")
+        return None
+    finally:
+        conn.close()
+
+def set_guild_settings(guild_id, values):
+    """Store {key: value} settings of a guild in one transaction"""
+    now = datetime.now().astimezone().isoformat()
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            "INSERT INTO guild_settings (guild_id, key, value, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(guild_id, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            [(guild_id, key, json.dumps(value), now) for key, value in values.items()]
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error setting guild settings of {guild_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+# Review message functions
+def add_review_message(message_id, channel_id, user_id):
+    """Record a message that carries review controls for a user's application"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        now = datetime.now().astimezone().isoformat()
+        cursor.execute(
+            "INSERT OR REPLACE INTO review_messages (message_id, channel_id, user_id, created_at) VALUES (?, ?, ?, ?)",
+            (message_id, channel_id, user_id, now)
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error adding review message: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_review_messages():
+    """Get all recorded review messages with the current status of each application"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT r.message_id, r.channel_id, r.user_id, a.status FROM review_messages r "
+            "LEFT JOIN allowlist a ON a.user_id = r.user_id"
+        )
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error getting review messages: {e}")
+        return []
+    finally:
+        conn.close()
+
+def pop_review_messages(user_id):
+    """Remove and return the review messages recorded for a user"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT message_id, channel_id FROM review_messages WHERE user_id = ?", (user_id,))
+        rows = cursor.fetchall()
+        cursor.execute("DELETE FROM review_messages WHERE user_id = ?", (user_id,))
+        conn.commit()
+        return rows
+    except sqlite3.Error as e:
+        logger.error(f"Error removing review messages: {e}")
+        return []
+    finally:
+        conn.close()
+
+def remove_review_messages(message_ids):
+    """Remove review message records in bulk"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("DELETE FROM review_messages WHERE message_id = ?", [(mid,) for mid in message_ids])
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Error removing review messages: {e}")
+        return 0
+    finally:
+        conn.close()
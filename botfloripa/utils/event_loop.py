@@ -0,0 +1,33 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("bot.loop")
+
+LOOP_CHOICES = ("auto", "uvloop", "asyncio")
+
+
+def install_event_loop(preference="auto"):
+    """Install the event loop policy used by bot.run().
+
+    "auto" uses uvloop when it is installed and silently keeps asyncio's
+    default loop otherwise; "uvloop" does the same but logs a warning when
+    uvloop is missing; "asyncio" always keeps the default loop.
+    Returns the name of the loop that will be used.
+    """
+    preference = (preference or "auto").lower()
+    if preference not in LOOP_CHOICES:
+        logger.warning(f"Unknown event_loop '{preference}', using asyncio")
+        preference = "asyncio"
+
+    if preference == "asyncio":
+        return "asyncio"
+
+    try:
+        import uvloop
+    except ImportError:
+        if preference == "uvloop":
+            logger.warning("uvloop is not installed (pip install uvloop); falling back to asyncio")
+        return "asyncio"
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return f"uvloop {uvloop.__version__}"
@@ -0,0 +1,167 @@
+import copy
+import logging
+
+from utils import db
+from utils.helpers import load_config
+from utils.metrics import metrics
+
+logger = logging.getLogger("bot.guild_settings")
+
+# Settings of guilds without their own value; database migration 5 imported
+# config.json's guild sections here
+DEFAULT_GUILD = 0
+
+# config.json sections that are per guild. The rest (logging, metrics,
+# sharding, database...) stays process-wide in config.json.
+GUILD_SECTIONS = ("server_name", "server_logo_url", "color", "channels", "roles", "allowlist")
+
+# guild_id -> {"section.key": value}, read from guild_settings once
+_settings = None
+# guild_id -> (config.json dict it was built from, config-shaped view)
+_views = {}
+# Callbacks run with (guild_id, keys) after settings change
+_listeners = []
+# config.json dict last compared with the default guild's settings
+_checked_config = None
+
+
+def flatten_settings(config):
+    """{"channels": {"logs": 1}, "server_name": "x"} -> {"channels.logs": 1, "server_name": "x"}
+
+    Only GUILD_SECTIONS are kept, without "_comment" keys. Lists
+    (allowlist.questions) stay one value.
+    """
+    settings = {}
+    for section in GUILD_SECTIONS:
+        value = config.get(section)
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if not key.startswith("_"):
+                    settings[f"{section}.{key}"] = item
+        elif value is not None:
+            settings[section] = value
+    return settings
+
+
+def _loaded():
+    """The settings in memory, read on first use; {} while the table cannot be read (retried on the next call)"""
+    if _settings is None:
+        reload_guild_settings()
+    return _settings if _settings is not None else {}
+
+
+def reload_guild_settings():
+    """Read the guild_settings table into memory again (e.g. after another process changed it).
+
+    Returns False if the table could not be read; what was loaded before is kept.
+    """
+    global _settings
+    rows = db.get_guild_settings()
+    if rows is None:
+        return False
+    settings = {}
+    for guild_id, key, value in rows:
+        settings.setdefault(guild_id, {})[key] = value
+    _settings = settings
+    _views.clear()
+    return True
+
+
+def get_setting(guild_id, key, default=None):
+    """One setting ("channels.logs") of a guild: its own value, else the default guild's"""
+    settings = _loaded()
+    guild = settings.get(guild_id)
+    if guild is not None and key in guild:
+        return guild[key]
+    return settings.get(DEFAULT_GUILD, {}).get(key, default)
+
+
+def _warn_ignored_config(config, settings):
+    """Warn once per config.json version about guild keys whose value there is overridden by the database"""
+    global _checked_config
+    if config is _checked_config:
+        return
+    _checked_config = config
+    defaults = settings.get(DEFAULT_GUILD, {})
+    ignored = sorted(
+        key for key, value in flatten_settings(config).items()
+        if key in defaults and defaults[key] != value
+    )
+    if ignored:
+        logger.warning(
+            f"config.json values ignored, the database's default guild settings apply: {', '.join(ignored)} "
+            "(change them with !setup / !allowlist configure)"
+        )
+
+
+def guild_config(guild_id=None):
+    """config.json with the guild's settings applied over its guild sections.
+
+    The same lookups as on load_config() work on it
+    (guild_config(guild.id).get('channels', {}).get('logs')). Views are
+    cached per guild until the guild's settings or config.json change;
+    like load_config(), treat the dict as read-only.
+    """
+    guild_id = DEFAULT_GUILD if guild_id is None else guild_id
+    config = load_config()
+    cached = _views.get(guild_id)
+    if cached is not None and cached[0] is config:
+        metrics.cache("guild_settings").hit()
+        return cached[1]
+    metrics.cache("guild_settings").miss()
+
+    settings = _loaded()
+    if _settings is not None:
+        _warn_ignored_config(config, settings)
+    view = copy.deepcopy(config)
+    for source in (settings.get(DEFAULT_GUILD, {}), settings.get(guild_id, {}) if guild_id != DEFAULT_GUILD else {}):
+        for key, value in source.items():
+            section, _, name = key.partition(".")
+            if name:
+                view.setdefault(section, {})[name] = value
+            else:
+                view[section] = value
+    if _settings is not None:
+        _views[guild_id] = (config, view)
+    return view
+
+
+def update_guild_settings(guild_id, values):
+    """Store the {"section.key": value} settings that differ from the guild's current ones.
+
+    Unchanged keys are not written. Returns the list of changed keys
+    (empty if nothing changed), or None if the database write failed.
+    """
+    changed = {key: value for key, value in values.items() if get_setting(guild_id, key) != value}
+    if not changed:
+        return []
+    if not db.set_guild_settings(guild_id, changed):
+        return None
+    _loaded().setdefault(guild_id, {}).update(changed)
+    if guild_id == DEFAULT_GUILD:
+        _views.clear()
+    else:
+        _views.pop(guild_id, None)
+    notify_guild_settings_change(guild_id, list(changed))
+    return list(changed)
+
+
+def add_guild_settings_listener(callback):
+    """Register callback(guild_id, keys), called after a guild's settings change"""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def remove_guild_settings_listener(callback):
+    """Unregister a callback added with add_guild_settings_listener"""
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def notify_guild_settings_change(guild_id, keys):
+    """Run the guild settings listeners"""
+    for callback in list(_listeners):
+        try:
+            callback(guild_id, keys)
+        except Exception as e:
+            logger.error(f"Error in guild settings listener {callback!r}: {e}")
@@ -1,23 +1,45 @@
 import discord
+import os
 import json
 import logging
 from datetime import datetime, timedelta
 import re
 
+from utils.metrics import metrics
+
 logger = logging.getLogger("bot.helpers")
 
+CONFIG_PATH = 'config.json'
+
+# (mtime_ns, size) of the file the cached config was parsed from
+_config_cache = {"key": None, "config": {}}
+
 def load_config():
-    """Load the configuration from the config.json file"""
+    """Load the configuration from the config.json file.
+    
+    The parsed dict is cached and re-read only when the file's mtime or size
+    changes, so it is shared between callers: treat it as read-only and
+    copy.deepcopy() it before modifying.
+    """
     try:
-        with open('config.json', 'r') as f:
-            return json.load(f)
+        stat = os.stat(CONFIG_PATH)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == _config_cache["key"]:
+            metrics.cache("config").hit()
+            return _config_cache["config"]
+        metrics.cache("config").miss()
+        with open(CONFIG_PATH, 'r') as f:
+            config = json.load(f)
+        _config_cache["key"], _config_cache["config"] = key, config
+        return config
     except Exception as e:
         logger.error(f"Error loading config: {e}")
         return {}
 
-def create_embed(title, description, color=None, fields=None, footer=None, thumbnail=None):
-    """Create a Discord embed with the given parameters"""
-    config = load_config()
+def create_embed(title, description, color=None, fields=None, footer=None, thumbnail=None, guild_id=None):
+    """Create a Discord embed with the given parameters (colors and footer from the guild's settings)"""
+    from utils.guild_settings import guild_config
+    config = guild_config(guild_id)
     
     # Default to info color if not specified
     if color is None:
@@ -48,7 +70,6 @@ def create_embed(title, description, color=None, fields=None, footer=None, thumb
     if footer:
         embed.set_footer(text=footer)
     else:
-        config = load_config()
         embed.set_footer(text=config.get('server_name', 'GTA RP Server'))
     
     # Set thumbnail if provided
@@ -117,10 +138,27 @@ def format_time_difference(dt):
     else:
         return f"{seconds} seconds"
 
+def answer_keywords(correct_answer):
+    """The normalized keywords a whitelist answer must contain: the first three words of the correct answer"""
+    return tuple((correct_answer or "").lower().strip().split()[:3])
+
+def match_keywords(answer, keywords):
+    """1 if the answer contains every keyword (from answer_keywords), else 0"""
+    user_answer = (answer or "").lower().strip()
+    return int(all(keyword in user_answer for keyword in keywords))
+
+def score_answer(answer, correct_answer):
+    """Score a whitelist answer: 1 if it contains the first keywords of the correct answer, else 0"""
+    return match_keywords(answer, answer_keywords(correct_answer))
+
+def _guild_roles(member):
+    """The roles section of the member's guild settings"""
+    from utils.guild_settings import guild_config
+    return guild_config(member.guild.id).get('roles', {})
+
 def is_admin(member):
     """Check if a member has admin permissions"""
-    config = load_config()
-    admin_role_id = config.get('roles', {}).get('admin')
+    admin_role_id = _guild_roles(member).get('admin')
     
     # If admin role is configured, check for it
     if admin_role_id:
@@ -131,9 +169,9 @@ def is_admin(member):
 
 def is_moderator(member):
     """Check if a member has moderator permissions"""
-    config = load_config()
-    admin_role_id = config.get('roles', {}).get('admin')
-    mod_role_id = config.get('roles', {}).get('moderator')
+    roles = _guild_roles(member)
+    admin_role_id = roles.get('admin')
+    mod_role_id = roles.get('moderator')
     
     # Check for admin role first
     if admin_role_id and any(role.id == admin_role_id for role in member.roles):
@@ -168,7 +206,7 @@ def can_use_suggestion_management(member):
     # Either admin or mod can manage suggestions
     return is_admin(member) or is_moderator(member)
 
-def get_channel_id(channel_type):
-    """Get a channel ID from the config"""
-    config = load_config()
-    return config.get('channels', {}).get(channel_type)
+def get_channel_id(channel_type, guild_id=None):
+    """Get a channel ID from the guild's settings (the default guild's without guild_id)"""
+    from utils.guild_settings import guild_config
+    return guild_config(guild_id).get('channels', {}).get(channel_type)
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+
+from discord.ext import commands
+
+logger = logging.getLogger("bot.lazy")
+
+
+class LazyExtension:
+    """Declares how a rarely used extension is triggered before it is imported.
+
+    commands: names of the prefix commands the real cog registers.
+    events: mapping of event name (e.g. 'on_raw_reaction_add') to a predicate
+    receiving the event arguments; the extension is loaded only when the
+    predicate returns True, so unrelated events never trigger an import.
+    """
+
+    def __init__(self, commands=(), events=None):
+        self.commands = list(commands)
+        self.events = dict(events or {})
+
+
+class LazyExtensionManager:
+    """Registers stub commands/listeners and imports the real extension on first use"""
+
+    def __init__(self, bot, extensions):
+        self.bot = bot
+        self.extensions = dict(extensions)
+        self.load_times = {}
+        self._stubs = {}
+        self._locks = {name: asyncio.Lock() for name in self.extensions}
+
+    def is_loaded(self, name):
+        return name in self.bot.extensions
+
+    def install(self):
+        """Register the stubs for every extension that is not loaded yet"""
+        for name, spec in self.extensions.items():
+            if self.is_loaded(name) or name in self._stubs:
+                continue
+            stub_commands = [self._make_command_stub(name, command_name) for command_name in spec.commands]
+            for command in stub_commands:
+                self.bot.add_command(command)
+            stub_listeners = []
+            for event, predicate in spec.events.items():
+                listener = self._make_listener_stub(name, event, predicate)
+                self.bot.add_listener(listener, event)
+                stub_listeners.append((event, listener))
+            self._stubs[name] = (stub_commands, stub_listeners)
+            logger.info(f"Registered lazy extension {name} ({len(stub_commands)} commands, {len(stub_listeners)} events)")
+
+    def _remove_stubs(self, name):
+        stub_commands, stub_listeners = self._stubs.pop(name, ([], []))
+        for command in stub_commands:
+            self.bot.remove_command(command.name)
+        for event, listener in stub_listeners:
+            self.bot.remove_listener(listener, event)
+
+    async def ensure_loaded(self, name):
+        """Import and set up the real extension once, re-raising load errors"""
+        if self.is_loaded(name):
+            return
+        async with self._locks[name]:
+            if self.is_loaded(name):
+                return
+            started = time.perf_counter()
+            self._remove_stubs(name)
+            try:
+                await self.bot.load_extension(name)
+            except Exception as e:
+                logger.error(f"Error lazily loading {name}: {e}")
+                # Put the stubs back so a later invocation can retry
+                self.install()
+                raise
+            self.load_times[name] = time.perf_counter() - started
+            logger.info(f"Lazily loaded {name} in {self.load_times[name] * 1000:.1f}ms")
+
+    def _make_command_stub(self, name, command_name):
+        async def stub(ctx):
+            try:
+                await self.ensure_loaded(name)
+            except Exception:
+                await ctx.send("❌ Este módulo não está disponível no momento.")
+                return
+            # Re-parse the original message so the real command gets its own arguments and checks
+            new_ctx = await self.bot.get_context(ctx.message)
+            await self.bot.invoke(new_ctx)
+
+        return commands.Command(stub, name=command_name, hidden=True, extras={'lazy_stub': True})
+
+    def _make_listener_stub(self, name, event, predicate):
+        async def stub(*args):
+            if predicate is not None and not predicate(*args):
+                return
+            try:
+                await self.ensure_loaded(name)
+            except Exception:
+                return
+            # The real listener was registered after this event was dispatched, so forward it
+            cog = next((cog for cog in self.bot.cogs.values() if cog.__module__ == name), None)
+            if not cog:
+                return
+            for listener_name, listener in cog.get_listeners():
+                if listener_name == event:
+                    await listener(*args)
+
+        return stub
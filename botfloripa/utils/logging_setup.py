@@ -0,0 +1,118 @@
+import os
+import copy
+import json
+import gzip
+import queue
+import atexit
+import shutil
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+DEFAULT_SETTINGS = {
+    "level": "INFO",
+    "file": "bot.log",
+    "format": "text",        # "text" or "json"
+    "rotation": "size",      # "size", "time" or "none"
+    "max_bytes": 10 * 1024 * 1024,
+    "when": "midnight",
+    "backup_count": 7,
+    "compress": True
+}
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single JSON object per line"""
+
+    def format(self, record):
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Freezes the message on the caller's side but leaves formatting to the listener"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        # Arguments may be mutated after the call returns, so render them now
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    """Compress the rotated file instead of just renaming it"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _build_file_handler(settings):
+    path = settings["file"]
+    rotation = settings["rotation"]
+    if rotation == "size":
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=int(settings["max_bytes"]), backupCount=int(settings["backup_count"]), encoding="utf-8"
+        )
+    elif rotation == "time":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=settings["when"], backupCount=int(settings["backup_count"]), encoding="utf-8"
+        )
+    else:
+        return logging.FileHandler(path, encoding="utf-8")
+
+    if settings["compress"]:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def setup_logging(settings=None):
+    """Configure the root logger to hand records to a background thread.
+
+    The root logger only gets a QueueHandler, so logging from the event loop
+    is a queue put; the file and console handlers run on the QueueListener
+    thread. Returns the started listener (stopped automatically at exit).
+    """
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    formatter = JsonFormatter() if settings["format"] == "json" else logging.Formatter(TEXT_FORMAT)
+
+    handlers = [_build_file_handler(settings), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(getattr(logging, str(settings["level"]).upper(), logging.INFO))
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
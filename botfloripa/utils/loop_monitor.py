@@ -0,0 +1,168 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+
+from utils.metrics import metrics
+
+logger = logging.getLogger("bot.loop")
+
+# Files under this directory count as "our" code when attributing a stall
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StallSite:
+    """Aggregated stalls attributed to one call site"""
+
+    __slots__ = ("site", "count", "total", "max", "stack", "last_seen")
+
+    def __init__(self, site):
+        self.site = site
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.stack = ""
+        self.last_seen = None
+
+    def add(self, duration, stack):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        if stack:
+            self.stack = stack
+        self.last_seen = time.time()
+
+
+class SlowCallbackHandler(logging.Handler):
+    """Collects asyncio's "Executing <Handle> took N seconds" debug warnings"""
+
+    def __init__(self, watchdog):
+        super().__init__(level=logging.WARNING)
+        self.watchdog = watchdog
+
+    def emit(self, record):
+        if not str(record.msg).startswith("Executing") or not record.args or len(record.args) < 2:
+            return
+        handle, duration = record.args[0], record.args[1]
+        # Handle reprs embed memory addresses; drop them so identical callbacks aggregate
+        site = re.sub(r" at 0x[0-9a-f]+", "", str(handle))
+        self.watchdog.record("slow_callbacks", site, float(duration), "")
+
+
+class LoopWatchdog:
+    """Measures event-loop lag and attributes stalls to the code that caused them.
+
+    A tick task on the loop records when it last ran. A daemon thread checks
+    that timestamp; once the loop is more than `budget` seconds behind, the
+    thread grabs the loop thread's current stack with sys._current_frames(),
+    i.e. the synchronous code that is blocking it. When the loop resumes,
+    the tick sees the full stall duration and files it under that call site.
+    """
+
+    def __init__(self, budget=0.25, tick_interval=0.1, slow_callback=0.1, asyncio_debug=False, max_sites=100):
+        self.budget = budget
+        self.tick_interval = tick_interval
+        self.slow_callback = slow_callback
+        self.asyncio_debug = asyncio_debug
+        self.max_sites = max_sites
+        self.stalls = {}
+        self.slow_callbacks = {}
+        self._lock = threading.Lock()
+        self._pending = None
+        self._last_tick = time.monotonic()
+        self._loop_thread_id = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._task = None
+        self._log_handler = None
+
+    def start(self):
+        """Start monitoring the running loop (call from the loop thread)"""
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        loop.slow_callback_duration = self.slow_callback
+        if self.asyncio_debug:
+            # Debug mode is what makes asyncio time every callback; it has a real overhead
+            loop.set_debug(True)
+            self._log_handler = SlowCallbackHandler(self)
+            logging.getLogger("asyncio").addHandler(self._log_handler)
+
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick())
+        metrics.track_task("loop_watchdog", self._task)
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task and not self._task.done():
+            self._task.cancel()
+        if self._log_handler:
+            logging.getLogger("asyncio").removeHandler(self._log_handler)
+            self._log_handler = None
+
+    async def _tick(self):
+        while True:
+            expected = time.perf_counter() + self.tick_interval
+            await asyncio.sleep(self.tick_interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self._last_tick = time.monotonic()
+            metrics.observe_loop_lag(lag)
+            metrics.heartbeat("loop_watchdog")
+            with self._lock:
+                pending, self._pending = self._pending, None
+            if lag >= self.budget:
+                site, stack = pending if pending else ("<stack não capturado>", "")
+                self.record("stalls", site, lag, stack)
+                logger.warning(f"Event loop stalled for {lag * 1000:.0f}ms at {site}")
+
+    def _watch(self):
+        while not self._stop.wait(self.tick_interval / 2):
+            behind = time.monotonic() - self._last_tick - self.tick_interval
+            if behind < self.budget:
+                continue
+            with self._lock:
+                if self._pending is not None:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            with self._lock:
+                self._pending = (self._call_site(stack), "".join(traceback.format_list(stack[-8:])))
+
+    @staticmethod
+    def _call_site(stack):
+        """Innermost frame in the bot's own code, falling back to the innermost frame"""
+        for frame in reversed(stack):
+            if frame.filename.startswith(PROJECT_ROOT) and not frame.filename.endswith("loop_monitor.py"):
+                return f"{os.path.relpath(frame.filename, PROJECT_ROOT)}:{frame.lineno} in {frame.name}"
+        last = stack[-1]
+        return f"{last.filename}:{last.lineno} in {last.name}"
+
+    def record(self, kind, site, duration, stack):
+        with self._lock:
+            table = getattr(self, kind)
+            entry = table.get(site)
+            if entry is None:
+                if len(table) >= self.max_sites:
+                    # Drop the site with the least total stall time to keep memory bounded
+                    del table[min(table.values(), key=lambda e: e.total).site]
+                entry = table[site] = StallSite(site)
+            entry.add(duration, stack)
+
+    def top(self, kind="stalls", limit=10):
+        with self._lock:
+            entries = list(getattr(self, kind).values())
+        return sorted(entries, key=lambda e: e.total, reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.stalls.clear()
+            self.slow_callbacks.clear()
@@ -0,0 +1,142 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+import discord
+
+from utils.metrics import metrics
+
+logger = logging.getLogger("bot.members")
+
+# Member-cache profiles, selected with member_cache.profile in config.json:
+#   minimal  no members intent: only members seen in events are known (the old default)
+#   lazy     members intent (join/leave events arrive), only voice members cached;
+#            lookups fall back to fetch_member behind the resolver's LRU
+#   full     members intent, every guild chunked at startup and kept in memory
+PROFILES = {
+    "minimal": {"members_intent": False, "cache_flags": ["voice"], "chunk_guilds": False},
+    "lazy": {"members_intent": True, "cache_flags": ["voice"], "chunk_guilds": False},
+    "full": {"members_intent": True, "cache_flags": ["joined", "voice"], "chunk_guilds": True}
+}
+
+
+def member_cache_options(intents, settings=None):
+    """Apply a member-cache profile to `intents` and return the matching Bot kwargs.
+
+    `settings` is the member_cache section of config.json. `cache_flags` and
+    `chunk_guilds` override the profile's defaults; `joined` and `voice`
+    flags that need an intent which is off are dropped with a warning
+    instead of making discord.py refuse to start.
+    """
+    settings = settings or {}
+    name = settings.get('profile', 'minimal')
+    profile = PROFILES.get(name)
+    if profile is None:
+        logger.warning(f"Unknown member_cache.profile {name!r}, using 'minimal'")
+        name, profile = "minimal", PROFILES["minimal"]
+
+    intents.members = profile["members_intent"]
+    flags = discord.MemberCacheFlags.none()
+    for flag in settings.get('cache_flags', profile["cache_flags"]):
+        required = {"joined": intents.members, "voice": intents.voice_states}.get(flag)
+        if required is None:
+            logger.warning(f"Unknown member cache flag {flag!r}")
+        elif not required:
+            logger.warning(f"Member cache flag {flag!r} needs an intent that is disabled; ignoring it")
+        else:
+            setattr(flags, flag, True)
+
+    chunk = settings.get('chunk_guilds', profile["chunk_guilds"]) and intents.members
+    return name, {"member_cache_flags": flags, "chunk_guilds_at_startup": chunk}
+
+
+class MemberResolver:
+    """Looks members up in the gateway cache, then a small LRU, then over REST.
+
+    With the lazy and minimal profiles guild.get_member() misses for most
+    users. get() falls back to guild.fetch_member() and keeps the result in
+    an LRU of `size` entries for `ttl` seconds; members that are not in the
+    guild are remembered for `negative_ttl` seconds so repeated lookups do
+    not turn into repeated requests. Concurrent lookups of the same member
+    share one request.
+    """
+
+    def __init__(self, size=1000, ttl=300, negative_ttl=60):
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # (guild_id, user_id) -> (expires_at, member or None)
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cached(self, guild, user_id):
+        """Member from the gateway cache or the LRU, without a request"""
+        member = guild.get_member(user_id)
+        if member is not None:
+            return member
+        entry = self._entries.get((guild.id, user_id))
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    async def get(self, guild, user_id):
+        """Member of `guild`, fetched if needed; None if the user is not in the guild"""
+        stats = metrics.cache("members")
+        member = guild.get_member(user_id)
+        if member is not None:
+            stats.hit()
+            return member
+
+        key = (guild.id, user_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                stats.hit()
+                return entry[1]
+            del self._entries[key]
+        stats.miss()
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(self._fetch(guild, user_id))
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A cancelled caller must not cancel the request other callers wait on
+        return await asyncio.shield(future)
+
+    async def _fetch(self, guild, user_id):
+        try:
+            member = await guild.fetch_member(user_id)
+            ttl = self.ttl
+        except discord.NotFound:
+            member, ttl = None, self.negative_ttl
+        except discord.HTTPException as e:
+            logger.warning(f"Could not fetch member {user_id} of guild {guild.id}: {e}")
+            return None
+        self._entries[(guild.id, user_id)] = (time.monotonic() + ttl, member)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return member
+
+    async def user(self, client, user_id):
+        """User from the client cache, fetched if needed; None if it does not exist"""
+        user = client.get_user(user_id)
+        if user is not None:
+            return user
+        try:
+            return await client.fetch_user(user_id)
+        except discord.NotFound:
+            return None
+        except discord.HTTPException as e:
+            logger.warning(f"Could not fetch user {user_id}: {e}")
+            return None
+
+    def invalidate(self, guild_id, user_id):
+        self._entries.pop((guild_id, user_id), None)
+
+    def clear(self):
+        self._entries.clear()
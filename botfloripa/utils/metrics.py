@@ -0,0 +1,462 @@
+import re
+import math
+import time
+import sqlite3
+import logging
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger("bot.metrics")
+
+# Upper bounds in seconds, shared by every latency histogram
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Span of the command/interaction running in the current task, if any
+current_span = ContextVar("metrics_span", default=None)
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent samples for percentiles"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window=1024):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, q):
+        """Percentile (0-100) over the recent window, or None without samples"""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+
+class Span:
+    """Timing of one command or interaction, including the DB and REST time spent inside it"""
+
+    __slots__ = ("name", "started", "duration", "db_time", "db_queries", "rest_time", "rest_requests", "error")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = None
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.rest_time = 0.0
+        self.rest_requests = 0
+        self.error = False
+
+
+class CommandStats:
+    """Counters and histograms for one command or interaction"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.db = Histogram()
+        self.rest = Histogram()
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "latency": self.latency.snapshot(),
+            "db": self.db.snapshot(),
+            "rest": self.rest.snapshot()
+        }
+
+
+class CacheStats:
+    """Hit/miss counters for one cache"""
+
+    __slots__ = ("hits", "misses")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        self.hits += 1
+
+    def miss(self):
+        self.misses += 1
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+
+class ShardStats:
+    """Gateway events received by one shard, with the rate over the last window"""
+
+    __slots__ = ("events", "window_start", "window_events", "rate")
+
+    WINDOW = 10.0
+
+    def __init__(self):
+        self.events = 0
+        self.window_start = time.monotonic()
+        self.window_events = 0
+        self.rate = None
+
+    def event(self):
+        self.events += 1
+        self.window_events += 1
+        now = time.monotonic()
+        if now - self.window_start >= self.WINDOW:
+            self.rate = self.window_events / (now - self.window_start)
+            self.window_start = now
+            self.window_events = 0
+
+    def current_rate(self, now=None):
+        """Events per second over the last full window; decays while the shard is quiet"""
+        elapsed = (now or time.monotonic()) - self.window_start
+        if elapsed >= self.WINDOW or self.rate is None:
+            return self.window_events / elapsed if elapsed > 0 else None
+        return self.rate
+
+
+class MetricsRegistry:
+    """In-process metrics shared by the whole bot (survives cog reloads)"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.commands = {}
+        self.db_queries = Histogram()
+        self.db_lock_retries = 0
+        self.rest_requests = Histogram()
+        self.rest_rate_limited = {}
+        self.loop_lag = Histogram(buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+        self.loop_lag_last = 0.0
+        self.caches = {}
+        self.heartbeats = {}
+        self.tasks = {}
+        self.gauges = {}
+        self.shards = {}
+
+    def shard(self, shard_id):
+        stats = self.shards.get(shard_id)
+        if stats is None:
+            stats = self.shards[shard_id] = ShardStats()
+        return stats
+
+    def cache(self, name):
+        stats = self.caches.get(name)
+        if stats is None:
+            stats = self.caches[name] = CacheStats()
+        return stats
+
+    def observe_loop_lag(self, seconds):
+        self.loop_lag_last = seconds
+        self.loop_lag.observe(seconds)
+
+    def observe_rate_limit(self, method, path):
+        route = f"{method} {re.sub(r'[0-9]{15,}', '{id}', path)}"
+        self.rest_rate_limited[route] = self.rest_rate_limited.get(route, 0) + 1
+
+    def track_task(self, name, task):
+        """Export whether a background task is still running"""
+        self.tasks[name] = task
+
+    def heartbeat(self, name):
+        """Called by background loops on every iteration"""
+        self.heartbeats[name] = time.monotonic()
+
+    def register_gauge(self, name, help_text, func, label=None):
+        """Export the value returned by func() on every scrape.
+
+        With `label`, func() returns a dict and every item becomes one
+        sample, e.g. label="shard" and {0: 0.04, 1: 0.05}.
+        """
+        self.gauges[name] = (help_text, func, label)
+
+    def unregister_gauge(self, name):
+        self.gauges.pop(name, None)
+
+    def command(self, name):
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = self.commands[name] = CommandStats()
+        return stats
+
+    @contextmanager
+    def span(self, name):
+        """Time a command/interaction and collect the DB/REST time spent in the current task"""
+        span = Span(name)
+        token = current_span.set(span)
+        try:
+            yield span
+        except Exception:
+            span.error = True
+            raise
+        finally:
+            current_span.reset(token)
+            span.duration = time.perf_counter() - span.started
+            self.record(span)
+
+    def record(self, span):
+        stats = self.command(span.name)
+        stats.count += 1
+        if span.error:
+            stats.errors += 1
+        stats.latency.observe(span.duration)
+        stats.db.observe(span.db_time)
+        stats.rest.observe(span.rest_time)
+
+    def observe_db(self, seconds):
+        self.db_queries.observe(seconds)
+        span = current_span.get()
+        if span is not None:
+            span.db_time += seconds
+            span.db_queries += 1
+
+    def observe_rest(self, seconds):
+        self.rest_requests.observe(seconds)
+        span = current_span.get()
+        if span is not None:
+            span.rest_time += seconds
+            span.rest_requests += 1
+
+    def snapshot(self):
+        return {
+            "uptime_seconds": time.time() - self.started_at,
+            "commands": {name: stats.snapshot() for name, stats in sorted(self.commands.items())},
+            "db_queries": self.db_queries.snapshot(),
+            "db_lock_retries": self.db_lock_retries,
+            "rest_requests": self.rest_requests.snapshot(),
+            "rest_rate_limited": dict(self.rest_rate_limited),
+            "loop_lag": self.loop_lag.snapshot(),
+            "caches": {name: {"hits": c.hits, "misses": c.misses, "hit_rate": c.hit_rate} for name, c in self.caches.items()},
+            "shards": {shard_id: {"events": s.events, "rate": s.current_rate()} for shard_id, s in sorted(self.shards.items())}
+        }
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format (0.0.4)"""
+        lines = []
+        now = time.monotonic()
+
+        def header(name, metric_type, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        def histogram(name, hist, labels=""):
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.bucket_counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {hist.count}')
+            suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {_format_value(hist.sum)}")
+            lines.append(f"{name}_count{suffix} {hist.count}")
+
+        header("bot_uptime_seconds", "gauge", "Seconds since the metrics registry was created")
+        lines.append(f"bot_uptime_seconds {_format_value(time.time() - self.started_at)}")
+
+        header("bot_commands_total", "counter", "Commands and component interactions handled")
+        for name, stats in sorted(self.commands.items()):
+            lines.append(f'bot_commands_total{{command="{_escape(name)}"}} {stats.count}')
+        header("bot_command_errors_total", "counter", "Commands and component interactions that failed")
+        for name, stats in sorted(self.commands.items()):
+            lines.append(f'bot_command_errors_total{{command="{_escape(name)}"}} {stats.errors}')
+        header("bot_command_duration_seconds", "histogram", "Command and interaction latency")
+        for name, stats in sorted(self.commands.items()):
+            histogram("bot_command_duration_seconds", stats.latency, f'command="{_escape(name)}",')
+
+        header("bot_db_query_duration_seconds", "histogram", "SQLite execute/commit latency")
+        histogram("bot_db_query_duration_seconds", self.db_queries)
+        header("bot_db_lock_retries_total", "counter", "SQLite statements retried because another process held the lock")
+        lines.append(f"bot_db_lock_retries_total {self.db_lock_retries}")
+        header("bot_rest_request_duration_seconds", "histogram", "Discord REST request latency")
+        histogram("bot_rest_request_duration_seconds", self.rest_requests)
+        header("bot_rest_rate_limited_total", "counter", "Discord REST responses with status 429")
+        for route, count in sorted(self.rest_rate_limited.items()):
+            lines.append(f'bot_rest_rate_limited_total{{route="{_escape(route)}"}} {count}')
+
+        header("bot_event_loop_lag_seconds", "histogram", "How late the loop probe woke up")
+        histogram("bot_event_loop_lag_seconds", self.loop_lag)
+        header("bot_event_loop_lag_last_seconds", "gauge", "Most recent event loop lag sample")
+        lines.append(f"bot_event_loop_lag_last_seconds {_format_value(self.loop_lag_last)}")
+        header("bot_event_loop_lag_max_seconds", "gauge", "Longest event loop lag seen since start")
+        lines.append(f"bot_event_loop_lag_max_seconds {_format_value(self.loop_lag.max)}")
+
+        header("bot_cache_hits_total", "counter", "Cache hits")
+        for name, stats in sorted(self.caches.items()):
+            lines.append(f'bot_cache_hits_total{{cache="{_escape(name)}"}} {stats.hits}')
+        header("bot_cache_misses_total", "counter", "Cache misses")
+        for name, stats in sorted(self.caches.items()):
+            lines.append(f'bot_cache_misses_total{{cache="{_escape(name)}"}} {stats.misses}')
+
+        header("bot_task_up", "gauge", "1 if the background task is running")
+        for name, task in sorted(self.tasks.items()):
+            lines.append(f'bot_task_up{{task="{_escape(name)}"}} {0 if task.done() else 1}')
+        header("bot_task_heartbeat_age_seconds", "gauge", "Seconds since the background task last reported progress")
+        for name, beat in sorted(self.heartbeats.items()):
+            lines.append(f'bot_task_heartbeat_age_seconds{{task="{_escape(name)}"}} {_format_value(now - beat)}')
+
+        header("bot_gateway_events_total", "counter", "Gateway dispatch events received")
+        for shard_id, stats in sorted(self.shards.items()):
+            lines.append(f'bot_gateway_events_total{{shard="{shard_id}"}} {stats.events}')
+        header("bot_gateway_event_rate", "gauge", "Gateway dispatch events per second over the last window")
+        for shard_id, stats in sorted(self.shards.items()):
+            lines.append(f'bot_gateway_event_rate{{shard="{shard_id}"}} {_format_value(stats.current_rate(now))}')
+
+        for name, (help_text, func, label) in sorted(self.gauges.items()):
+            try:
+                value = func()
+            except Exception as e:
+                logger.error(f"Error reading gauge {name}: {e}")
+                continue
+            header(name, "gauge", help_text)
+            if label is None:
+                lines.append(f"{name} {_format_value(value)}")
+                continue
+            for key, item in sorted(value.items()):
+                lines.append(f'{name}{{{label}="{_escape(key)}"}} {_format_value(item)}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    if value is None:
+        return "NaN"
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+metrics = MetricsRegistry()
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports the time spent in SQLite to the metrics registry"""
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args, **kwargs)
+        finally:
+            metrics.observe_db(time.perf_counter() - started)
+
+    def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args, **kwargs)
+        finally:
+            metrics.observe_db(time.perf_counter() - started)
+
+    def executescript(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executescript(*args, **kwargs)
+        finally:
+            metrics.observe_db(time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection factory whose cursors and commits are timed"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args, **kwargs):
+        return self.cursor().execute(*args, **kwargs)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            metrics.observe_db(time.perf_counter() - started)
+
+
+def build_http_trace():
+    """aiohttp TraceConfig that reports every Discord REST request to the registry"""
+    import aiohttp
+
+    async def on_request_start(session, trace_ctx, params):
+        trace_ctx.started = time.perf_counter()
+
+    async def on_request_end(session, trace_ctx, params):
+        metrics.observe_rest(time.perf_counter() - trace_ctx.started)
+        if params.response.status == 429:
+            metrics.observe_rate_limit(params.method, params.url.path)
+
+    async def on_request_exception(session, trace_ctx, params):
+        metrics.observe_rest(time.perf_counter() - trace_ctx.started)
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+def interaction_metric_name(item):
+    """Stable metric name for a component, e.g. approve_whitelist_123 -> interaction:approve_whitelist_#"""
+    custom_id = getattr(item, "custom_id", None) or type(item).__name__
+    return "interaction:" + re.sub(r"\d+", "#", custom_id)
+
+
+def instrument_gateway():
+    """Count gateway events per shard.
+
+    Every DiscordWebSocket reports the type of each dispatch it receives
+    through its _dispatch attribute ('socket_event_type'), which
+    from_client points at client.dispatch. The wrapper swaps in a counting
+    passthrough on every new connection, so reconnects and resumes stay
+    counted. from_client is internal to discord.py; the wrapper is installed
+    only once.
+    """
+    from discord.gateway import DiscordWebSocket
+
+    original = DiscordWebSocket.from_client.__func__
+    if getattr(original, "_metrics_wrapped", False):
+        return
+
+    async def from_client(cls, client, **kwargs):
+        ws = await original(cls, client, **kwargs)
+        stats = metrics.shard(ws.shard_id or 0)
+        dispatch = ws._dispatch
+
+        def counting_dispatch(event, *args, **kwargs):
+            if event == 'socket_event_type':
+                stats.event()
+            return dispatch(event, *args, **kwargs)
+
+        ws._dispatch = counting_dispatch
+        return ws
+
+    from_client._metrics_wrapped = True
+    DiscordWebSocket.from_client = classmethod(from_client)
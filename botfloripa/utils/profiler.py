@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import tracemalloc
+from collections import Counter
+
+from utils.loop_monitor import PROJECT_ROOT
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Statistical profiler: samples thread stacks from a background thread.
+
+    Every `interval` seconds the sampler thread reads sys._current_frames()
+    and counts each stack, root first, as a tuple of code objects. Nothing
+    is hooked into the profiled code, so the cost is one stack walk per
+    sample (tens of microseconds) instead of cProfile's per-call overhead,
+    and stopping the sampler leaves no trace behind. Labels are only built
+    when the report is rendered.
+    """
+
+    def __init__(self, interval=0.01, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._names = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    async def run(self, seconds):
+        """Sample for `seconds` without blocking the loop; returns self"""
+        self.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # join() returns within one interval
+            await asyncio.to_thread(self.stop)
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        started = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.reverse()
+                self.stacks[(thread_id, tuple(stack))] += 1
+            self.samples += 1
+        self.elapsed = time.perf_counter() - started
+        self._names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format, readable by flamegraph.pl and speedscope"""
+        labels = {}
+        lines = []
+        for (thread_id, stack), count in self.stacks.most_common():
+            frames = [self._names.get(thread_id, str(thread_id))]
+            for code in stack:
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code).replace(";", ":")
+                frames.append(label)
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def top(self, limit=25):
+        """(label, self samples, total samples) of the functions seen most often"""
+        own = Counter()
+        total = Counter()
+        for (_, stack), count in self.stacks.items():
+            if not stack:
+                continue
+            own[stack[-1]] += count
+            for code in set(stack):
+                total[code] += count
+        return [(_frame_label(code), own[code], count) for code, count in total.most_common(limit)]
+
+    def summary(self, limit=25):
+        """Plain-text top-N table, sorted by inclusive samples"""
+        seen = sum(self.stacks.values()) or 1
+        threads = Counter()
+        for (thread_id, _), count in self.stacks.items():
+            threads[self._names.get(thread_id, str(thread_id))] += count
+
+        lines = [
+            f"{self.samples} samples over {self.elapsed:.1f}s (interval {self.interval * 1000:.0f}ms)",
+            "",
+            "Threads: " + ", ".join(f"{name} {count / seen:.0%}" for name, count in threads.most_common()),
+            "",
+            f"{'total':>7} {'self':>7}  function"
+        ]
+        for label, own, total in self.top(limit):
+            lines.append(f"{total / seen:>7.1%} {own / seen:>7.1%}  {label}")
+        return "\n".join(lines) + "\n"
+
+
+async def memory_diff(seconds, limit=25, frames=1):
+    """Diff two tracemalloc snapshots taken `seconds` apart; returns a text report.
+
+    Tracing is started for the interval if it is not already on and stopped
+    again afterwards, so its overhead (slower allocations, extra memory per
+    block) only applies while the diff runs. Snapshots and the comparison
+    run in a worker thread.
+    """
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(frames)
+    try:
+        before = await asyncio.to_thread(tracemalloc.take_snapshot)
+        await asyncio.sleep(seconds)
+        after = await asyncio.to_thread(tracemalloc.take_snapshot)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    def render():
+        exclude = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        stats = after.filter_traces(exclude).compare_to(before.filter_traces(exclude), "lineno")
+        growth = sum(stat.size_diff for stat in stats)
+        lines = [
+            f"Traced memory after {seconds}s: {current / 1024 / 1024:.1f} MiB (peak {peak / 1024 / 1024:.1f} MiB)",
+            f"Net change: {growth / 1024:+,.1f} KiB",
+            "",
+            f"{'change':>12} {'size':>12} {'blocks':>9}  location"
+        ]
+        for stat in stats[:limit]:
+            frame = stat.traceback[0]
+            filename = frame.filename
+            if filename.startswith(PROJECT_ROOT):
+                filename = os.path.relpath(filename, PROJECT_ROOT)
+            lines.append(
+                f"{stat.size_diff / 1024:>+10,.1f}K {stat.size / 1024:>10,.1f}K {stat.count_diff:>+9,}  {filename}:{frame.lineno}"
+            )
+        return "\n".join(lines) + "\n"
+
+    return await asyncio.to_thread(render)
@@ -0,0 +1,127 @@
+import logging
+from collections import namedtuple
+
+from utils import db
+from utils.helpers import answer_keywords, match_keywords
+from utils.metrics import metrics
+
+logger = logging.getLogger("bot.questions")
+
+# One active question of the bank. `id` is the question_id its answers are
+# stored under in allowlist_answers; `keywords` is the normalized answer key.
+Question = namedtuple("Question", "id position text answer_key keywords weight required")
+
+
+class QuestionBank:
+    """Immutable snapshot of the active whitelist questions, in order.
+
+    A session takes the snapshot once and keeps it until it ends, so edits
+    made meanwhile only apply to the next sessions.
+    """
+
+    __slots__ = ("questions", "max_score", "required_ids")
+
+    def __init__(self, questions=()):
+        self.questions = tuple(questions)
+        self.max_score = sum(question.weight for question in self.questions if question.keywords)
+        self.required_ids = frozenset(question.id for question in self.questions if question.required)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __iter__(self):
+        return iter(self.questions)
+
+    def get(self, question_id):
+        return next((question for question in self.questions if question.id == question_id), None)
+
+    @staticmethod
+    def score(question, answer):
+        """Weighted score of an answer, or None for a question without an answer key"""
+        if not question.keywords:
+            return None
+        return question.weight * match_keywords(answer, question.keywords)
+
+    def missed_required(self, answers):
+        """Required questions whose answer (session answer dicts) scored 0.
+
+        Answers without a score (the question has no answer key) cannot be
+        wrong, so they never count as missed.
+        """
+        return [
+            answer['question_id'] for answer in answers
+            if answer['question_id'] in self.required_ids and answer['score'] is not None and not answer['score']
+        ]
+
+
+_snapshot = None
+# Callbacks run (without arguments) after the bank is edited
+_listeners = []
+
+
+def question_bank():
+    """The current snapshot, read from allowlist_questions on first use after an edit"""
+    global _snapshot
+    if _snapshot is not None:
+        metrics.cache("question_bank").hit()
+        return _snapshot
+    metrics.cache("question_bank").miss()
+    rows = db.get_allowlist_questions()
+    if rows is None:
+        # Database error: serve an empty bank now and try again on the next call
+        return QuestionBank()
+    _snapshot = QuestionBank(
+        Question(
+            id=row['id'], position=position, text=row['question'], answer_key=row['answer_key'],
+            keywords=answer_keywords(row['answer_key']) if row['answer_key'] else (),
+            weight=row['weight'], required=bool(row['required'])
+        )
+        for position, row in enumerate(rows, start=1)
+    )
+    return _snapshot
+
+
+def invalidate_question_bank():
+    """Drop the snapshot; the next question_bank() call reads the table again"""
+    global _snapshot
+    _snapshot = None
+
+
+def _edited(result):
+    if result:
+        invalidate_question_bank()
+        for callback in list(_listeners):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in question bank listener {callback!r}: {e}")
+    return result
+
+
+def add_question(text, answer_key, weight=1, required=False):
+    """Append a question; returns its id, or None if it could not be stored"""
+    return _edited(db.add_allowlist_question(text, answer_key, weight, required))
+
+
+def update_question(question_id, weight=None, required=None):
+    return _edited(db.update_allowlist_question(question_id, weight, required))
+
+
+def move_question(question_id, position):
+    return _edited(db.move_allowlist_question(question_id, position))
+
+
+def retire_question(question_id):
+    return _edited(db.retire_allowlist_question(question_id))
+
+
+def add_question_bank_listener(callback):
+    """Register callback(), called after the question bank is edited"""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def remove_question_bank_listener(callback):
+    """Unregister a callback added with add_question_bank_listener"""
+    if callback in _listeners:
+        _listeners.remove(callback)
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+
+from discord.ext import commands
+
+from utils.metrics import metrics
+
+logger = logging.getLogger("bot.sharding")
+
+
+def bot_class(settings=None):
+    """commands.AutoShardedBot when sharding.enabled is set, commands.Bot otherwise"""
+    return commands.AutoShardedBot if (settings or {}).get('enabled', False) else commands.Bot
+
+
+def shard_options(settings=None):
+    """Bot kwargs for the sharding section of config.json.
+
+    shard_count None lets discord.py ask the gateway for the recommended
+    count; shard_ids restricts this process to some of the shards (the rest
+    run in other processes, see the cluster launcher).
+    """
+    settings = settings or {}
+    if not settings.get('enabled', False):
+        return {}
+    options = {}
+    if settings.get('shard_count'):
+        options['shard_count'] = settings['shard_count']
+    if settings.get('shard_ids') is not None:
+        options['shard_ids'] = list(settings['shard_ids'])
+    return options
+
+
+def is_sharded(bot):
+    return isinstance(bot, commands.AutoShardedBot)
+
+
+def local_shard_ids(bot):
+    """Shards whose gateway connection lives in this process"""
+    if is_sharded(bot):
+        if bot.shards:
+            return sorted(bot.shards)
+        return sorted(bot.shard_ids or range(bot.shard_count or 1))
+    return [bot.shard_id or 0]
+
+
+def owns_all_shards(bot):
+    """True unless other processes run some of the shards"""
+    return not is_sharded(bot) or len(local_shard_ids(bot)) >= (bot.shard_count or 1)
+
+
+def shard_guilds(bot, shard_id):
+    """Guilds owned by `shard_id`"""
+    if not is_sharded(bot):
+        return list(bot.guilds)
+    return [guild for guild in bot.guilds if guild.shard_id == shard_id]
+
+
+def task_name(bot, base, shard_id):
+    """Metric name of a per-shard background task; unchanged when not sharded"""
+    return f"{base}:shard{shard_id}" if is_sharded(bot) else base
+
+
+def start_per_shard(bot, base, factory):
+    """Run factory(shard_id) as one task per local shard, once the bot is ready.
+
+    Background work scoped this way only looks at the guilds and rows of
+    its own shard, so with N shards (possibly spread over processes) no
+    guild is processed twice and no task walks every guild. The shard count
+    is only known after login, so the per-shard tasks are started by a
+    supervisor task; cancelling it (cog unload) cancels them too.
+    """
+    async def supervise():
+        await bot.wait_until_ready()
+        tasks = []
+        for shard_id in local_shard_ids(bot):
+            task = asyncio.create_task(factory(shard_id))
+            metrics.track_task(task_name(bot, base, shard_id), task)
+            tasks.append(task)
+        logger.info(f"{base}: started for shard(s) {', '.join(str(s) for s in local_shard_ids(bot))}")
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return asyncio.create_task(supervise())
@@ -0,0 +1,70 @@
+import functools
+
+import discord
+
+from utils.metrics import metrics, current_span, interaction_metric_name
+
+
+def _marks_span_error(on_error):
+    """Wrap a View.on_error so the failing interaction's span is counted as an error"""
+    if getattr(on_error, "_metrics_wrapped", False):
+        return on_error
+
+    @functools.wraps(on_error)
+    async def wrapper(self, interaction, error, item):
+        # Runs inside _scheduled_task, so the span of the failing callback is current
+        span = current_span.get()
+        if span is not None:
+            span.error = True
+        return await on_error(self, interaction, error, item)
+
+    wrapper._metrics_wrapped = True
+    return wrapper
+
+
+class InstrumentedView(discord.ui.View):
+    """View whose component callbacks are timed as interaction:<custom_id> metrics.
+
+    discord.py has no completion event for component interactions, so the
+    view's dispatch method (_scheduled_task, private) is wrapped. Errors are
+    reported to on_error instead of raised; every on_error a subclass defines
+    is wrapped too, so overriding it does not hide the error from the
+    metrics.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "on_error" in cls.__dict__:
+            cls.on_error = _marks_span_error(cls.__dict__["on_error"])
+
+    async def _scheduled_task(self, item, interaction):
+        with metrics.span(interaction_metric_name(item)):
+            return await super()._scheduled_task(item, interaction)
+
+    on_error = _marks_span_error(discord.ui.View.on_error)
+
+
+class InstrumentedItem:
+    """Mixin timing a DynamicItem's callback as an interaction:<custom_id> metric.
+
+    Dynamic items are dispatched by discord.py directly, not through their
+    view's _scheduled_task, so InstrumentedView never sees them. List it
+    before DynamicItem: class X(InstrumentedItem, discord.ui.DynamicItem[...], template=...).
+    Only for dynamic items; a regular item in an InstrumentedView would be
+    counted twice.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        callback = cls.__dict__.get("callback")
+        if callback is None or getattr(callback, "_metrics_wrapped", False):
+            return
+
+        @functools.wraps(callback)
+        async def timed_callback(self, interaction):
+            # An exception is raised out of the span, which counts it as an error
+            with metrics.span(interaction_metric_name(self)):
+                return await callback(self, interaction)
+
+        timed_callback._metrics_wrapped = True
+        cls.callback = timed_callback